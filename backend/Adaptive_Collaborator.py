@@ -4,15 +4,87 @@ from datetime import datetime, timedelta
 import json
 from typing import List, Dict, Any
 import random
+from collections import deque
+from question_bank import QuestionBank
+from scheduler import RepetitionScheduler
+
+DIFFICULTY_LEVELS = ['Easy', 'Medium', 'Hard']
+DIFFICULTY_INDEX = {diff: i for i, diff in enumerate(DIFFICULTY_LEVELS)}
+DIFFICULTY_BONUS = np.array([1.0, 1.5, 2.0])
+
+
+def compute_rewards(correct: np.ndarray, response_times: np.ndarray, difficulty_indices: np.ndarray) -> np.ndarray:
+    """Vectorized form of AdaptiveQuizSystem._get_reward over arrays of answers"""
+    base_reward = np.where(correct, 1.0, -1.0)
+    time_factor = np.clip(1 - np.asarray(response_times, dtype=float) / 60.0, 0.0, 1.0)
+    return base_reward * (1 + time_factor) * DIFFICULTY_BONUS[difficulty_indices]
+
+
+def q_learning_batch_update(q_table: np.ndarray, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                            learning_rate: float, discount_factor: float) -> np.ndarray:
+    """Apply a batch of (state, action, reward) transitions to q_table in place.
+
+    Here the action is the next difficulty, so it is also the next state. TD
+    targets are computed against the Q-table as it was before the batch; the n
+    transitions that share a (state, action) pair are applied as n sequential
+    updates toward their mean target, i.e. with rate 1 - (1 - lr) ** n.
+    """
+    n_levels = q_table.shape[1]
+    targets = rewards + discount_factor * q_table[actions].max(axis=1)
+    flat = states * n_levels + actions
+    counts = np.bincount(flat, minlength=q_table.size)
+    sums = np.bincount(flat, weights=targets, minlength=q_table.size)
+    touched = counts > 0
+    mean_targets = sums[touched] / counts[touched]
+    rates = 1 - (1 - learning_rate) ** counts[touched]
+    flat_q = q_table.reshape(-1)
+    flat_q[touched] += rates * (mean_targets - flat_q[touched])
+    return q_table
+
+
+def transitions_from_sessions(sessions) -> tuple:
+    """Turn answer logs into (states, actions, rewards) arrays.
+
+    Each session is an ordered list of answers with 'difficulty', 'correct' and
+    'time_taken' (the shape of AdaptiveFlashcardSystem.question_history). An
+    answer's reward is credited to the move from its difficulty to the
+    difficulty of the following answer.
+    """
+    states, actions, correct, times = [], [], [], []
+    for session in sessions:
+        for answer, following in zip(session, session[1:]):
+            states.append(DIFFICULTY_INDEX[answer['difficulty']])
+            actions.append(DIFFICULTY_INDEX[following['difficulty']])
+            correct.append(bool(answer['correct']))
+            times.append(answer['time_taken'])
+    states = np.asarray(states, dtype=np.int64)
+    actions = np.asarray(actions, dtype=np.int64)
+    return states, actions, compute_rewards(np.asarray(correct, dtype=bool), np.asarray(times), states)
+
+
+def pretrain_policy(sessions, epochs: int = 20, learning_rate: float = 0.1, discount_factor: float = 0.9) -> np.ndarray:
+    """Train a shared Q-table offline from historical answer logs.
+
+    Pass the result as AdaptiveQuizSystem(questions, q_table=...) so new
+    learners start from a warmed policy instead of all zeros.
+    """
+    q_table = np.zeros((len(DIFFICULTY_LEVELS), len(DIFFICULTY_LEVELS)))
+    states, actions, rewards = transitions_from_sessions(sessions)
+    if len(states):
+        for _ in range(epochs):
+            q_learning_batch_update(q_table, states, actions, rewards, learning_rate, discount_factor)
+    return q_table
+
 
 class AdaptiveQuizSystem:
-    def __init__(self, questions: List[Dict[str, Any]], spaced_interval_days: List[int] = [1, 3, 7, 14, 30]):
-        self.questions = questions
-        self.difficulty_levels = ['Easy', 'Medium', 'Hard']
+    def __init__(self, questions: List[Dict[str, Any]], spaced_interval_days: List[int] = [1, 3, 7, 14, 30],
+                 q_table: np.ndarray = None):
+        self.questions = questions if isinstance(questions, QuestionBank) else QuestionBank(questions)
+        self.difficulty_levels = DIFFICULTY_LEVELS
         self.spaced_interval_days = spaced_interval_days
         
-        # Initialize Q-learning parameters
-        self.q_table = self._initialize_q_table()
+        # Initialize Q-learning parameters; q_table may be a pre-trained shared policy, which is copied
+        self.q_table = self._initialize_q_table() if q_table is None else np.array(q_table, dtype=float)
         self.learning_rate = 0.1
         self.discount_factor = 0.9
         self.epsilon = 0.1  # For exploration
@@ -24,8 +96,13 @@ class AdaptiveQuizSystem:
             'difficulty_history': [],
             'response_times': [],
             'question_history': [],
-            'spaced_repetition_queue': []
+            'spaced_repetition_queue': RepetitionScheduler()
         }
+        # Ids of the last few questions asked, used to avoid immediate repeats
+        self.recent_question_ids = deque(maxlen=5)
+        # Running aggregates so summaries never re-scan the history lists
+        self.average_response_time = 0.0
+        self.difficulty_counts = np.zeros(len(self.difficulty_levels), dtype=np.int64)
         
         # Initialize difficulty distribution
         self.difficulty_weights = {
@@ -34,16 +111,16 @@ class AdaptiveQuizSystem:
             'Hard': 0.3
         }
 
-    def _initialize_q_table(self) -> Dict:
-        """Initialize Q-table with states (difficulty levels) and actions (next difficulty levels)"""
-        q_table = {}
-        for diff in self.difficulty_levels:
-            q_table[diff] = {
-                'Easy': 0.0,
-                'Medium': 0.0,
-                'Hard': 0.0
-            }
-        return q_table
+    def _initialize_q_table(self) -> np.ndarray:
+        """Initialize Q-table with states (difficulty levels, rows) and actions (next difficulty levels, columns)"""
+        return np.zeros((len(self.difficulty_levels), len(self.difficulty_levels)))
+
+    def q_table_dict(self) -> Dict:
+        """The Q-table as nested {state: {action: value}} dicts, e.g. for JSON output"""
+        return {
+            state: {action: float(self.q_table[i, j]) for j, action in enumerate(self.difficulty_levels)}
+            for i, state in enumerate(self.difficulty_levels)
+        }
 
     def _get_reward(self, correct: bool, response_time: float, difficulty: str) -> float:
         """Calculate reward based on answer correctness, response time, and difficulty"""
@@ -66,45 +143,26 @@ class AdaptiveQuizSystem:
         if random.random() < self.epsilon:
             return random.choice(self.difficulty_levels)
         
-        q_values = self.q_table[current_difficulty]
-        return max(q_values.items(), key=lambda x: x[1])[0]
+        # argmax returns the first maximum, matching the previous dict ordering on ties
+        return self.difficulty_levels[int(np.argmax(self.q_table[DIFFICULTY_INDEX[current_difficulty]]))]
 
     def _select_question(self, difficulty: str) -> Dict:
         """Select a question of given difficulty that hasn't been recently asked"""
-        available_questions = [
-            q for q in self.questions 
-            if q['difficulty'] == difficulty 
-            and q not in self.user_performance['question_history'][-5:]
-        ]
-        
-        if not available_questions:
-            available_questions = [q for q in self.questions if q['difficulty'] == difficulty]
-        
-        return random.choice(available_questions)
+        return self.questions.sample(difficulty, exclude_ids=self.recent_question_ids)
 
     def _update_spaced_repetition(self, question: Dict, correct: bool):
         """Update spaced repetition queue based on answer correctness"""
         if not correct:
             next_review = datetime.now() + timedelta(days=self.spaced_interval_days[0])
-            self.user_performance['spaced_repetition_queue'].append({
-                'question': question,
-                'review_date': next_review,
-                'interval_index': 0
-            })
+            self.user_performance['spaced_repetition_queue'].schedule(question, next_review)
 
     def ask_question(self) -> tuple:
         """Ask a question and return question details"""
         # Check if there are any due spaced repetition questions
         current_time = datetime.now()
-        due_questions = [
-            q for q in self.user_performance['spaced_repetition_queue']
-            if q['review_date'] <= current_time
-        ]
-        
-        if due_questions:
-            question = due_questions[0]['question']
-            self.user_performance['spaced_repetition_queue'].remove(due_questions[0])
-        else:
+        question = self.user_performance['spaced_repetition_queue'].pop_due(current_time)
+
+        if question is None:
             # Select new question based on current performance
             if self.user_performance['difficulty_history']:
                 current_difficulty = self.user_performance['difficulty_history'][-1]
@@ -115,6 +173,7 @@ class AdaptiveQuizSystem:
             question = self._select_question(next_difficulty)
         
         self.user_performance['question_history'].append(question)
+        self.recent_question_ids.append(question['id'])
         return question
 
     def process_answer(self, question: Dict, user_answer: str, response_time: float) -> Dict:
@@ -127,10 +186,11 @@ class AdaptiveQuizSystem:
         
         # Update Q-table
         next_difficulty = self._select_next_difficulty(current_difficulty)
-        max_next_q = max(self.q_table[next_difficulty].values())
-        self.q_table[current_difficulty][next_difficulty] += self.learning_rate * (
+        state, action = DIFFICULTY_INDEX[current_difficulty], DIFFICULTY_INDEX[next_difficulty]
+        max_next_q = self.q_table[action].max()
+        self.q_table[state, action] += self.learning_rate * (
             reward + self.discount_factor * max_next_q - 
-            self.q_table[current_difficulty][next_difficulty]
+            self.q_table[state, action]
         )
         
         # Update user performance
@@ -138,6 +198,10 @@ class AdaptiveQuizSystem:
         self.user_performance['total_questions'] += 1
         self.user_performance['difficulty_history'].append(current_difficulty)
         self.user_performance['response_times'].append(response_time)
+        self.difficulty_counts[state] += 1
+        self.average_response_time += (
+            (response_time - self.average_response_time) / self.user_performance['total_questions']
+        )
         
         # Update spaced repetition if answer was incorrect
         self._update_spaced_repetition(question, correct)
@@ -145,34 +209,43 @@ class AdaptiveQuizSystem:
         # Calculate performance metrics
         accuracy = (self.user_performance['correct_answers'] / 
                    self.user_performance['total_questions'] * 100)
-        avg_response_time = np.mean(self.user_performance['response_times'])
         
         return {
             'correct': correct,
             'accuracy': accuracy,
-            'average_response_time': avg_response_time,
+            'average_response_time': self.average_response_time,
             'current_difficulty': current_difficulty,
             'next_difficulty': next_difficulty
         }
 
+    def update_many(self, transitions) -> None:
+        """Apply logged (difficulty, next_difficulty, correct, response_time) transitions in one vectorized step"""
+        transitions = list(transitions)
+        if not transitions:
+            return
+        states, actions, correct, response_times = zip(*transitions)
+        states = np.fromiter((DIFFICULTY_INDEX[d] for d in states), dtype=np.int64, count=len(transitions))
+        actions = np.fromiter((DIFFICULTY_INDEX[d] for d in actions), dtype=np.int64, count=len(transitions))
+        rewards = compute_rewards(np.asarray(correct, dtype=bool), np.asarray(response_times), states)
+        q_learning_batch_update(self.q_table, states, actions, rewards, self.learning_rate, self.discount_factor)
+
     def get_performance_summary(self) -> Dict:
         """Generate a comprehensive performance summary"""
         if not self.user_performance['total_questions']:
             return {'message': 'No questions attempted yet'}
         
-        difficulty_counts = {}
-        for diff in self.difficulty_levels:
-            count = self.user_performance['difficulty_history'].count(diff)
-            difficulty_counts[diff] = count
+        difficulty_counts = {
+            diff: int(count) for diff, count in zip(self.difficulty_levels, self.difficulty_counts)
+        }
         
         return {
             'total_questions': self.user_performance['total_questions'],
             'correct_answers': self.user_performance['correct_answers'],
             'accuracy': (self.user_performance['correct_answers'] / 
                         self.user_performance['total_questions'] * 100),
-            'average_response_time': np.mean(self.user_performance['response_times']),
+            'average_response_time': self.average_response_time,
             'difficulty_distribution': difficulty_counts,
-            'learning_progress': self.q_table,
+            'learning_progress': self.q_table_dict(),
             'questions_for_review': len(self.user_performance['spaced_repetition_queue'])
         }
 
@@ -0,0 +1,299 @@
+import json
+import os
+import threading
+import numpy as np
+from question_bank import DIFFICULTIES
+from report_store import TOPIC_SEPARATOR
+
+DIFFICULTY_CODES = {difficulty: code for code, difficulty in enumerate(DIFFICULTIES)}
+UNKNOWN_DIFFICULTY = len(DIFFICULTIES)
+
+
+class Vocabulary:
+    """Map strings to dense integer codes so they can live in NumPy arrays."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class AnswerTable:
+    """Columnar view of stored quiz reports: one row per (user, test, question).
+
+    Columns are NumPy arrays: user, test, question and difficulty codes, the
+    number of attempts and correct attempts, and total time spent. Topics are
+    multi-valued, so they are exploded into parallel (topic_row, topic) arrays.
+    Questions are keyed by their text because ids restart in every generated set.
+    """
+
+    def __init__(self, user, test, question, difficulty, attempts, correct, time,
+                 topic_row, topic, users, tests, questions, topics):
+        self.user = user
+        self.test = test
+        self.question = question
+        self.difficulty = difficulty
+        self.attempts = attempts
+        self.correct = correct
+        self.time = time
+        self.topic_row = topic_row
+        self.topic = topic
+        self.users = users
+        self.tests = tests
+        self.questions = questions
+        self.topics = topics
+
+    def __len__(self):
+        return len(self.user)
+
+    @classmethod
+    def empty(cls):
+        return cls.from_reports(())
+
+    def extend(self, other):
+        """A table with other's rows after this one's; other must have been built with this table's vocabularies."""
+        columns = [np.concatenate((getattr(self, name), getattr(other, name)))
+                   for name in ('user', 'test', 'question', 'difficulty', 'attempts', 'correct', 'time')]
+        return AnswerTable(*columns, np.concatenate((self.topic_row, other.topic_row + len(self))),
+                           np.concatenate((self.topic, other.topic)),
+                           self.users, self.tests, self.questions, self.topics)
+
+    @classmethod
+    def from_reports(cls, reports, base=None):
+        """Build the table from (user, test_id, report) tuples, sharing base's vocabularies if given."""
+        users, tests, questions, topics = cls._vocabularies(base)
+        columns = {name: [] for name in ('user', 'test', 'question', 'difficulty', 'attempts', 'correct', 'time')}
+        topic_row, topic = [], []
+
+        def add_row(user_code, test_code, entry, attempts, correct, total_time):
+            row = len(columns['user'])
+            columns['user'].append(user_code)
+            columns['test'].append(test_code)
+            columns['question'].append(questions.code(entry.get('question', '')))
+            columns['difficulty'].append(DIFFICULTY_CODES.get(entry.get('difficulty'), UNKNOWN_DIFFICULTY))
+            columns['attempts'].append(attempts)
+            columns['correct'].append(correct)
+            columns['time'].append(total_time)
+            for name in entry.get('related_topics') or ():
+                topic_row.append(row)
+                topic.append(topics.code(name))
+
+        for user, test_id, report in reports:
+            user_code, test_code = users.code(user), tests.code(f"{user}/{test_id}")
+            detailed = report.get('detailed_question_performance')
+            if detailed:
+                for entry in detailed:
+                    attempts = entry.get('user_attempts', 0)
+                    if attempts:
+                        add_row(user_code, test_code, entry, attempts, entry.get('correct_attempts', 0),
+                                entry.get('average_time_taken', 0) * attempts)
+            else:
+                # Older reports only kept the wrong answers
+                for entry in report.get('wrong_answers') or ():
+                    add_row(user_code, test_code, entry, 1, 0, entry.get('time_taken', 0))
+
+        return cls._from_columns(columns, topic_row, topic, users, tests, questions, topics)
+
+    @staticmethod
+    def _vocabularies(base):
+        if base is None:
+            return Vocabulary(), Vocabulary(), Vocabulary(), Vocabulary()
+        return base.users, base.tests, base.questions, base.topics
+
+    @classmethod
+    def from_answer_rows(cls, answers, base=None):
+        """Build the table from the answers of ReportStore.load_answers(), without unpacking any report."""
+        users, tests, questions, topics = cls._vocabularies(base)
+        columns = {name: [] for name in ('user', 'test', 'question', 'difficulty', 'attempts', 'correct', 'time')}
+        topic_row, topic = [], []
+        for row, (user, test_id, question, difficulty, attempts, correct, total_time, names) in enumerate(answers):
+            columns['user'].append(users.code(user))
+            columns['test'].append(tests.code(f"{user}/{test_id}"))
+            columns['question'].append(questions.code(question or ''))
+            columns['difficulty'].append(DIFFICULTY_CODES.get(difficulty, UNKNOWN_DIFFICULTY))
+            columns['attempts'].append(attempts)
+            columns['correct'].append(correct or 0)
+            columns['time'].append(total_time or 0)
+            # Split here rather than in the store, so a million topic lists are never alive at once
+            for name in names.split(TOPIC_SEPARATOR) if names else ():
+                topic_row.append(row)
+                topic.append(topics.code(name))
+        return cls._from_columns(columns, topic_row, topic, users, tests, questions, topics)
+
+    @classmethod
+    def _from_columns(cls, columns, topic_row, topic, users, tests, questions, topics):
+        return cls(
+            np.asarray(columns['user'], dtype=np.int32),
+            np.asarray(columns['test'], dtype=np.int32),
+            np.asarray(columns['question'], dtype=np.int32),
+            np.asarray(columns['difficulty'], dtype=np.int8),
+            np.asarray(columns['attempts'], dtype=np.int32),
+            np.asarray(columns['correct'], dtype=np.int32),
+            np.asarray(columns['time'], dtype=np.float64),
+            np.asarray(topic_row, dtype=np.int64),
+            np.asarray(topic, dtype=np.int32),
+            users, tests, questions, topics,
+        )
+
+
+def iter_users_json_reports(data):
+    """Yield (user, test_id, report) from the users.json document layout."""
+    for user, profile in data.get('users', {}).items():
+        for test_id, test in (profile.get('tests') or {}).items():
+            if test.get('type') == 'report' and isinstance(test.get('data'), dict):
+                yield user, test_id, test['data']
+
+
+def load_users_json(path):
+    with open(path, 'r') as f:
+        return AnswerTable.from_reports(iter_users_json_reports(json.load(f)))
+
+
+def grouped_percentiles(groups, values, n_groups, percentiles):
+    """Per-group percentiles (nearest rank) in one sort: returns an (n_groups, len(percentiles)) array."""
+    result = np.full((n_groups, len(percentiles)), np.nan)
+    if not len(values):
+        return result
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    for column, pct in enumerate(percentiles):
+        offsets = np.floor(pct / 100 * (counts[present] - 1)).astype(np.int64)
+        result[present, column] = sorted_values[starts[present] + offsets]
+    return result
+
+
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def difficulty_calibration(table, min_attempts=5):
+    """Observed accuracy per question against its labelled difficulty.
+
+    A question's suggested difficulty comes from the cohort accuracy bands the
+    engine uses to move learners (above 0.7 Easy, below 0.3 Hard).
+    """
+    n = len(table.questions)
+    attempts = np.bincount(table.question, weights=table.attempts, minlength=n)
+    correct = np.bincount(table.question, weights=table.correct, minlength=n)
+    accuracy = _ratio(correct, attempts)
+    # Label of the first row seen for each question
+    labelled = np.full(n, UNKNOWN_DIFFICULTY, dtype=np.int8)
+    labelled[table.question[::-1]] = table.difficulty[::-1]
+    suggested = np.where(accuracy > 0.7, 0, np.where(accuracy < 0.3, 2, 1))
+
+    results = []
+    for code in np.flatnonzero(attempts >= min_attempts):
+        label = DIFFICULTIES[labelled[code]] if labelled[code] < len(DIFFICULTIES) else None
+        results.append({
+            "question": table.questions.values[code],
+            "labelled_difficulty": label,
+            "suggested_difficulty": DIFFICULTIES[suggested[code]],
+            "attempts": int(attempts[code]),
+            "accuracy": float(accuracy[code]),
+            "miscalibrated": label != DIFFICULTIES[suggested[code]],
+        })
+    return results
+
+
+def topic_accuracy(table, percentiles=(50, 90, 99)):
+    """Accuracy and per-attempt time percentiles for every topic across the cohort."""
+    n = len(table.topics)
+    rows = table.topic_row
+    attempts = np.bincount(table.topic, weights=table.attempts[rows], minlength=n)
+    correct = np.bincount(table.topic, weights=table.correct[rows], minlength=n)
+    answer_rows = np.bincount(table.topic, minlength=n)
+    time_per_attempt = _ratio(table.time, table.attempts)[rows]
+    time_percentiles = grouped_percentiles(table.topic, time_per_attempt, n, percentiles)
+    accuracy = _ratio(correct, attempts)
+
+    return [{
+        "topic": table.topics.values[code],
+        "attempts": int(attempts[code]),
+        "accuracy": float(accuracy[code]),
+        "answer_rows": int(answer_rows[code]),
+        "time_percentiles": {f"p{pct}": float(time_percentiles[code, i]) for i, pct in enumerate(percentiles)},
+    } for code in np.argsort(-attempts) if attempts[code] > 0]
+
+
+def difficulty_summary(table, percentiles=(50, 90, 99)):
+    n = len(DIFFICULTIES) + 1
+    attempts = np.bincount(table.difficulty, weights=table.attempts, minlength=n)
+    correct = np.bincount(table.difficulty, weights=table.correct, minlength=n)
+    time_percentiles = grouped_percentiles(table.difficulty.astype(np.int64), _ratio(table.time, table.attempts),
+                                           n, percentiles)
+    accuracy = _ratio(correct, attempts)
+    return {difficulty: {
+        "attempts": int(attempts[code]),
+        "accuracy": float(accuracy[code]),
+        "time_percentiles": {f"p{pct}": float(time_percentiles[code, i]) for i, pct in enumerate(percentiles)},
+    } for code, difficulty in enumerate(DIFFICULTIES) if attempts[code] > 0}
+
+
+def cohort_summary(table, top_topics=20):
+    return {
+        "users": len(table.users),
+        "tests": len(table.tests),
+        "answer_rows": len(table),
+        "difficulty": difficulty_summary(table),
+        "topics": topic_accuracy(table)[:top_topics],
+        "miscalibrated_questions": [q for q in difficulty_calibration(table) if q["miscalibrated"]],
+    }
+
+
+class CohortAnalytics:
+    """Cache the AnswerTable for a ReportStore or a users.json file, keeping it up to date.
+
+    Stored reports are never replaced, so only reports added since the last
+    call are loaded from a ReportStore and appended to the table. A users.json
+    file is reloaded whenever it changes. Safe to call from several threads.
+    """
+
+    def __init__(self, users_file=None, store=None):
+        self.users_file = users_file
+        self.store = store
+        self._table = None
+        self._version = None
+        self._last_id = 0
+        self._reports = 0
+        self._lock = threading.Lock()
+
+    def table(self):
+        with self._lock:
+            if self.store is not None:
+                self._load_new_reports()
+            else:
+                version = os.stat(self.users_file).st_mtime_ns
+                if version != self._version:
+                    self._table = load_users_json(self.users_file)
+                    self._version = version
+            return self._table
+
+    def _load_new_reports(self):
+        count, last_id = self.store.revision()
+        if self._table is not None and count == self._reports and last_id == self._last_id:
+            return
+        if self._table is None or count < self._reports or last_id < self._last_id:
+            # First load, or reports were removed behind our back: start over
+            self._table, self._last_id, self._reports = AnswerTable.empty(), 0, 0
+        loaded = self.store.load_answers(self._last_id)
+        added = AnswerTable.from_answer_rows(loaded['answers'], base=self._table)
+        if loaded['legacy']:
+            added = added.extend(AnswerTable.from_reports(loaded['legacy'], base=self._table))
+        self._table = self._table.extend(added)
+        self._last_id = loaded['last_id']
+        self._reports += loaded['reports']
+
+    def summary(self, top_topics=20):
+        return cohort_summary(self.table(), top_topics)
@@ -1,40 +1,38 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS  # Import CORS
-import openai
 import os
 from werkzeug.utils import secure_filename
-import PyPDF2
-import json
-from questiongeneration import question_generation
-from youtubevideo import fetch_top_youtube_embed_link_combined
+from questiongeneration import question_cache
+from youtubevideo import fetch_top_youtube_embed_link_combined, resolver as embed_link_resolver
+from jobs import JobManager, QueueFullError
+from question_store import QuestionSetStore
+from analytics import CohortAnalytics
+from report_store import ReportStore
+from upload_jobs import UPLOAD_FOLDER, allowed_file, process_upload
+import metrics
 
 app = Flask(__name__)
 CORS(app)
 
 
-UPLOAD_FOLDER = 'uploads/'
-
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Each upload becomes a new immutable set; quiz clients connect with ?set=<set_id>
+app.config['QUESTION_STORE'] = QuestionSetStore()
+# Swap in a stub (e.g. llm_clients.FakeLLMClient) to run uploads without OpenAI
+app.config['LLM_CLIENT'] = None
+
+# Stored quiz reports (import an existing users.json with `python report_store.py users.json`),
+# aggregated for the dashboard by /analytics/cohort
+report_store = ReportStore()
+cohort_analytics = CohortAnalytics(store=report_store)
 
-# Allowed extensions
-ALLOWED_EXTENSIONS = {'pdf', 'txt'}
+# Uploads are processed in the background; at most 2 run at once and 8 more may wait
+job_manager = JobManager(max_workers=2, max_pending=8)
 
 # Ensure the upload folder exists
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-# Function to extract text from PDF (optional)
-def extract_text_from_pdf(pdf_path):
-    with open(pdf_path, 'rb') as file:
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page_num in range(len(reader.pages)):
-            text += reader.pages[page_num].extract_text()
-        return text
-
 
 @app.route('/upload', methods=['POST'])
 def upload_file_and_generate_questions():
@@ -48,25 +46,58 @@ def upload_file_and_generate_questions():
     if file.filename == '':
         return jsonify({'message': 'No selected file'}), 400
 
-    # If the file is allowed, save it
-    if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-
-        # Extract the text from the file (supporting both PDF and text files)
-        if filename.endswith('.pdf'):
-            text = extract_text_from_pdf(file_path)
-        elif filename.endswith('.txt'):
-            with open(file_path, 'r') as f:
-                text = f.read()
-        else:
-            return jsonify({'message': 'Unsupported file type'}), 400
-    question_generation(text)    
+    if not allowed_file(file.filename):
+        return jsonify({'message': 'Unsupported file type'}), 400
+
+    filename = secure_filename(file.filename)
+    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file.save(file_path)
+
+    # Extraction and generation happen on the job pool; the client polls /jobs/<id>
+    try:
+        job = job_manager.submit(
+            process_upload, file_path, filename,
+            app.config['QUESTION_STORE'], app.config['LLM_CLIENT'],
+            description=filename
+        )
+    except QueueFullError as e:
+        return jsonify({'message': str(e)}), 503, {'Retry-After': '5'}
+
     return jsonify({
-            'message': 'File uploaded and processed successfully'
-        }), 200
-   
+            'message': 'File uploaded, generating questions',
+            'job_id': job.id,
+            'status_url': f'/jobs/{job.id}'
+        }), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'message': 'Unknown job id'}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        'question_sets': question_cache.stats(),
+        'embed_links': embed_link_resolver.stats()
+    }), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.registry.exposition(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/analytics/cohort', methods=['GET'])
+def get_cohort_analytics():
+    top_topics = request.args.get('top_topics', 20, type=int)
+    if not report_store.revision()[0]:
+        return jsonify({'message': 'No stored reports yet'}), 404
+    return jsonify(cohort_analytics.summary(top_topics=top_topics)), 200
+
+
 @app.route('/get_embed_link', methods=['POST'])
 def get_embed_link():
     try:
@@ -89,5 +120,24 @@ def get_embed_link():
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@app.route('/get_embed_links', methods=['POST'])
+def get_embed_links():
+    try:
+        data = request.get_json()
+
+        # A list of keyword lists, e.g. the related_topics of every question in a quiz
+        keyword_lists = data.get('keywords_list', [])
+        if (not keyword_lists or not isinstance(keyword_lists, list)
+                or not all(isinstance(keywords, list) for keywords in keyword_lists)):
+            return jsonify({"error": "Invalid input, 'keywords_list' must be a non-empty list of lists."}), 400
+
+        # Duplicate keyword sets are looked up once and distinct ones concurrently
+        embed_links = embed_link_resolver.resolve_many(keyword_lists)
+        return jsonify({"embed_links": embed_links}), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
-    app.run(debug=True)        
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,195 @@
+"""One ASGI service for the HTTP API and the quiz WebSocket, on a single event loop.
+
+    uvicorn asgi_app:app --port 8765    (or: python asgi_app.py)
+
+The quiz protocol is served at / and /ws, so ws://host:8765/?set=<id> works as
+with main.py, and the api.py routes are served alongside it. Uploads publish
+their questions to live sessions as they are generated, and the finished set
+is handed to the quiz server through the shared QuestionSetStore in memory.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+from werkzeug.utils import secure_filename
+
+import metrics
+from analytics import CohortAnalytics
+from jobs import JobManager, QueueFullError
+from question_channel import QuestionChannel
+from question_store import QuestionSetStore
+from questiongeneration import question_cache
+from report_store import ReportStore, ReportWriter
+from upload_jobs import UPLOAD_FOLDER, allowed_file, process_upload
+from websocket_server import FlashcardWebSocketServer
+from youtubevideo import resolver as embed_link_resolver
+
+
+class StarletteConnection:
+    """Adapt a Starlette WebSocket to the websockets connection interface handle_client uses."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        query = websocket.scope.get("query_string", b"").decode()
+        self.request = SimpleNamespace(path=f"{websocket.url.path}?{query}" if query else websocket.url.path)
+
+    async def send(self, message):
+        try:
+            if isinstance(message, bytes):
+                await self.websocket.send_bytes(message)
+            else:
+                await self.websocket.send_text(message)
+        except (WebSocketDisconnect, RuntimeError, OSError) as e:
+            raise ConnectionClosedError(None, None) from e
+
+    async def recv(self):
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise ConnectionClosedOK(None, None)
+        return message["text"] if message.get("text") is not None else message.get("bytes")
+
+
+def create_app(questions_file="output.json", question_store=None, report_store=None, llm_client=None,
+               upload_workers=2, max_pending_uploads=8, blocking_threads=16):
+    """Build the service. blocking_threads bounds the pool used for YouTube, file and SQLite calls."""
+    question_store = question_store or QuestionSetStore()
+    report_store = report_store or ReportStore()
+    report_writer = ReportWriter(report_store)
+    channel = QuestionChannel()
+    quiz_server = FlashcardWebSocketServer(None, None, questions_file, live_channel=channel,
+                                           question_store=question_store, report_writer=report_writer)
+    job_manager = JobManager(max_workers=upload_workers, max_pending=max_pending_uploads)
+    cohort_analytics = CohortAnalytics(store=report_store)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(blocking_threads, thread_name_prefix="blocking"))
+        # Questions published by upload jobs are delivered to sessions on this loop
+        channel.bind(loop)
+        yield
+        job_manager.shutdown()
+        await asyncio.to_thread(report_writer.close)
+
+    async def upload(request):
+        form = await request.form()
+        file = form.get('file')
+        if file is None or isinstance(file, str):
+            return JSONResponse({'message': 'No file part in the request'}, 400)
+        if file.filename == '':
+            return JSONResponse({'message': 'No selected file'}, 400)
+        if not allowed_file(file.filename):
+            return JSONResponse({'message': 'Unsupported file type'}, 400)
+
+        filename = secure_filename(file.filename)
+        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        contents = await file.read()
+        await asyncio.to_thread(_write_file, file_path, contents)
+        try:
+            job = job_manager.submit(process_upload, file_path, filename, question_store, llm_client, channel,
+                                     description=filename)
+        except QueueFullError as e:
+            return JSONResponse({'message': str(e)}, 503, headers={'Retry-After': '5'})
+        return JSONResponse({
+            'message': 'File uploaded, generating questions',
+            'job_id': job.id,
+            'status_url': f'/jobs/{job.id}'
+        }, 202)
+
+    async def job_status(request):
+        job = job_manager.get(request.path_params['job_id'])
+        if job is None:
+            return JSONResponse({'message': 'Unknown job id'}, 404)
+        return JSONResponse(job.to_dict())
+
+    async def cache_stats(request):
+        return JSONResponse({
+            'question_sets': question_cache.stats(),
+            'embed_links': embed_link_resolver.stats()
+        })
+
+    async def metrics_endpoint(request):
+        return Response(metrics.registry.exposition(), media_type=metrics.CONTENT_TYPE)
+
+    async def cohort(request):
+        try:
+            top_topics = int(request.query_params.get('top_topics', 20))
+        except ValueError:
+            return JSONResponse({'message': "'top_topics' must be an integer"}, 400)
+        if not (await asyncio.to_thread(report_store.revision))[0]:
+            return JSONResponse({'message': 'No stored reports yet'}, 404)
+        return JSONResponse(await asyncio.to_thread(cohort_analytics.summary, top_topics))
+
+    async def embed_link(request):
+        try:
+            data = await request.json()
+            keywords = data.get('keywords', [])
+            if not keywords or not isinstance(keywords, list):
+                return JSONResponse({"error": "Invalid input, 'keywords' must be a non-empty list."}, 400)
+            # The search runs on the blocking pool while the loop keeps serving quiz sessions
+            link = await asyncio.to_thread(embed_link_resolver.resolve, keywords)
+            if link:
+                return JSONResponse({"embed_link": link})
+            return JSONResponse({"message": "No video found for the given keywords"}, 404)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, 500)
+
+    async def embed_links(request):
+        try:
+            data = await request.json()
+            keyword_lists = data.get('keywords_list', [])
+            if (not keyword_lists or not isinstance(keyword_lists, list)
+                    or not all(isinstance(keywords, list) for keywords in keyword_lists)):
+                return JSONResponse(
+                    {"error": "Invalid input, 'keywords_list' must be a non-empty list of lists."}, 400)
+            links = await asyncio.to_thread(embed_link_resolver.resolve_many, keyword_lists)
+            return JSONResponse({"embed_links": links})
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, 500)
+
+    async def quiz(websocket):
+        await websocket.accept()
+        await quiz_server.handle_client(StarletteConnection(websocket))
+        if websocket.client_state.name == "CONNECTED":
+            await websocket.close()
+
+    app = Starlette(
+        routes=[
+            Route('/upload', upload, methods=['POST']),
+            Route('/jobs/{job_id}', job_status),
+            Route('/cache/stats', cache_stats),
+            Route('/metrics', metrics_endpoint),
+            Route('/analytics/cohort', cohort),
+            Route('/get_embed_link', embed_link, methods=['POST']),
+            Route('/get_embed_links', embed_links, methods=['POST']),
+            WebSocketRoute('/', quiz),
+            WebSocketRoute('/ws', quiz),
+        ],
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+        lifespan=lifespan,
+    )
+    app.state.quiz_server = quiz_server
+    app.state.job_manager = job_manager
+    return app
+
+
+def _write_file(path, contents):
+    with open(path, 'wb') as f:
+        f.write(contents)
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    uvicorn.run(app, host="localhost", port=8765)
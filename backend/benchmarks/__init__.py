@@ -0,0 +1 @@
+"""Standalone benchmarks; run from backend/ as ``python -m benchmarks.<name>``."""
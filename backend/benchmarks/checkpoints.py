@@ -0,0 +1,68 @@
+"""Measure the per-answer cost of checkpointing a quiz session and of restoring one.
+
+    python -m benchmarks.checkpoints --sessions 2000 --answers 15 [--dir /tmp/checkpoints]
+
+With --dir, checkpoints go to a FileCheckpointStore in that directory, as with
+launcher.py; the save time is what the event loop pays, and writing them out
+is timed separately.
+"""
+import argparse
+import json
+import random
+import time
+
+from benchmarks.question_selection import synthetic_questions
+from checkpoints import CheckpointStore, FileCheckpointStore, new_token
+from flashcard_system import AdaptiveFlashcardSystem
+from question_bank import QuestionBank
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--answers", type=int, default=15)
+    parser.add_argument("--bank-size", type=int, default=300)
+    parser.add_argument("--dir", help="use a FileCheckpointStore in this directory")
+    args = parser.parse_args()
+
+    random.seed(0)
+    bank = QuestionBank(synthetic_questions(args.bank_size))
+    store = FileCheckpointStore(args.dir) if args.dir else CheckpointStore(max_sessions=args.sessions)
+    answer_time = checkpoint_time = 0.0
+    tokens = []
+    for _ in range(args.sessions):
+        session = AdaptiveFlashcardSystem(None, questions=bank)
+        token = new_token()
+        tokens.append(token)
+        for _ in range(args.answers):
+            started = time.perf_counter()
+            question = session.select_question()
+            session.process_answer(question, random.choice("ABCD"), random.uniform(1, 20))
+            session.adjust_difficulty()
+            checkpointed = time.perf_counter()
+            store.save(token, {"answered": len(session.question_history), "session": session.checkpoint()}, bank)
+            checkpoint_time += time.perf_counter() - checkpointed
+            answer_time += checkpointed - started
+
+    answers = args.sessions * args.answers
+    print(f"{answers} answers over {args.sessions} sessions")
+    print(f"  select + process answer   {answer_time / answers * 1e6:8.2f}us/answer")
+    print(f"  checkpoint + save         {checkpoint_time / answers * 1e6:8.2f}us/answer")
+    if args.dir:
+        started = time.perf_counter()
+        store.flush()
+        print(f"  background writes left    {time.perf_counter() - started:8.2f}s after the last save")
+
+    started = time.perf_counter()
+    for token in tokens:
+        state, questions = store.load(token)
+        AdaptiveFlashcardSystem.from_checkpoint(None, questions or bank, state["session"])
+    print(f"  load + restore session    {(time.perf_counter() - started) / args.sessions * 1e6:8.2f}us/session")
+    state, _ = store.load(tokens[0])
+    print(f"  checkpoint size (JSON)    {len(json.dumps(state)):8d} bytes after {args.answers} answers")
+    if args.dir:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
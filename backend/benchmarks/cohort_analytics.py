@@ -0,0 +1,129 @@
+"""Time the vectorized cohort analytics on a synthetic AnswerTable with 1M answer rows.
+
+With --store, the table is instead loaded from a ReportStore filled with that
+many answers (kept between runs), and the update after one more report is timed.
+
+    python -m benchmarks.cohort_analytics --rows 1000000
+    python -m benchmarks.cohort_analytics --rows 1000000 --store data/bench_reports.db
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from analytics import (AnswerTable, CohortAnalytics, Vocabulary, cohort_summary, difficulty_calibration,
+                       topic_accuracy)
+from question_bank import DIFFICULTIES
+from report_store import ReportStore
+
+
+def vocabulary(prefix, size):
+    vocab = Vocabulary()
+    for i in range(size):
+        vocab.code(f"{prefix} {i}")
+    return vocab
+
+
+def synthetic_table(rows, users, questions, topics, topics_per_question=2, seed=0):
+    rng = np.random.default_rng(seed)
+    question = rng.integers(0, questions, rows, dtype=np.int32)
+    difficulty = (question % 3).astype(np.int8)
+    attempts = rng.integers(1, 4, rows, dtype=np.int32)
+    # Harder questions are answered correctly less often
+    p_correct = np.array([0.8, 0.55, 0.3])[difficulty]
+    correct = rng.binomial(attempts, p_correct).astype(np.int32)
+    time = rng.gamma(2.0, 4.0 + 3.0 * difficulty, rows) * attempts
+    topic_row = np.repeat(np.arange(rows, dtype=np.int64), topics_per_question)
+    topic = ((question[topic_row] * 7 + np.tile(np.arange(topics_per_question), rows)) % topics).astype(np.int32)
+    return AnswerTable(
+        rng.integers(0, users, rows, dtype=np.int32), rng.integers(0, users * 10, rows, dtype=np.int32),
+        question, difficulty, attempts, correct, time, topic_row, topic,
+        vocabulary("user", users), vocabulary("test", users * 10),
+        vocabulary("question", questions), vocabulary("topic", topics),
+    )
+
+
+def synthetic_report(rng, answers, questions, topics):
+    detailed = []
+    for position in range(answers):
+        question = int(rng.integers(questions))
+        difficulty = question % 3
+        attempts = int(rng.integers(1, 4))
+        correct = int(rng.binomial(attempts, (0.8, 0.55, 0.3)[difficulty]))
+        detailed.append({
+            "id": position + 1, "question": f"question {question}", "difficulty": DIFFICULTIES[difficulty],
+            "user_attempts": attempts, "correct_attempts": correct, "accuracy": correct / attempts,
+            "average_time_taken": float(rng.gamma(2.0, 4.0 + 3.0 * difficulty)),
+            "options": {"A": "yes", "B": "no", "C": "maybe", "D": "never"}, "correctAnswer": "A",
+            "explanation": f"Explanation of question {question}.",
+            "related_topics": [f"topic {(question * 7 + i) % topics}" for i in range(2)], "related_links": [],
+        })
+    return {"total_questions": answers, "total_correct": sum(e["correct_attempts"] > 0 for e in detailed),
+            "detailed_question_performance": detailed}
+
+
+def filled_store(path, rows, users, questions, topics, answers_per_report=15, seed=0):
+    """A ReportStore at path holding at least rows answers; filling it takes a while, so it is reused."""
+    store = ReportStore(path)
+    have = store._connect().execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+    if have < rows:
+        rng = np.random.default_rng(seed + have)
+        started = time.perf_counter()
+        reports = store.revision()[0]
+        while have < rows:
+            batch = [(f"user{(reports + i) % users}", f"test{reports + i}",
+                      synthetic_report(rng, answers_per_report, questions, topics), None, None)
+                     for i in range(1000)]
+            store.save_reports(batch)
+            reports += len(batch)
+            have += len(batch) * answers_per_report
+        print(f"filled {path} to {have} answers in {time.perf_counter() - started:.1f}s")
+    return store
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"{label:<24} {time.perf_counter() - started:7.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--store", help="ReportStore database to load the table from (filled if needed)")
+    parser.add_argument("--blobs", action="store_true",
+                        help="with --store, also time a full rebuild from the report blobs")
+    args = parser.parse_args()
+
+    if args.store:
+        if os.path.dirname(args.store):
+            os.makedirs(os.path.dirname(args.store), exist_ok=True)
+        store = filled_store(args.store, args.rows, args.users, args.questions, args.topics)
+        analytics = CohortAnalytics(store=store)
+        table = timed("load from store", analytics.table)
+        print(f"{len(table)} answer rows from {store.revision()[0]} reports")
+        rng = np.random.default_rng(len(table))
+        store.save_report("bench@example.com", f"test-{time.time_ns()}",
+                          synthetic_report(rng, 15, args.questions, args.topics))
+        table = timed("update after 1 report", analytics.table)
+        timed("unchanged", analytics.table)
+        if args.blobs:
+            timed("rebuild from blobs", lambda: AnswerTable.from_reports(store.iter_reports()))
+    else:
+        table = timed(f"build {args.rows} rows", lambda: synthetic_table(
+            args.rows, args.users, args.questions, args.topics))
+    calibration = timed("difficulty_calibration", lambda: difficulty_calibration(table))
+    topics = timed("topic_accuracy", lambda: topic_accuracy(table))
+    summary = timed("cohort_summary", lambda: cohort_summary(table))
+    print(f"{len(calibration)} questions calibrated, "
+          f"{sum(q['miscalibrated'] for q in calibration)} miscalibrated, {len(topics)} topics")
+    print({difficulty: round(stats["accuracy"], 3) for difficulty, stats in summary["difficulty"].items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import statistics
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an unsorted list of samples."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(name, samples):
+    """Print count, mean, p50 and p99 for a list of latencies in seconds."""
+    if not samples:
+        print(f"{name}: no samples")
+        return
+    print(f"{name}: n={len(samples)} "
+          f"mean={statistics.fmean(samples) * 1000:.2f}ms "
+          f"p50={percentile(samples, 50) * 1000:.2f}ms "
+          f"p99={percentile(samples, 99) * 1000:.2f}ms")
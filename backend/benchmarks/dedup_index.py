@@ -0,0 +1,88 @@
+"""Index up to 1M synthetic questions in a DedupIndex and time near-duplicate lookups as it grows.
+
+    python -m benchmarks.dedup_index --questions 1000000 --queries 1000
+
+Lookups are one question at a time, as the generation pipeline stage makes
+them. Near-duplicate queries are indexed questions with a word dropped from
+the stem and the options reshuffled; fresh queries are new random questions,
+so any match for them is a false positive.
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import summarize_latencies
+from dedup_index import DedupIndex
+from llm_clients import synthetic_question
+
+SET_SIZE = 30
+
+
+def variant(question, rng):
+    words = question["question"].rstrip("?").split()
+    del words[rng.randrange(len(words))]
+    options = list(question["options"].values())
+    rng.shuffle(options)
+    return dict(question, question=" ".join(words) + "?", options=dict(zip("ABCD", options)))
+
+
+def measure(index, questions, rng, queries):
+    near = [variant(questions[rng.randrange(len(questions))], rng) for _ in range(queries)]
+    fresh = [synthetic_question(rng, 0, "Easy") for _ in range(queries)]
+    latencies, found, false_positives = [], 0, 0
+    for batch, is_near in ((near, True), (fresh, False)):
+        for question in batch:
+            started = time.perf_counter()
+            match = index.find(question)
+            latencies.append(time.perf_counter() - started)
+            if is_near:
+                found += match is not None
+            else:
+                false_positives += match is not None
+    summarize_latencies(f"  lookup at {len(index):>9,} questions", latencies)
+    print(f"  near-duplicate recall {found / queries * 100:.1f}%, "
+          f"false positives {false_positives / queries * 100:.2f}%")
+
+
+def memory(index):
+    arrays = [index._fingerprints.data, index._set_index.data, index._question_ids.data, index._pending.data]
+    arrays += index._keys + index._ids
+    return sum(array.nbytes for array in arrays)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    questions = [synthetic_question(rng, i % SET_SIZE + 1, "Medium") for i in range(args.questions)]
+    print(f"generated {len(questions):,} questions in {time.perf_counter() - started:.1f}s")
+
+    index = DedupIndex()
+    checkpoints = sorted({n for n in (10_000, 100_000, args.questions) if n <= args.questions})
+    signing = adding = 0.0
+    indexed = 0
+    for checkpoint in checkpoints:
+        for start in range(indexed, checkpoint, SET_SIZE * 400):
+            batch = questions[start:min(start + SET_SIZE * 400, checkpoint)]
+            t0 = time.perf_counter()
+            signatures = index.signatures(batch)
+            t1 = time.perf_counter()
+            for offset in range(0, len(batch), SET_SIZE):
+                index.add_signatures(signatures[offset:offset + SET_SIZE], f"set{(start + offset) // SET_SIZE}",
+                                     [q["id"] for q in batch[offset:offset + SET_SIZE]])
+            t2 = time.perf_counter()
+            signing += t1 - t0
+            adding += t2 - t1
+        indexed = checkpoint
+        print(f"{indexed:,} indexed: signing {indexed / signing:,.0f} questions/s, "
+              f"inserting {indexed / adding:,.0f} questions/s, {memory(index) / 2 ** 20:.0f} MiB")
+        measure(index, questions[:indexed], rng, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Resolve a quiz results page's embed links against a fake search backend with simulated latency.
+
+Compares one sequential lookup per question (the old /get_embed_link flow)
+with EmbedLinkResolver.resolve_many, cold and warm.
+
+    python -m benchmarks.embed_links --questions 24 --latency 0.2
+"""
+import argparse
+import time
+
+from tests.fakes import FakeSearchBackend
+from youtubevideo import EmbedLinkResolver
+
+
+def related_topics(questions, distinct):
+    # Generated sets reuse topics heavily, so only `distinct` keyword sets occur
+    return [[f"Topic {i % distinct}", "Machine Learning"] for i in range(questions)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=24)
+    parser.add_argument("--distinct", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+    keyword_lists = related_topics(args.questions, args.distinct)
+
+    backend = FakeSearchBackend(args.latency)
+    started = time.perf_counter()
+    for keywords in keyword_lists:
+        backend.search(" ".join(keywords))
+    print(f"sequential, uncached   {time.perf_counter() - started:6.2f}s  {backend.calls} searches")
+
+    backend = FakeSearchBackend(args.latency)
+    resolver = EmbedLinkResolver(backend=backend, max_workers=args.workers)
+    for label in ("resolve_many, cold", "resolve_many, warm"):
+        started = time.perf_counter()
+        links = resolver.resolve_many(keyword_lists)
+        print(f"{label:<22} {time.perf_counter() - started:6.2f}s  {backend.calls} searches total")
+    assert len(links) == len(keyword_lists) and all(links)
+    print(resolver.stats())
+
+
+if __name__ == "__main__":
+    main()
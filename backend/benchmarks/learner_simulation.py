@@ -0,0 +1,58 @@
+"""Run seeded synthetic learners through the adaptive engines and report throughput and policy quality.
+
+Everything except wall-clock throughput is deterministic for a given seed,
+so runs can be compared across commits to catch regressions.
+
+    python -m benchmarks.learner_simulation --sessions 5000 --engine flashcard quiz
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks.common import percentile
+from benchmarks.question_selection import synthetic_questions
+from flashcard_system import load_question_file
+from question_bank import QuestionBank
+from simulation import ENGINES, memory_per_session, simulate
+
+
+def report(engine_name, bank, sessions, answers, seed):
+    started = time.perf_counter()
+    results = simulate(engine_name, bank, sessions, answers, seed)
+    elapsed = time.perf_counter() - started
+    engine_time = sum(result.elapsed for result in results)
+    selections = sessions * answers
+    reached = [result.answers_to_target for result in results if result.answers_to_target is not None]
+
+    print(f"{engine_name}: {sessions} sessions x {answers} answers in {elapsed:.2f}s")
+    print(f"  sessions/s            {sessions / elapsed:10.0f}")
+    print(f"  selections/s          {selections / elapsed:10.0f}  ({engine_time / selections * 1e6:.1f}us in engine)")
+    print(f"  memory/session        {memory_per_session(engine_name, bank, answers=answers, seed=seed):10.0f} bytes")
+    print(f"  reached target        {len(reached) / sessions:10.1%}")
+    if reached:
+        print(f"  answers to target     p50={percentile(reached, 50)} p90={percentile(reached, 90)} "
+              f"mean={statistics.fmean(reached):.2f}")
+    print(f"  time on target        {statistics.fmean(r.time_on_target for r in results):10.1%}")
+    print(f"  accuracy              {sum(r.correct for r in results) / selections:10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--engine", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--answers", type=int, default=15)
+    parser.add_argument("--questions-file", help="defaults to a synthetic bank")
+    parser.add_argument("--bank-size", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.questions_file:
+        bank = QuestionBank(load_question_file(args.questions_file))
+    else:
+        bank = QuestionBank(synthetic_questions(args.bank_size))
+    for engine_name in args.engine:
+        report(engine_name, bank, args.sessions, args.answers, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Harness for live mode: a fake generator publishes questions at a fixed rate while clients quiz.
+
+Reports time-to-first-question for clients that connect as generation starts,
+against the time the whole set takes to generate.
+
+    python -m benchmarks.live_generation --clients 50 --questions 60 --rate 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import websockets
+
+from benchmarks.common import summarize_latencies
+from benchmarks.question_selection import synthetic_questions
+from question_channel import QuestionChannel
+from websocket_server import FlashcardWebSocketServer
+
+
+def fake_generator(channel, count, rate, finished):
+    """Publish count questions from a worker thread, one every 1/rate seconds."""
+    questions = synthetic_questions(count)
+    random.Random(0).shuffle(questions)
+    for question in questions:
+        time.sleep(1 / rate)
+        channel.publish("benchmark", question)
+    channel.end_set("benchmark")
+    finished.append(time.perf_counter())
+
+
+async def quiz_client(uri, rng, first_question_times, started):
+    async with websockets.connect(uri) as websocket:
+        message = json.loads(await websocket.recv())
+        while message["type"] == "session":
+            message = json.loads(await websocket.recv())
+        first_question_times.append(time.perf_counter() - started)
+        while message["type"] != "report":
+            if message["type"] == "question":
+                await websocket.send(json.dumps({"answer": rng.choice("ABCD"), "time_taken": 1.0}))
+            message = json.loads(await websocket.recv())
+
+
+async def run(clients, count, rate, questions_per_session):
+    channel = QuestionChannel()
+    quiz_server = FlashcardWebSocketServer("127.0.0.1", 0, "output.json",
+                                           questions_per_session=questions_per_session,
+                                           live_channel=channel)
+    async with await quiz_server.serve("127.0.0.1", 0) as server:
+        uri = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        finished = []
+        # Announce the set on the loop so every client below joins the live bank
+        channel.begin_set("benchmark")
+        started = time.perf_counter()
+        producer = threading.Thread(target=fake_generator, args=(channel, count, rate, finished))
+        producer.start()
+        first_question_times = []
+        await asyncio.gather(*(
+            quiz_client(uri, random.Random(i), first_question_times, started) for i in range(clients)
+        ))
+        await asyncio.to_thread(producer.join)
+
+    print(f"{count} questions generated at {rate}/s in {finished[0] - started:.2f}s")
+    summarize_latencies("time to first question (live)", first_question_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--rate", type=float, default=20.0, help="questions published per second")
+    parser.add_argument("--questions-per-session", type=int, default=15)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.questions, args.rate, args.questions_per_session))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure what the metrics instrumentation costs, per call and per quiz session.
+
+    python -m benchmarks.metrics_overhead --sessions 2000 --questions-file output.json
+
+Sessions run through FlashcardWebSocketServer.handle_client over an in-memory
+connection, so the comparison is server CPU time with no network noise;
+metrics are switched on and off between alternating rounds.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+import metrics
+from websocket_server import FlashcardWebSocketServer
+
+
+class ScriptedConnection:
+    """Stands in for a client connection: answers every question immediately."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.request = SimpleNamespace(path="/?user=bench")
+
+    async def send(self, frame):
+        pass
+
+    async def recv(self):
+        return json.dumps({"answer": self.rng.choice("ABCD"), "time_taken": self.rng.uniform(1, 20)})
+
+
+def per_call_ns(function, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def micro(calls):
+    histogram = metrics.MetricsRegistry().histogram("bench_seconds", "Benchmark histogram.")
+
+    def timed():
+        with histogram.time():
+            pass
+
+    baseline = per_call_ns(lambda: None, calls)
+    print(f"observe():        {per_call_ns(lambda: histogram.observe(0.003), calls) - baseline:7.1f} ns/call")
+    print(f"with time():      {per_call_ns(timed, calls) - baseline:7.1f} ns/call")
+    histogram.registry.enabled = False
+    print(f"observe() (off):  {per_call_ns(lambda: histogram.observe(0.003), calls) - baseline:7.1f} ns/call")
+
+
+async def run_sessions(server, sessions, seed):
+    started = time.perf_counter()
+    for i in range(sessions):
+        await server.handle_client(ScriptedConnection(random.Random(seed + i)))
+    return time.perf_counter() - started
+
+
+async def macro(sessions, rounds, questions_file, seed):
+    server = FlashcardWebSocketServer(None, None, questions_file)
+    await run_sessions(server, 50, seed)  # warm the bank cache and frame cache
+    timings = {True: [], False: []}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            metrics.registry.enabled = enabled
+            timings[enabled].append(await run_sessions(server, sessions, seed))
+    metrics.registry.enabled = True
+
+    answers = sessions * server.questions_per_session
+    off, on = statistics.median(timings[False]), statistics.median(timings[True])
+    print(f"{sessions} sessions x {server.questions_per_session} answers, median of {rounds} rounds")
+    print(f"metrics off: {off / answers * 1e6:7.2f} us/answer")
+    print(f"metrics on:  {on / answers * 1e6:7.2f} us/answer  ({(on - off) / off * 100:+.1f}%)")
+    # 2 sends, 1 recv, 1 select and 1 process observation per answer, plus the session and report
+    print(f"observations recorded: {metrics.WS_SEND_SECONDS.count + metrics.WS_RECV_SECONDS.count}"
+          f" send/recv, {metrics.SELECT_QUESTION_SECONDS.count} select")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--questions-file", default="output.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    micro(args.calls)
+    asyncio.run(macro(args.sessions, args.rounds, args.questions_file, args.seed))
+
+
+if __name__ == "__main__":
+    main()
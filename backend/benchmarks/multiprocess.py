@@ -0,0 +1,126 @@
+"""Load test the multi-process launcher: connections/s and latency percentiles against worker count.
+
+Each run starts `launcher.py --workers N` on a fresh port. Client processes
+then open full quiz sessions as fast as they can, with no think time.
+Client and server share the machine's cores, so keep --client-procs modest.
+
+    python -m benchmarks.multiprocess --workers 1 2 4 --sessions 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+
+from benchmarks.common import percentile
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def session(uri, connect_times, latencies):
+    started = time.perf_counter()
+    async with websockets.connect(uri, compression=None) as websocket:
+        message = json.loads(await websocket.recv())
+        connect_times.append(time.perf_counter() - started)
+        while message["type"] != "report":
+            if message["type"] == "question":
+                sent = time.perf_counter()
+                await websocket.send(json.dumps({"answer": "A", "time_taken": 1.0}))
+                message = json.loads(await websocket.recv())
+                latencies.append(time.perf_counter() - sent)
+            else:
+                message = json.loads(await websocket.recv())
+
+
+async def drive(uri, sessions, concurrency):
+    connect_times, latencies, failures = [], [], 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            try:
+                await session(uri, connect_times, latencies)
+            except (OSError, websockets.exceptions.WebSocketException):
+                failures += 1
+
+    await asyncio.gather(*(one() for _ in range(sessions)))
+    return connect_times, latencies, failures
+
+
+def client_process(args):
+    return asyncio.run(drive(*args))
+
+
+def run(workers, args):
+    port = free_port()
+    checkpoint_dir = tempfile.mkdtemp(prefix="checkpoints-")
+    server = subprocess.Popen(
+        [sys.executable, "launcher.py", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+         "--questions-file", args.questions_file, "--checkpoint-dir", checkpoint_dir, "--drain-timeout", "5"],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        time.sleep(0.5 * workers)  # let every worker bind
+        uri = f"ws://127.0.0.1:{port}/"
+        per_client = [(uri, args.sessions // args.client_procs, max(1, args.concurrency // args.client_procs))
+                      for _ in range(args.client_procs)]
+        started = time.perf_counter()
+        with multiprocessing.Pool(args.client_procs) as pool:
+            results = pool.map(client_process, per_client)
+        elapsed = time.perf_counter() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(30)
+
+    connect_times = [t for result in results for t in result[0]]
+    latencies = [t for result in results for t in result[1]]
+    failures = sum(result[2] for result in results)
+    print(f"{workers:>7} {len(connect_times) / elapsed:12.0f} {len(latencies) / elapsed:10.0f} "
+          f"{percentile(connect_times, 50) * 1000:9.1f} {percentile(connect_times, 99) * 1000:9.1f} "
+          f"{percentile(latencies, 50) * 1000:9.1f} {percentile(latencies, 99) * 1000:9.1f} {failures:8d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--client-procs", type=int, default=2)
+    parser.add_argument("--questions-file", default="output.json")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions, {args.concurrency} concurrent, {args.client_procs} client processes, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>7} {'conns/s':>12} {'answers/s':>10} {'conn p50':>9} {'conn p99':>9} "
+          f"{'ans p50':>9} {'ans p99':>9} {'failures':>8}")
+    for workers in args.workers:
+        run(workers, args)
+
+
+if __name__ == "__main__":
+    main()
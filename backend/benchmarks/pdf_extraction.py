@@ -0,0 +1,86 @@
+"""Compare serial and parallel extraction of a synthetic 500-page PDF, plus a cached re-run.
+
+    python -m benchmarks.pdf_extraction --pages 500 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from pdf_extraction import PageTextCache, extract_pages
+
+
+def write_synthetic_pdf(path, pages, lines_per_page=40):
+    """Write a minimal valid PDF with one Helvetica text stream per page."""
+    objects = []
+    font_id = 3
+    page_ids = []
+    for page in range(pages):
+        lines = " T* ".join(
+            f"(Page {page + 1} line {line + 1}: gradient descent minimises a differentiable loss.) Tj"
+            for line in range(lines_per_page)
+        )
+        stream = f"BT /F1 10 Tf 12 TL 40 780 Td {lines} ET".encode()
+        content_id = 4 + 2 * page
+        page_id = content_id + 1
+        page_ids.append(page_id)
+        objects.append((content_id, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"))
+        objects.append((page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects.append((1, b"<< /Type /Catalog /Pages 2 0 R >>"))
+    objects.append((2, f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode()))
+    objects.append((font_id, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"))
+    objects.sort()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for object_id, body in objects:
+            offsets[object_id] = f.tell()
+            f.write(b"%d 0 obj\n" % object_id + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for object_id, _ in objects:
+            f.write(b"%010d 00000 n \n" % offsets[object_id])
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(objects) + 1, xref_offset))
+
+
+def timed(label, pages, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed:7.2f}s  {pages / elapsed:8.1f} pages/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "synthetic.pdf")
+        write_synthetic_pdf(pdf_path, args.pages)
+
+        serial = timed("serial, no cache", args.pages,
+                       lambda: extract_pages(pdf_path, workers=1, cache=None))
+        parallel = timed(f"parallel x{args.workers}, no cache", args.pages,
+                         lambda: extract_pages(pdf_path, workers=args.workers, cache=None))
+        assert serial == parallel, "parallel extraction returned different text"
+
+        cache = PageTextCache(os.path.join(tmp, "cache"))
+        timed("parallel, cold cache", args.pages,
+              lambda: extract_pages(pdf_path, workers=args.workers, cache=cache))
+        # A fresh cache object forces the re-upload case to read from disk
+        timed("re-upload, warm disk cache", args.pages,
+              lambda: extract_pages(pdf_path, workers=args.workers,
+                                    cache=PageTextCache(os.path.join(tmp, "cache"))))
+
+
+if __name__ == "__main__":
+    main()
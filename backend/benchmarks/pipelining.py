@@ -0,0 +1,144 @@
+"""Session wall time for the sequential and pipelined exchanges behind a latency-injecting proxy.
+
+The proxy delays every chunk by half the RTT in each direction. Simulated
+learners think for --think seconds per question. With lookahead they check
+their answer against the question's correctAnswer and start reading the
+prefetched next question straight away. They still wait for the server to
+confirm that question before they answer it.
+
+    python -m benchmarks.pipelining --rtt 100 200 300 --clients 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import websockets
+
+from websocket_server import FlashcardWebSocketServer
+
+MODES = {
+    "sequential": "",
+    "pipelined": "?pipeline=1",
+    "pipelined+lookahead": "?pipeline=1&lookahead=2",
+}
+
+
+class LatencyProxy:
+    """TCP proxy that delivers each chunk one_way_delay seconds after it was read, in order."""
+
+    def __init__(self, target_port, one_way_delay):
+        self.target_port = target_port
+        self.delay = one_way_delay
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        await asyncio.gather(self._pipe(client_reader, upstream_writer), self._pipe(upstream_reader, client_writer),
+                             return_exceptions=True)
+
+    async def _pipe(self, reader, writer):
+        chunks = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                deliver_at, data = await chunks.get()
+                await asyncio.sleep(max(0.0, deliver_at - time.perf_counter()))
+                if not data:
+                    writer.close()
+                    return
+                writer.write(data)
+                await writer.drain()
+
+        delivery = asyncio.create_task(deliver())
+        while True:
+            data = await reader.read(65536)
+            chunks.put_nowait((time.perf_counter() + self.delay, data))
+            if not data:
+                break
+        await delivery
+
+
+def messages(frame):
+    message = json.loads(frame)
+    if message["type"] == "batch":
+        return message["messages"]
+    return [message]
+
+
+async def learner(uri, think, accuracy, rng):
+    started = time.perf_counter()
+    upcoming = {}    # prefetched candidates for the question after the one being shown
+    candidates = {}  # candidates for the question after the answer in flight
+    ready_at = None  # when the learner finished reading the candidate matching its answer
+    outcome = None
+    async with websockets.connect(uri) as websocket:
+        while True:
+            for message in messages(await websocket.recv()):
+                kind = message["type"]
+                if kind == "prefetch":
+                    upcoming[message["outcome"]] = message["data"]
+                elif kind == "question":
+                    question = message["data"]
+                    if ready_at is not None and candidates[outcome]["id"] == question["id"]:
+                        # Already read while the answer was in flight
+                        await asyncio.sleep(max(0.0, ready_at - time.perf_counter()))
+                    else:
+                        await asyncio.sleep(think)
+                    candidates, upcoming = upcoming, {}
+                    is_correct = rng.random() < accuracy
+                    answer = question["correctAnswer"] if is_correct else next(
+                        option for option in question["options"] if option != question["correctAnswer"])
+                    outcome = "correct" if is_correct else "wrong"
+                    await websocket.send(json.dumps({"answer": answer, "time_taken": think}))
+                    ready_at = time.perf_counter() + think if outcome in candidates else None
+                elif kind == "report":
+                    return time.perf_counter() - started
+
+
+async def run_mode(server_port, rtt, mode, clients, think, accuracy, seed):
+    proxy = LatencyProxy(server_port, rtt / 2)
+    port = await proxy.start()
+    uri = f"ws://127.0.0.1:{port}/{MODES[mode]}"
+    try:
+        return await asyncio.gather(*(
+            learner(uri, think, accuracy, random.Random(seed + i)) for i in range(clients)
+        ))
+    finally:
+        proxy.server.close()
+
+
+async def run(args):
+    quiz_server = FlashcardWebSocketServer("127.0.0.1", 0, args.questions_file,
+                                           questions_per_session=args.questions)
+    async with websockets.serve(quiz_server.handle_client, "127.0.0.1", 0) as server:
+        server_port = server.sockets[0].getsockname()[1]
+        print(f"{args.clients} clients x {args.questions} questions, {args.think * 1000:.0f}ms think time")
+        print(f"{'rtt':>6} {'mode':<22} {'mean session':>13} {'per question':>13}")
+        for rtt_ms in args.rtt:
+            for mode in MODES:
+                times = await run_mode(server_port, rtt_ms / 1000, mode, args.clients, args.think,
+                                       args.accuracy, args.seed)
+                mean = statistics.fmean(times)
+                print(f"{rtt_ms:>4}ms {mode:<22} {mean:12.2f}s {mean / args.questions * 1000:11.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rtt", type=int, nargs="+", default=[100, 200, 300], help="round trip times in ms")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--think", type=float, default=0.3)
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--questions-file", default="output.json")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Time per-answer Q-learning updates against the batched update_many path and offline pre-training.
+
+    python -m benchmarks.q_learning --transitions 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from Adaptive_Collaborator import (DIFFICULTY_LEVELS, compute_rewards, pretrain_policy,
+                                   q_learning_batch_update)
+
+
+def synthetic_sessions(sessions, length, seed=0):
+    rng = np.random.default_rng(seed)
+    difficulty = rng.integers(0, 3, (sessions, length))
+    correct = rng.random((sessions, length)) < np.array([0.8, 0.55, 0.3])[difficulty]
+    time_taken = rng.gamma(2.0, 4.0 + 3.0 * difficulty)
+    return [[{'difficulty': DIFFICULTY_LEVELS[d], 'correct': bool(c), 'time_taken': float(t)}
+             for d, c, t in zip(*row)] for row in zip(difficulty, correct, time_taken)]
+
+
+def scalar_updates(q_table, states, actions, rewards, learning_rate=0.1, discount_factor=0.9):
+    """The per-answer update from AdaptiveQuizSystem.process_answer, one transition at a time."""
+    for state, action, reward in zip(states.tolist(), actions.tolist(), rewards.tolist()):
+        q_table[state, action] += learning_rate * (
+            reward + discount_factor * q_table[action].max() - q_table[state, action])
+
+
+def timed(label, fn, operations):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed:8.3f}s  {elapsed / operations * 1e6:8.3f}us/transition")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--epochs", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    states = rng.integers(0, 3, args.transitions)
+    actions = rng.integers(0, 3, args.transitions)
+    rewards = compute_rewards(rng.random(args.transitions) < 0.6, rng.gamma(2.0, 5.0, args.transitions), states)
+
+    print(f"{args.transitions} transitions")
+    timed("per-answer updates", lambda: scalar_updates(np.zeros((3, 3)), states, actions, rewards),
+          args.transitions)
+    timed("update_many (one batch)", lambda: q_learning_batch_update(
+        np.zeros((3, 3)), states, actions, rewards, 0.1, 0.9), args.transitions)
+
+    sessions = synthetic_sessions(args.sessions, 15)
+    logged = args.sessions * 14 * args.epochs
+    policy = timed(f"pretrain_policy x{args.epochs} epochs", lambda: pretrain_policy(sessions, args.epochs), logged)
+    print(np.round(policy, 2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure chunked generation throughput against a fake LLM at several concurrency limits.
+
+    python -m benchmarks.question_generation --pages 200 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+
+from generation_pipeline import chunk_text, estimate_tokens, generate_question_set
+from llm_clients import FakeLLMClient
+from questiongeneration import build_prompt
+
+
+def synthetic_document(pages, words_per_page=450):
+    sentence = "Regularisation penalises large weights so the model generalises beyond its training data."
+    words_per_sentence = len(sentence.split())
+    paragraph = " ".join([sentence] * (words_per_page // words_per_sentence))
+    return "\n\n".join(f"Page {page}. {paragraph}" for page in range(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM seconds per call")
+    parser.add_argument("--chunk-tokens", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    text = synthetic_document(args.pages)
+    chunks = chunk_text(text, args.chunk_tokens)
+    print(f"document: ~{estimate_tokens(text)} tokens in {len(chunks)} chunks of <= {args.chunk_tokens} tokens")
+
+    for concurrency in args.concurrency:
+        client = FakeLLMClient(latency=args.latency)
+        first_question = []
+        started = time.perf_counter()
+
+        def on_question(question):
+            if not first_question:
+                first_question.append(time.perf_counter() - started)
+
+        questions = asyncio.run(generate_question_set(
+            text, args.questions, client, build_prompt,
+            max_chunk_tokens=args.chunk_tokens, concurrency=concurrency, on_question=on_question
+        ))
+        elapsed = time.perf_counter() - started
+        difficulties = {d: sum(q["difficulty"] == d for q in questions) for d in ("Easy", "Medium", "Hard")}
+        print(f"concurrency {concurrency:>3}: {client.calls} calls in {elapsed:6.2f}s "
+              f"({client.calls / elapsed:6.1f} calls/s), first question after {first_question[0]:.3f}s, "
+              f"{len(questions)} questions {difficulties}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare list-filtering selection against QuestionBank sampling as the bank grows.
+
+    python -m benchmarks.question_selection --sizes 1000 10000 100000
+"""
+import argparse
+import random
+import time
+
+from Adaptive_Collaborator import AdaptiveQuizSystem
+from question_bank import DIFFICULTIES, QuestionBank
+
+
+def synthetic_questions(count):
+    return [{
+        "id": i + 1,
+        "difficulty": DIFFICULTIES[i % 3],
+        "question": f"Synthetic question {i + 1}",
+        "options": {"A": "a", "B": "b", "C": "c", "D": "d"},
+        "correctAnswer": "A",
+        "explanation": "",
+        "related_topics": [],
+        "related_links": [],
+    } for i in range(count)]
+
+
+def filter_select(questions, difficulty, history):
+    # The selection previously used by AdaptiveQuizSystem._select_question
+    available = [q for q in questions if q['difficulty'] == difficulty and q not in history[-5:]]
+    return random.choice(available or [q for q in questions if q['difficulty'] == difficulty])
+
+
+def time_per_call(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        questions = synthetic_questions(size)
+        history = random.sample(questions, 5)
+        bank = QuestionBank(questions)
+        quiz = AdaptiveQuizSystem(bank)
+        quiz.recent_question_ids.extend(q['id'] for q in history)
+
+        filtered = time_per_call(lambda: filter_select(questions, "Medium", history), args.iterations)
+        indexed = time_per_call(lambda: quiz._select_question("Medium"), args.iterations * 100)
+        print(f"{size:>8} questions: list filter {filtered * 1e6:10.1f}us  "
+              f"QuestionBank.sample {indexed * 1e6:6.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Microbenchmark RepetitionScheduler against the old sorted-list queue.
+
+    python -m benchmarks.scheduler --entries 1000000
+"""
+import argparse
+import random
+import time
+
+from scheduler import RepetitionScheduler
+
+
+def timed(label, fn, operations):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed:8.3f}s  {elapsed / operations * 1e6:8.3f}us/op")
+    return result
+
+
+def bench_heap(entries, questions):
+    print(f"RepetitionScheduler, {entries} entries")
+    scheduler = RepetitionScheduler()
+    times = [random.random() * 1000 for _ in range(entries)]
+
+    def insert():
+        for i, review_time in enumerate(times):
+            scheduler.schedule(questions[i % len(questions)], review_time)
+
+    timed("schedule", insert, entries)
+    timed("pop_all_due (first half)", lambda: scheduler.pop_all_due(500.0), entries // 2)
+
+    def pop_one_by_one():
+        popped = 0
+        while scheduler.pop_due(1000.0) is not None:
+            popped += 1
+        return popped
+
+    timed("pop_due until empty", pop_one_by_one, entries // 2)
+
+
+def bench_sorted_list(entries, questions):
+    print(f"sorted list + pop(0), {entries} entries")
+    queue = []
+    times = [random.random() * 1000 for _ in range(entries)]
+
+    def insert():
+        # Mirrors the previous schedule_for_repetition: append then re-sort
+        for i, review_time in enumerate(times):
+            queue.append((review_time, questions[i % len(questions)]))
+            queue.sort(key=lambda x: x[0])
+
+    timed("append + sort", insert, entries)
+
+    def pop_front():
+        while queue and queue[0][0] <= 1000.0:
+            queue.pop(0)
+
+    timed("pop(0) until empty", pop_front, entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--list-entries", type=int, default=20_000,
+                        help="the list baseline is quadratic, so it runs on a smaller queue")
+    parser.add_argument("--distinct-questions", type=int, default=50_000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    questions = [{"id": i} for i in range(args.distinct_questions)]
+    bench_heap(args.entries, questions)
+    bench_sorted_list(args.list_entries, questions)
+
+
+if __name__ == "__main__":
+    main()
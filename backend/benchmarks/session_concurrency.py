@@ -0,0 +1,67 @@
+"""Drive N simulated clients through a full quiz and report per-message latency.
+
+    python -m benchmarks.session_concurrency --clients 200 --questions-file output.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import websockets
+
+from benchmarks.common import summarize_latencies
+from websocket_server import FlashcardWebSocketServer
+
+
+async def simulated_client(uri, rng, latencies, connect_times):
+    started = time.perf_counter()
+    async with websockets.connect(uri) as websocket:
+        message = json.loads(await websocket.recv())
+        # The session message with the resume token comes first
+        while message["type"] == "session":
+            message = json.loads(await websocket.recv())
+        connect_times.append(time.perf_counter() - started)
+        while message["type"] != "report":
+            if message["type"] == "question":
+                sent = time.perf_counter()
+                await websocket.send(json.dumps({
+                    "answer": rng.choice("ABCD"),
+                    "time_taken": rng.uniform(1, 20)
+                }))
+                message = json.loads(await websocket.recv())
+                latencies.append(time.perf_counter() - sent)
+            else:
+                message = json.loads(await websocket.recv())
+
+
+async def run(clients, questions_file, seed):
+    quiz_server = FlashcardWebSocketServer("127.0.0.1", 0, questions_file)
+    async with websockets.serve(quiz_server.handle_client, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        uri = f"ws://127.0.0.1:{port}"
+        latencies, connect_times = [], []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            simulated_client(uri, random.Random(seed + i), latencies, connect_times)
+            for i in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    print(f"{clients} clients x {quiz_server.questions_per_session} questions in {elapsed:.2f}s "
+          f"(bank reloads: {quiz_server.sessions.bank.reloads})")
+    summarize_latencies("connect -> first question", connect_times)
+    summarize_latencies("answer -> answer_result", latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--questions-file", default="output.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.clients, args.questions_file, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Measure cold start: import time and time to the first served request, each in a fresh interpreter.
+
+    python -m benchmarks.startup --runs 5 --budget 2.0
+
+With --budget, exits non-zero if any target's median time to first request
+exceeds it, so a container build can enforce the cold-start budget.
+"""
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+from websockets.exceptions import WebSocketException
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def http_probe(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/cache/stats", timeout=1) as response:
+        response.read()
+
+
+def websocket_probe(port, path="/"):
+    async def first_question():
+        async with websockets.connect(f"ws://127.0.0.1:{port}{path}", open_timeout=1) as websocket:
+            while json.loads(await websocket.recv())["type"] != "question":
+                pass
+    asyncio.run(first_question())
+
+
+TARGETS = {
+    # name: (module imported, server command, probe)
+    "api": ("api", lambda port: ["-c", f"import api; api.app.run(port={port}, use_reloader=False)"], http_probe),
+    "asgi": ("asgi_app", lambda port: ["-m", "uvicorn", "asgi_app:app", "--port", str(port),
+                                       "--log-level", "warning"], http_probe),
+    "websocket": ("websocket_server", lambda port: [
+        "-c", "import asyncio; from websocket_server import FlashcardWebSocketServer; "
+              f"asyncio.run(FlashcardWebSocketServer('127.0.0.1', {port}, 'output.json').start_server())"
+    ], websocket_probe),
+}
+
+
+def import_time(module):
+    output = subprocess.run(
+        [sys.executable, "-c", f"import time; t = time.perf_counter(); import {module}; "
+                               "print(time.perf_counter() - t)"],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.split()[-1])
+
+
+def time_to_first_request(command, probe, timeout=30):
+    """Seconds from spawning the server process until probe(port) first succeeds."""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable] + command(port), stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with {process.returncode}")
+            try:
+                probe(port)
+                return time.perf_counter() - started
+            except (OSError, WebSocketException, asyncio.TimeoutError):
+                time.sleep(0.01)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", nargs="+", choices=sorted(TARGETS), default=sorted(TARGETS))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, help="seconds allowed to the first request")
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'target':>10} {'import p50':>11} {'import max':>11} {'first req p50':>14} {'first req max':>14}")
+    for name in args.targets:
+        module, command, probe = TARGETS[name]
+        imports = [import_time(module) for _ in range(args.runs)]
+        first = [time_to_first_request(command, probe) for _ in range(args.runs)]
+        print(f"{name:>10} {statistics.median(imports) * 1000:9.0f}ms {max(imports) * 1000:9.0f}ms "
+              f"{statistics.median(first) * 1000:12.0f}ms {max(first) * 1000:12.0f}ms")
+        if args.budget is not None and statistics.median(first) > args.budget:
+            over_budget.append(name)
+    if over_budget:
+        print(f"Over the {args.budget}s cold-start budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
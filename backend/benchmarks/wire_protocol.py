@@ -0,0 +1,107 @@
+"""Compare bytes per session and encode CPU per message for the JSON and compact wire protocols.
+
+Sessions are played once through AdaptiveFlashcardSystem, then the same
+message sequence is encoded with each protocol. Deflated sizes approximate
+permessage-deflate with context takeover (one zlib stream per connection).
+
+    python -m benchmarks.wire_protocol --sessions 500 --questions-file output.json
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+
+from flashcard_system import AdaptiveFlashcardSystem, load_question_file
+from question_bank import QuestionBank
+from wire_protocol import CompactProtocol, JsonProtocol, QuestionFrameCache, msgpack
+
+
+def play_sessions(bank, sessions, answers, seed):
+    """Return one [(kind, payload), ...] trace of outgoing messages per session."""
+    random.seed(seed)
+    traces = []
+    for _ in range(sessions):
+        session = AdaptiveFlashcardSystem(None, questions=bank)
+        trace = []
+        for _ in range(answers):
+            question = session.select_question()
+            trace.append(("question", question))
+            is_correct = session.process_answer(question, random.choice("ABCD"), random.uniform(1, 30))
+            trace.append(("answer_result", (question, is_correct)))
+            session.adjust_difficulty()
+        trace.append(("report", session.generate_report()))
+        traces.append(trace)
+    return traces
+
+
+def legacy_encode(kind, payload, bank):
+    # What websocket_server.py sent before the protocol layer: json.dumps per send
+    if kind == "question":
+        return json.dumps({"type": "question", "data": payload})
+    if kind == "answer_result":
+        question, is_correct = payload
+        return json.dumps({"type": "answer_result", "data": {
+            "is_correct": is_correct,
+            "correct_answer": question["correctAnswer"],
+            "question": question["question"],
+            "explanation": question.get("explanation", "No explanation provided.")
+        }})
+    return json.dumps({"type": "report", "data": payload})
+
+
+def protocol_encoder(protocol):
+    def encode(kind, payload, bank):
+        if kind == "question":
+            return protocol.question(payload, bank)
+        if kind == "answer_result":
+            return protocol.answer_result(*payload)
+        return protocol.report(payload)
+    return encode
+
+
+def measure(label, make_encoder, traces, bank):
+    raw_bytes = deflated_bytes = messages = 0
+    cpu = 0.0
+    for trace in traces:
+        encode = make_encoder()
+        compressor = zlib.compressobj(wbits=-15)
+        for kind, payload in trace:
+            started = time.perf_counter()
+            frame = encode(kind, payload, bank)
+            cpu += time.perf_counter() - started
+            data = frame.encode() if isinstance(frame, str) else frame
+            raw_bytes += len(data)
+            # permessage-deflate strips the 4-byte sync flush trailer
+            deflated_bytes += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+            messages += 1
+    sessions = len(traces)
+    print(f"{label:<18} {raw_bytes / sessions:10.0f} {deflated_bytes / sessions:10.0f} "
+          f"{cpu / messages * 1e6:10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--answers", type=int, default=15)
+    parser.add_argument("--questions-file", default="output.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bank = QuestionBank(load_question_file(args.questions_file))
+    traces = play_sessions(bank, args.sessions, args.answers, args.seed)
+    cache = QuestionFrameCache()
+
+    print(f"{args.sessions} sessions x {args.answers} answers, {len(bank)} question bank")
+    print(f"{'protocol':<18} {'B/session':>10} {'deflated':>10} {'us/msg':>10}")
+    measure("json (per send)", lambda: legacy_encode, traces, bank)
+    measure("json (cached)", lambda: protocol_encoder(JsonProtocol(cache)), traces, bank)
+    measure("compact/json", lambda: protocol_encoder(CompactProtocol("json", cache)), traces, bank)
+    if msgpack is not None:
+        measure("compact/msgpack", lambda: protocol_encoder(CompactProtocol("msgpack", cache)), traces, bank)
+    else:
+        print("compact/msgpack    skipped, msgpack is not installed")
+
+
+if __name__ == "__main__":
+    main()
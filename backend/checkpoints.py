@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from question_store import write_json_atomic
+
+TOKEN_PATTERN = re.compile(r'[A-Za-z0-9_-]{16,64}')
+
+
+def new_token():
+    return secrets.token_urlsafe(16)
+
+
+class CheckpointStore:
+    """Latest checkpoint of every unfinished quiz session, keyed by resume token.
+
+    Checkpoints are small JSON-ready dicts kept in memory, so saving one per
+    answer costs a dict assignment. Entries expire ttl seconds after their last
+    save, and each save drops the expired ones. When more than max_sessions
+    are held, the least recently saved are spilled to spill_dir as JSON files
+    if one is configured, and dropped otherwise.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=3600, spill_dir=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self._entries = OrderedDict()  # token -> (expires_at, state, bank)
+        self.spilled = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _spill_path(self, token):
+        return os.path.join(self.spill_dir, f"{token}.json")
+
+    def save(self, token, state, bank=None):
+        """Store the latest state for token. bank is kept in memory only, to resume without reloading it."""
+        self._entries[token] = (time.time() + self.ttl, state, bank)
+        self._entries.move_to_end(token)
+        self._expire_entries()
+        while len(self._entries) > self.max_sessions:
+            old_token, (expires_at, old_state, _) = self._entries.popitem(last=False)
+            if self.spill_dir and expires_at > time.time():
+                write_json_atomic(self._spill_path(old_token), {'expires_at': expires_at, 'state': old_state})
+                self.spilled += 1
+
+    async def load_async(self, token):
+        """load() for the event loop: a spilled checkpoint is read on a worker thread."""
+        if not self.spill_dir or token in self._entries:
+            return self.load(token)
+        return await asyncio.to_thread(self.load, token)
+
+    def load(self, token):
+        """Return (state, bank) for token, or None if it is unknown or expired. bank may be None."""
+        if not token or not TOKEN_PATTERN.fullmatch(token):
+            return None
+        entry = self._entries.get(token)
+        if entry is not None:
+            expires_at, state, bank = entry
+            if expires_at > time.time():
+                return state, bank
+            del self._entries[token]
+            return None
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._spill_path(token), 'r') as f:
+                spilled = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if spilled['expires_at'] <= time.time():
+            self._remove_spilled(token)
+            return None
+        return spilled['state'], None
+
+    def delete(self, token):
+        self._entries.pop(token, None)
+        if self.spill_dir:
+            self._remove_spilled(token)
+
+    def _remove_spilled(self, token):
+        try:
+            os.remove(self._spill_path(token))
+        except FileNotFoundError:
+            pass
+
+    def _expire_entries(self):
+        # Entries are in save order, so the expired ones are all at the front
+        now = time.time()
+        removed = 0
+        while self._entries and next(iter(self._entries.values()))[0] <= now:
+            self._entries.popitem(last=False)
+            removed += 1
+        return removed
+
+    def expire(self):
+        """Drop expired entries, in memory and spilled; returns how many were removed."""
+        removed = self._expire_entries()
+        if self.spill_dir:
+            cutoff = time.time() - self.ttl
+            for name in os.listdir(self.spill_dir):
+                path = os.path.join(self.spill_dir, name)
+                try:
+                    if os.stat(path).st_mtime <= cutoff:
+                        os.remove(path)
+                        removed += name.endswith('.json')
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class FileCheckpointStore:
+    """Checkpoints written through to a directory shared by every server process.
+
+    save() and delete() only queue the change; a background thread writes it,
+    so the event loop never waits on the disk. Repeated saves for a token that
+    has not been written yet collapse into the latest one. Until a write lands,
+    load() in this process answers from the queue, while other processes see
+    the previous checkpoint, which at worst replays one question. Files are
+    replaced atomically but not fsynced: losing the last checkpoint in a
+    machine crash only costs a replay.
+    """
+
+    def __init__(self, root, ttl=3600):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+        self._pending = OrderedDict()  # token -> checkpoint to write, or None to delete
+        self._writing = None           # (token, checkpoint) the writer thread is handling
+        self._live = OrderedDict()     # token -> expires_at of the checkpoints this process saved, in save order
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def _path(self, token):
+        return os.path.join(self.root, f"{token}.json")
+
+    def __len__(self):
+        """Unexpired checkpoints saved by this process, counted without listing the shared directory."""
+        with self._cond:
+            now = time.time()
+            while self._live and next(iter(self._live.values())) <= now:
+                self._live.popitem(last=False)
+            return len(self._live)
+
+    def save(self, token, state, bank=None):
+        self._queue(token, {'expires_at': time.time() + self.ttl, 'state': state})
+
+    def delete(self, token):
+        self._queue(token, None)
+
+    def _queue(self, token, checkpoint):
+        with self._cond:
+            self._live.pop(token, None)
+            if checkpoint is not None:
+                self._live[token] = checkpoint['expires_at']
+            if self._thread is None:
+                # Started on first use, so a process that only sweeps never forks with it running
+                self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+                self._thread.start()
+            self._pending[token] = checkpoint
+            self._cond.notify_all()
+
+    async def load_async(self, token):
+        """load() for the event loop: the file is read and parsed on a worker thread."""
+        return await asyncio.to_thread(self.load, token)
+
+    def load(self, token):
+        if not token or not TOKEN_PATTERN.fullmatch(token):
+            return None
+        with self._cond:
+            if token in self._pending:
+                queued, checkpoint = True, self._pending[token]
+            elif self._writing is not None and self._writing[0] == token:
+                queued, checkpoint = True, self._writing[1]
+            else:
+                queued = False
+        if not queued:
+            # Read without the lock, so the writer thread is never held up by a resume
+            checkpoint = self._read(token)
+        if checkpoint is None:
+            return None
+        if checkpoint['expires_at'] <= time.time():
+            self.delete(token)
+            return None
+        return checkpoint['state'], None
+
+    def _read(self, token):
+        try:
+            with open(self._path(token), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                self._writing = self._pending.popitem(last=False)
+            token, checkpoint = self._writing
+            try:
+                if checkpoint is None:
+                    self._remove(self._path(token))
+                else:
+                    path = self._path(token)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'w') as f:
+                        json.dump(checkpoint, f, separators=(',', ':'))
+                    os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Could not write checkpoint {token}: {e}")
+            finally:
+                with self._cond:
+                    self._writing = None
+                    self._cond.notify_all()
+
+    def flush(self):
+        """Block until every queued checkpoint change has been written."""
+        with self._cond:
+            while self._pending or self._writing is not None:
+                self._cond.wait()
+
+    def close(self):
+        """Write what is queued and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def expire(self):
+        """Delete checkpoints (and leftover temp files) not written for ttl seconds; returns how many.
+
+        Checkpoints are rewritten on every answer, so the file's mtime is when it
+        was saved and the files do not need to be parsed.
+        """
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if os.stat(path).st_mtime > cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            self._remove(path)
+            removed += name.endswith('.json')
+        return removed
@@ -0,0 +1,369 @@
+import json
+import os
+import re
+import threading
+import numpy as np
+
+DEDUP_INDEX_PATH = os.path.join('cache', 'dedup_index.npz')
+
+# Shingles are 4-byte windows of the normalized text, so each one is already a 32-bit id
+SHINGLE_SIZE = 4
+NUM_PERM = 64
+# 16 bands of 4 rows: questions with Jaccard similarity above ~0.5 usually share a band
+# and become candidates; candidates are then kept only above the threshold
+BANDS = 16
+THRESHOLD = 0.7
+# Shingles hashed per vectorized pass when signing, bounding the (NUM_PERM, n) temporary
+SIGN_BATCH_SHINGLES = 1 << 16
+# Recent additions scanned linearly on lookup before being merged into the sorted band arrays
+PENDING_LIMIT = 4096
+# Seconds a changed index waits before it is written back, so a burst of uploads costs one write
+SAVE_DELAY = 30
+
+
+def question_text(question):
+    """The text a question is compared on: its stem and option texts, lowercased, punctuation removed.
+
+    Options are sorted so reshuffled answer letters do not hide a duplicate.
+    """
+    options = question.get('options') or {}
+    values = options.values() if isinstance(options, dict) else options
+    parts = [str(question.get('question', ''))] + sorted(str(value) for value in values)
+    return re.sub(r"\W+", " ", " | ".join(parts).lower()).strip()
+
+
+class MinHasher:
+    """MinHash signatures of texts, computed over all shingles of a batch at once with numpy."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: the high 32 bits of a*x + b (mod 2**64), with a odd
+        self.a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self.b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signatures(self, texts):
+        """Return a (len(texts), num_perm) uint32 array of signatures."""
+        encoded = [text.encode('utf-8').ljust(SHINGLE_SIZE) for text in texts]
+        signatures = np.empty((len(encoded), self.num_perm), dtype=np.uint32)
+        start = 0
+        while start < len(encoded):
+            stop, shingles = start, 0
+            while stop < len(encoded) and (stop == start or shingles < SIGN_BATCH_SHINGLES):
+                shingles += len(encoded[stop]) - SHINGLE_SIZE + 1
+                stop += 1
+            signatures[start:stop] = self._sign(encoded[start:stop])
+            start = stop
+        return signatures
+
+    def _sign(self, encoded):
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        shingles = data[:-3] | data[1:-2] << np.uint64(8) | data[2:-1] << np.uint64(16) | data[3:] << np.uint64(24)
+        # Drop the windows that straddle two texts
+        boundaries = np.cumsum(lengths)[:-1]
+        keep = np.ones(len(shingles), dtype=bool)
+        keep[(boundaries[:, None] - np.arange(1, SHINGLE_SIZE)).ravel()] = False
+        shingles = shingles[keep]
+        starts = np.concatenate(([0], np.cumsum(lengths - SHINGLE_SIZE + 1)[:-1]))
+        hashed = (self.a[:, None] * shingles[None, :] + self.b[:, None]) >> np.uint64(32)
+        return np.minimum.reduceat(hashed, starts, axis=1).T.astype(np.uint32)
+
+
+class _Growable:
+    """Append-only numpy array with amortized doubling."""
+
+    def __init__(self, dtype, width=None):
+        self.shape = (0,) if width is None else (0, width)
+        self.data = np.empty((16,) + self.shape[1:], dtype=dtype)
+        self.size = 0
+
+    def extend(self, values):
+        needed = self.size + len(values)
+        if needed > len(self.data):
+            grown = np.empty((max(needed, 2 * len(self.data)),) + self.shape[1:], dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:needed] = values
+        self.size = needed
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class DedupIndex:
+    """Near-duplicate index over questions: MinHash signatures in an LSH table.
+
+    Each question's signature is cut into bands, and each band is hashed to a
+    32-bit key. Keys live in one sorted array per band, so a lookup is a
+    binary search per band (O(bands * log n)), with up to PENDING_LIMIT recent
+    additions held in an unsorted buffer that is scanned linearly. Candidates
+    are confirmed by comparing b-bit signatures (the low byte of every MinHash
+    value) to estimate their Jaccard similarity.
+    Entries are (set id, question id) pairs.
+    """
+
+    def __init__(self, threshold=THRESHOLD, num_perm=NUM_PERM, bands=BANDS, seed=1, path=DEDUP_INDEX_PATH):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        self.hasher = MinHasher(num_perm, seed)
+        self._band_mix = np.random.default_rng(seed + 1).integers(
+            1, 2 ** 63, self.rows, dtype=np.uint64) | np.uint64(1)
+        self._fingerprints = _Growable(np.uint8, num_perm)
+        self._set_index = _Growable(np.int32)
+        self._question_ids = _Growable(np.int64)
+        self.set_ids = []
+        self._set_positions = {}
+        self._keys = [np.empty(0, dtype=np.uint32) for _ in range(bands)]
+        self._ids = [np.empty(0, dtype=np.int32) for _ in range(bands)]
+        self._pending = _Growable(np.uint32, bands)
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._save_timer = None
+        # Questions accepted by DedupStages still running, checked by every stage
+        self._runs = []
+        self._runs_lock = threading.Lock()
+
+    def __len__(self):
+        return self._set_index.size
+
+    def signatures(self, questions):
+        return self.hasher.signatures([question_text(question) for question in questions])
+
+    def band_keys(self, signatures):
+        """(n, bands) uint32 keys, one per band of each signature."""
+        banded = signatures.astype(np.uint64).reshape(len(signatures), self.bands, self.rows)
+        mixed = (banded * self._band_mix).sum(axis=2)
+        return ((mixed ^ (mixed >> np.uint64(32))) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _candidates(self, keys):
+        found = []
+        for band in range(self.bands):
+            band_keys = self._keys[band]
+            lo = np.searchsorted(band_keys, keys[band], 'left')
+            hi = np.searchsorted(band_keys, keys[band], 'right')
+            if hi > lo:
+                found.append(self._ids[band][lo:hi])
+        pending = self._pending.view()
+        if len(pending):
+            matches = np.flatnonzero((pending == keys).any(axis=1))
+            found.append(matches + (len(self) - len(pending)))
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int32)
+
+    def _similarities(self, entries, signature):
+        matching = (self._fingerprints.view()[entries] == (signature & 0xFF).astype(np.uint8)).mean(axis=1)
+        # Low bytes of unrelated values still agree 1 time in 256; correct for that
+        return (matching - 1 / 256) / (1 - 1 / 256)
+
+    def query_signatures(self, signatures):
+        """For each signature, the [(set_id, question_id, similarity)] entries at or above the threshold."""
+        keys = self.band_keys(signatures)
+        results = []
+        with self._lock:
+            for signature, signature_keys in zip(signatures, keys):
+                entries = self._candidates(signature_keys)
+                matches = []
+                if len(entries):
+                    similarities = self._similarities(entries, signature)
+                    for entry, similarity in zip(entries[similarities >= self.threshold],
+                                                 similarities[similarities >= self.threshold]):
+                        matches.append((self.set_ids[self._set_index.data[entry]],
+                                        int(self._question_ids.data[entry]), float(similarity)))
+                matches.sort(key=lambda match: -match[2])
+                results.append(matches)
+        return results
+
+    def find(self, question):
+        """The closest indexed near-duplicate of question as (set_id, question_id, similarity), or None."""
+        matches = self.query_signatures(self.signatures([question]))[0]
+        return matches[0] if matches else None
+
+    def add_signatures(self, signatures, set_id, question_ids):
+        keys = self.band_keys(signatures)
+        with self._lock:
+            position = self._set_positions.get(set_id)
+            if position is None:
+                position = self._set_positions[set_id] = len(self.set_ids)
+                self.set_ids.append(set_id)
+            self._fingerprints.extend((signatures & 0xFF).astype(np.uint8))
+            self._set_index.extend(np.full(len(signatures), position, dtype=np.int32))
+            self._question_ids.extend(np.asarray(question_ids, dtype=np.int64))
+            self._pending.extend(keys)
+            if self._pending.size >= PENDING_LIMIT:
+                self._merge_pending()
+
+    def add_set(self, set_id, questions):
+        """Index every question of a stored set."""
+        questions = list(questions)
+        if questions:
+            self.add_signatures(self.signatures(questions), set_id, [q.get('id', i) for i, q in enumerate(questions)])
+        else:
+            self.add_signatures(np.empty((0, self.hasher.num_perm), dtype=np.uint32), set_id, [])
+
+    def _merge_pending(self):
+        pending = self._pending.view()
+        ids = np.arange(len(self) - len(pending), len(self), dtype=np.int32)
+        for band in range(self.bands):
+            order = np.argsort(pending[:, band], kind='stable')
+            new_keys = pending[order, band]
+            positions = np.searchsorted(self._keys[band], new_keys, 'right')
+            self._keys[band] = np.insert(self._keys[band], positions, new_keys)
+            self._ids[band] = np.insert(self._ids[band], positions, ids[order])
+        self._pending = _Growable(np.uint32, self.bands)
+
+    def sync(self, store):
+        """Index the sets of a QuestionSetStore that are not indexed yet; returns how many were added."""
+        added = 0
+        with self._sync_lock:
+            for set_id in list(store.list_sets()):
+                if set_id in self._set_positions:
+                    continue
+                path = store.path_for(set_id)
+                try:
+                    with open(path, 'r') as f:
+                        questions = json.load(f)
+                except (FileNotFoundError, json.JSONDecodeError) as e:
+                    print(f"Could not index question set {set_id}: {e}")
+                    continue
+                self.add_set(set_id, questions)
+                added += 1
+        return added
+
+    def save(self, path=None):
+        """Write the index to path (default: the path it was loaded from).
+
+        Lookups and additions are only blocked while the arrays are snapshotted,
+        not while they are written: the arrays are append-only or replaced on
+        merge, so the snapshot stays valid without copying.
+        """
+        path = path or self.path
+        with self._save_lock:
+            with self._lock:
+                if self._pending.size:
+                    self._merge_pending()
+                arrays = dict(params=np.array([self.threshold, self.hasher.num_perm, self.bands, self.seed]),
+                              set_ids=np.array(json.dumps(self.set_ids)), fingerprints=self._fingerprints.view(),
+                              set_index=self._set_index.view(), question_ids=self._question_ids.view())
+                keys, ids = list(self._keys), list(self._ids)
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp_path, keys=np.stack(keys), ids=np.stack(ids), **arrays)
+            os.replace(tmp_path, path)
+
+    def save_later(self, delay=SAVE_DELAY):
+        """Save the index from a background thread after delay seconds, unless a save is already scheduled.
+
+        The index can be rebuilt from the question store, so changes made since
+        the last save are only re-indexed, not lost, if the process exits first.
+        """
+        with self._timer_lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(delay, self._scheduled_save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _scheduled_save(self):
+        with self._timer_lock:
+            self._save_timer = None
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Could not save the dedup index to {self.path}: {e}")
+
+    @classmethod
+    def load(cls, path=DEDUP_INDEX_PATH):
+        """Load a saved index, or return an empty one if there is none."""
+        try:
+            saved = np.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return cls(path=path)
+        threshold, num_perm, bands, seed = saved['params']
+        index = cls(float(threshold), int(num_perm), int(bands), int(seed), path=path)
+        index.set_ids = json.loads(str(saved['set_ids']))
+        index._set_positions = {set_id: i for i, set_id in enumerate(index.set_ids)}
+        index._fingerprints.extend(saved['fingerprints'])
+        index._set_index.extend(saved['set_index'])
+        index._question_ids.extend(saved['question_ids'])
+        index._keys = list(saved['keys'])
+        index._ids = list(saved['ids'])
+        return index
+
+
+class DedupStage:
+    """Generation pipeline stage that drops near-duplicate questions as they are parsed.
+
+    A question is rejected if it is a near-duplicate of an indexed question
+    (any stored set), of a question already accepted in this run (e.g. the same
+    concept asked by two overlapping chunks), or of one accepted by another
+    stage running on the same index, so concurrent uploads do not both keep a
+    question. Use it as a context manager, call retain() with the questions
+    kept once the set is trimmed, and commit() once it is saved; until then
+    its questions only live in the stage.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.run = DedupIndex(index.threshold, index.hasher.num_perm, index.bands, index.seed)
+        self.dropped = []  # (question text, (set_id, question_id, similarity)), set_id None for an unsaved set
+        with index._runs_lock:
+            index._runs.append(self.run)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __call__(self, question):
+        signature = self.index.signatures([question])
+        # Checking and recording under one lock keeps two stages from accepting the same question
+        with self.index._runs_lock:
+            match = self.index.query_signatures(signature)[0]
+            for run in self.index._runs:
+                match = match or run.query_signatures(signature)[0]
+            if match:
+                self.dropped.append((question.get('question'), match[0]))
+                return False
+            self.run.add_signatures(signature, None, [question.get('id', len(self.run))])
+        return True
+
+    def duplicate_of(self):
+        """The stored set most dropped questions matched, or None."""
+        set_ids = [match[0] for _, match in self.dropped if match[0] is not None]
+        return max(set(set_ids), key=set_ids.count) if set_ids else None
+
+    def retain(self, questions):
+        """Keep only questions (those that survived trimming the set) as this run's accepted questions.
+
+        Questions generated but not kept in the set then stop blocking concurrent uploads.
+        """
+        run = DedupIndex(self.index.threshold, self.index.hasher.num_perm, self.index.bands, self.index.seed)
+        questions = list(questions)
+        if questions:
+            run.add_signatures(self.index.signatures(questions), None,
+                               [q.get('id', i) for i, q in enumerate(questions)])
+        with self.index._runs_lock:
+            if self.run in self.index._runs:
+                self.index._runs[self.index._runs.index(self.run)] = run
+            self.run = run
+
+    def commit(self, set_id, questions):
+        """Index the saved set in the shared index and schedule a save of it."""
+        self.index.add_set(set_id, questions)
+        self.index.save_later()
+        self.close()
+
+    def close(self):
+        with self.index._runs_lock:
+            if self.run in self.index._runs:
+                self.index._runs.remove(self.run)
@@ -1,61 +1,95 @@
 import json
-import random
 from datetime import datetime, timedelta
+from question_bank import QuestionBank
+from scheduler import RepetitionScheduler
+from session_stats import SessionStats
+
+def load_question_file(file_path):
+    """Parse a questions JSON file, returning an empty bank if it is missing or invalid."""
+    try:
+        with open(file_path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        print(f"Error: {file_path} not found.")
+        return []
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON: {e}")
+        return []
 
 class AdaptiveFlashcardSystem:
-    def __init__(self, file_path):
+    def __init__(self, file_path, questions=None):
         # Store the file path in an instance variable
         self.questions_file = file_path
-        self.questions = self.load_questions()  # No need to pass file_path again
-        self.user_performance = {}
+        # Sessions created by the server share an already parsed, read-only bank
+        if questions is None:
+            questions = self.load_questions()
+        self.questions = questions if isinstance(questions, QuestionBank) else QuestionBank(questions)
+        # Running aggregates; user_performance is its per-question view
+        self.stats = SessionStats()
+        self.user_performance = self.stats.per_question
         self.question_history = []
         self.current_difficulty = "Easy"
-        self.spaced_repetition_queue = []
+        self.spaced_repetition_queue = RepetitionScheduler()
         self.wrong_answers = []  # List to track wrong answers
 
     def load_questions(self):
         """Load the latest questions from the output.json file."""
-        try:
-            # Always open the file to ensure you are loading the latest version
-            with open(self.questions_file, 'r') as file:
-                data = json.load(file)
-                return data  # Assumes your JSON file has a 'questions' key
-        except FileNotFoundError:
-            print(f"Error: {self.questions_file} not found.")
-            return []
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON: {e}")
-            return [] # No need for ['questions'], just load the entire list of questions
-
-    def select_question(self):
+        # Always open the file to ensure you are loading the latest version
+        return QuestionBank(load_question_file(self.questions_file))
+
+    def select_question(self, prepared=None):
         current_time = datetime.now()
         # Handle spaced repetition queue
-        while self.spaced_repetition_queue and self.spaced_repetition_queue[0][0] <= current_time:
-            _, question = self.spaced_repetition_queue.pop(0)
+        question = self.spaced_repetition_queue.pop_due(current_time)
+        if question is not None:
             return question
+
+        # A question picked ahead of time by prepare_next() for the difficulty we ended up at
+        for question in (prepared or {}).values():
+            if question['difficulty'] == self.current_difficulty:
+                return question
         
-        # Filter questions based on current difficulty
-        available_questions = [q for q in self.questions if q['difficulty'] == self.current_difficulty]
-        if not available_questions:
+        # Sample directly from the per-difficulty index
+        if not self.questions.count(self.current_difficulty):
             self.adjust_difficulty()
-            available_questions = [q for q in self.questions if q['difficulty'] == self.current_difficulty]
-        
-        return random.choice(available_questions)
+
+        return self.questions.sample(self.current_difficulty)
 
     def adjust_difficulty(self):
+        # Adjust difficulty based on performance
+        self.current_difficulty = self.next_difficulty(self.get_recent_accuracy())
+
+    def next_difficulty(self, recent_accuracy):
         difficulties = ["Easy", "Medium", "Hard"]
         current_index = difficulties.index(self.current_difficulty)
-        # Adjust difficulty based on performance
-        if self.get_recent_accuracy() > 0.7 and current_index < 2:
-            self.current_difficulty = difficulties[current_index + 1]
-        elif self.get_recent_accuracy() < 0.3 and current_index > 0:
-            self.current_difficulty = difficulties[current_index - 1]
+        if recent_accuracy > 0.7 and current_index < 2:
+            return difficulties[current_index + 1]
+        elif recent_accuracy < 0.3 and current_index > 0:
+            return difficulties[current_index - 1]
+        return self.current_difficulty
+
+    def prepare_next(self, current=None):
+        """Speculatively pick the next question for both outcomes of the answer still to come.
+
+        Returns {is_correct: question} at the difficulty adjust_difficulty() would
+        move to after that outcome (the same question when both outcomes lead to
+        the same difficulty); pass it to select_question() once the answer is in.
+        current, the question being answered, is not picked unless it is the only
+        one of its difficulty.
+        """
+        prepared, by_difficulty = {}, {}
+        exclude_ids = (current['id'],) if current is not None else ()
+        for is_correct in (True, False):
+            difficulty = self.next_difficulty(self.stats.recent_accuracy_after(is_correct))
+            if difficulty not in by_difficulty and self.questions.count(difficulty):
+                by_difficulty[difficulty] = self.questions.sample(difficulty, exclude_ids)
+            if difficulty in by_difficulty:
+                prepared[is_correct] = by_difficulty[difficulty]
+        return prepared
 
     def get_recent_accuracy(self):
-        recent_attempts = self.question_history[-5:]  # Check recent attempts for accuracy
-        if not recent_attempts:
-            return 0.5  # Default accuracy
-        return sum(1 for q in recent_attempts if q['correct']) / len(recent_attempts)
+        # Accuracy over the last 5 answers, kept in a ring buffer by self.stats
+        return self.stats.recent_accuracy()
 
     def process_answer(self, question, user_answer, time_taken):
         is_correct = user_answer.upper() == question['correctAnswer']
@@ -63,28 +97,27 @@ class AdaptiveFlashcardSystem:
         
         # Track wrong answers with details
         if not is_correct:
-            wrong_answer_detail = {
-                'id': question['id'],
-                'question': question['question'],
-                'user_answer': user_answer,
-                'correct_answer': question['correctAnswer'],
-                'options': question['options'],
-                'difficulty': question['difficulty'],
-                'time_taken': time_taken,
-                'explanation':question['explanation']
-            }
-            self.wrong_answers.append(wrong_answer_detail)
+            self.wrong_answers.append(self.wrong_answer_detail(question, user_answer, time_taken))
             
         return is_correct
 
+    @staticmethod
+    def wrong_answer_detail(question, user_answer, time_taken):
+        return {
+            'id': question['id'],
+            'question': question['question'],
+            'user_answer': user_answer,
+            'correct_answer': question['correctAnswer'],
+            'options': question['options'],
+            'difficulty': question['difficulty'],
+            'time_taken': time_taken,
+            'explanation':question['explanation']
+        }
+
     def update_performance(self, question, is_correct, time_taken):
         q_id = question['id']  # Use 'id' instead of question text
-        if q_id not in self.user_performance:
-            self.user_performance[q_id] = {'attempts': 0, 'correct': 0, 'total_time': 0}
-        
-        self.user_performance[q_id]['attempts'] += 1
-        self.user_performance[q_id]['correct'] += int(is_correct)
-        self.user_performance[q_id]['total_time'] += time_taken
+        # Updates totals, per-difficulty and per-question counters in one pass
+        self.stats.record(q_id, question['difficulty'], is_correct, time_taken)
 
         # Append to question history with question 'id'
         self.question_history.append({
@@ -101,44 +134,66 @@ class AdaptiveFlashcardSystem:
     def schedule_for_repetition(self, question):
         # Schedule the question for repetition at different intervals
         repetition_intervals = [5, 25, 120]  # in minutes
-        for interval in repetition_intervals:
-            review_time = datetime.now() + timedelta(minutes=interval)
-            self.spaced_repetition_queue.append((review_time, question))
-        self.spaced_repetition_queue.sort(key=lambda x: x[0])
+        now = datetime.now()
+        self.spaced_repetition_queue.schedule_many(
+            question, [now + timedelta(minutes=interval) for interval in repetition_intervals]
+        )
+
+    def checkpoint(self):
+        """Compact, JSON-serializable snapshot of the session's progress; questions are stored by id."""
+        return {
+            'current_difficulty': self.current_difficulty,
+            'history': [[entry['id'], entry['difficulty'], entry['correct'], entry['time_taken'], entry['timestamp']]
+                        for entry in self.question_history],
+            'wrong_answers': [[wrong['id'], wrong['user_answer'], wrong['time_taken']]
+                              for wrong in self.wrong_answers],
+            'repetition': self.spaced_repetition_queue.to_state(encode_time=datetime.timestamp),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, file_path, questions, state):
+        """Rebuild a session over questions from checkpoint() output."""
+        session = cls(file_path, questions=questions)
+        session.current_difficulty = state['current_difficulty']
+        # Replaying the history restores the running stats and the recent-accuracy window
+        for q_id, difficulty, is_correct, time_taken, timestamp in state['history']:
+            session.stats.record(q_id, difficulty, is_correct, time_taken)
+            session.question_history.append({
+                'id': q_id,
+                'difficulty': difficulty,
+                'correct': is_correct,
+                'time_taken': time_taken,
+                'timestamp': timestamp
+            })
+        session.wrong_answers = [
+            cls.wrong_answer_detail(session.questions.get(q_id), user_answer, time_taken)
+            for q_id, user_answer, time_taken in state['wrong_answers']
+        ]
+        session.spaced_repetition_queue = RepetitionScheduler.from_state(
+            state['repetition'], session.questions.get, decode_time=datetime.fromtimestamp
+        )
+        return session
 
     def generate_report(self):
-        total_questions = len(self.question_history)
-        total_correct = sum(1 for q in self.question_history if q['correct'])
-        overall_accuracy = total_correct / total_questions if total_questions > 0 else 0
-        average_time = sum(q['time_taken'] for q in self.question_history) / total_questions if total_questions > 0 else 0
-    
+        # Built from running aggregates, so the cost is O(attempted questions)
         report = {
-            "total_questions": total_questions,
-            "total_correct": total_correct,
+            "total_questions": self.stats.total_questions,
+            "total_correct": self.stats.total_correct,
             "total_wrong": len(self.wrong_answers),
-            "overall_accuracy": overall_accuracy,
-            "average_time": average_time,
-            "difficulty_performance": {},
+            "overall_accuracy": self.stats.overall_accuracy(),
+            "average_time": self.stats.average_time(),
+            "difficulty_performance": self.stats.difficulty_performance(),
             "challenging_questions": [],
             "wrong_answers": self.wrong_answers,  # Include wrong answers in the report
-            "detailed_question_performance": []  # New section to include all fields for each question
+            "detailed_question_performance": []  # Every attempted question with its details
         }
     
-        # Loop through the performance and gather details for each question
-        for question in self.questions:
-            q_id = question['id']
-            performance = self.user_performance.get(q_id, None)
-            if performance:
-                attempts = performance['attempts']
-                correct = performance['correct']
-                accuracy = correct / attempts if attempts > 0 else 0
-                avg_time = performance['total_time'] / attempts if attempts > 0 else 0
-            else:
-                # If no performance data, initialize as default values
-                attempts = 0
-                correct = 0
-                accuracy = 0
-                avg_time = 0
+        for q_id, performance in self.user_performance.items():
+            question = self.questions.get(q_id)
+            if question is None:
+                continue
+            attempts = performance['attempts']
+            correct = performance['correct']
     
             # Append detailed question info to the report
             report["detailed_question_performance"].append({
@@ -151,34 +206,17 @@ class AdaptiveFlashcardSystem:
                 "difficulty": question['difficulty'],
                 "user_attempts": attempts,
                 "correct_attempts": correct,
-                "accuracy": accuracy,
-                "average_time_taken": avg_time,
+                "accuracy": correct / attempts,
+                "average_time_taken": performance['total_time'] / attempts,
                 "explanation":question['explanation']
             })
     
-        # Calculate performance based on difficulty
-        for difficulty in ["Easy", "Medium", "Hard"]:
-            questions = [q for q in self.question_history if q['difficulty'] == difficulty]
-            if questions:
-                accuracy = sum(1 for q in questions if q['correct']) / len(questions)
-                avg_time = sum(q['time_taken'] for q in questions) / len(questions)
-                report["difficulty_performance"][difficulty] = {
-                    "accuracy": accuracy,
-                    "average_time": avg_time,
-                    "total_questions": len(questions)
-                }
-    
         # Get the most challenging questions
-        sorted_performance = sorted(
-            self.user_performance.items(),
-            key=lambda x: (x[1]['correct'] / x[1]['attempts'], x[1]['total_time'] / x[1]['attempts'])
-        )
-        
-        for q_id, perf in sorted_performance[:3]:
+        for q_id, perf in self.stats.most_challenging(3):
             accuracy = perf['correct'] / perf['attempts']
             avg_time = perf['total_time'] / perf['attempts']
             # Add the question details for challenging questions
-            question = next(q for q in self.questions if q['id'] == q_id)
+            question = self.questions.get(q_id)
             report["challenging_questions"].append({
                 "id": question['id'],
                 "question": question['question'],
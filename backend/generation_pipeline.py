@@ -0,0 +1,178 @@
+import asyncio
+import math
+import re
+import time
+from itertools import zip_longest
+from json_stream import QuestionStreamParser
+from metrics import JSON_PARSE_SECONDS, LLM_CALL_SECONDS, LLM_COMPLETION_TOKENS, LLM_PROMPT_TOKENS
+from question_bank import DIFFICULTIES
+
+# Rough size of an English token, used to keep prompts inside the context window
+CHARS_PER_TOKEN = 4
+DEFAULT_CHUNK_TOKENS = 3000
+DEFAULT_CONCURRENCY = 4
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def chunk_text(text, max_tokens=DEFAULT_CHUNK_TOKENS):
+    """Split text into chunks of at most max_tokens, breaking on paragraphs, then sentences, then words."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            pieces.append(sentence)
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if not piece:
+            continue
+        if current and size + len(piece) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def split_evenly(total, parts):
+    """Split total into `parts` integers that differ by at most one, largest first."""
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def balance_questions(questions, number_of_questions):
+    """Pick number_of_questions questions spread evenly over difficulties, renumbering ids from 1.
+
+    If a difficulty is short, the remaining slots are filled from the others.
+    """
+    by_difficulty = {difficulty: [] for difficulty in DIFFICULTIES}
+    for question in questions:
+        by_difficulty.setdefault(question.get("difficulty"), []).append(question)
+
+    targets = dict(zip(DIFFICULTIES, split_evenly(number_of_questions, len(DIFFICULTIES))))
+    selected = {difficulty: pool[:targets[difficulty]] for difficulty, pool in by_difficulty.items()
+                if difficulty in targets}
+    shortfall = number_of_questions - sum(len(chosen) for chosen in selected.values())
+    for difficulty in DIFFICULTIES:
+        if shortfall <= 0:
+            break
+        spare = by_difficulty[difficulty][len(selected[difficulty]):][:shortfall]
+        selected[difficulty].extend(spare)
+        shortfall -= len(spare)
+
+    merged = [q for difficulty in DIFFICULTIES for q in selected[difficulty]]
+    return [dict(question, id=i) for i, question in enumerate(merged, start=1)]
+
+
+def spread_chunks(chunks, limit):
+    """At most limit chunks, picked evenly across the document (the middle of each of limit equal spans)."""
+    if len(chunks) <= limit:
+        return chunks
+    return [chunks[(2 * i + 1) * len(chunks) // (2 * limit)] for i in range(limit)]
+
+
+async def generate_chunk_questions(chunk, count, llm_client, build_prompt, on_question=None, accept=None):
+    """Generate questions for one chunk, streaming the completion when the client supports it.
+
+    Questions are parsed as soon as each object closes and handed to
+    on_question(question) immediately; valid questions from a truncated
+    completion are kept. If accept is given, questions it returns False for
+    (e.g. near-duplicates, see dedup_index.DedupStage) are dropped first.
+    """
+    prompt = build_prompt(chunk, count)
+    parser = QuestionStreamParser()
+    questions = []
+    completion_chars = 0
+    parse_seconds = 0.0
+    # Filled by the client with the token counts the API reports, if it reports any
+    usage = {}
+    started = time.perf_counter()
+    if hasattr(llm_client, 'stream'):
+        pieces = llm_client.stream(prompt, usage=usage)
+    else:
+        pieces = _single(await llm_client.complete(prompt, usage=usage))
+    try:
+        async for piece in pieces:
+            completion_chars += len(piece)
+            parse_started = time.perf_counter()
+            completed = parser.feed(piece)
+            parse_seconds += time.perf_counter() - parse_started
+            for question in completed:
+                if accept is not None and not accept(question):
+                    continue
+                questions.append(question)
+                if on_question is not None:
+                    on_question(question)
+    except Exception as e:
+        # A dropped stream still yields whatever questions were already complete
+        if not questions:
+            raise
+        print(f"Completion interrupted after {len(questions)} questions: {e}")
+    finally:
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started)
+        LLM_PROMPT_TOKENS.observe(usage.get('prompt_tokens', estimate_tokens(prompt)))
+        LLM_COMPLETION_TOKENS.observe(usage.get('completion_tokens', math.ceil(completion_chars / CHARS_PER_TOKEN)))
+    parser.close()
+    JSON_PARSE_SECONDS.observe(parse_seconds)
+    if parser.rejected:
+        print(f"Dropped {len(parser.rejected)} malformed questions: {parser.rejected[:3]}")
+    return questions
+
+
+async def _single(text):
+    yield text
+
+
+async def generate_question_set(text, number_of_questions, llm_client, build_prompt,
+                                max_chunk_tokens=DEFAULT_CHUNK_TOKENS, concurrency=DEFAULT_CONCURRENCY,
+                                on_question=None, accept=None):
+    """Generate questions for each chunk of text concurrently and merge them into one balanced set.
+
+    Long texts are sampled: at most ceil(number_of_questions / 3) chunks,
+    spread over the whole text, are sent to the LLM. build_prompt(chunk_text, count) returns the prompt for one chunk. Chunks
+    whose call fails without producing any question are skipped; if every chunk
+    fails the last error is raised. on_question, if given, sees every valid
+    question as soon as it is parsed, before the set is merged. accept, if
+    given, filters questions before on_question sees them.
+    """
+    chunks = chunk_text(text, max_chunk_tokens) or [text]
+    # Every chunk is asked for at least one question per difficulty, so a long
+    # document only uses as many chunks as n needs; LLM cost follows n, not length
+    chunks = spread_chunks(chunks, max(1, math.ceil(number_of_questions / len(DIFFICULTIES))))
+    # Ask every chunk for its share, rounded up to a whole question per difficulty
+    per_chunk = max(len(DIFFICULTIES), math.ceil(number_of_questions / len(chunks)))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate_chunk(chunk):
+        async with semaphore:
+            return await generate_chunk_questions(chunk, per_chunk, llm_client, build_prompt, on_question, accept)
+
+    results = await asyncio.gather(*(generate_chunk(chunk) for chunk in chunks), return_exceptions=True)
+
+    per_chunk_questions, errors = [], []
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Chunk generation failed: {result}")
+            errors.append(result)
+        elif result:
+            per_chunk_questions.append(result)
+    if not per_chunk_questions and errors:
+        raise errors[-1]
+
+    # Interleave chunks so every part of the document is represented when trimming
+    questions = [q for round_ in zip_longest(*per_chunk_questions) for q in round_ if q is not None]
+    return balance_questions(questions, number_of_questions)
@@ -0,0 +1,47 @@
+import json
+import threading
+import time
+import urllib.request
+from settings import get_setting
+
+# Public keys Firebase Auth signs ID tokens with; they rotate every few hours
+FIREBASE_CERTS_URL = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+CERTS_TTL = 3600
+
+_certs = None
+_certs_expire = 0.0
+_certs_lock = threading.Lock()
+
+
+def _signing_certs():
+    global _certs, _certs_expire
+    with _certs_lock:
+        if _certs is None or time.monotonic() > _certs_expire:
+            with urllib.request.urlopen(FIREBASE_CERTS_URL, timeout=10) as response:
+                _certs = json.load(response)
+            _certs_expire = time.monotonic() + CERTS_TTL
+        return _certs
+
+
+def verify_user(id_token):
+    """The email of the signed-in user a Firebase ID token was issued to, or None.
+
+    The token is the one the frontend gets from Firebase Auth (user.getIdToken()),
+    checked against FIREBASE_PROJECT_ID. Missing, expired or forged tokens
+    verify to None. The signing keys are fetched over HTTP about once an hour,
+    so call this off the event loop.
+    """
+    project_id = get_setting('FIREBASE_PROJECT_ID')
+    if not id_token or not project_id:
+        return None
+    # google-auth comes with google-api-python-client; imported here to keep startup light
+    from google.auth import exceptions, jwt
+    try:
+        claims = jwt.decode(id_token, certs=_signing_certs(), audience=project_id)
+    except (ValueError, exceptions.GoogleAuthError, OSError) as e:
+        print(f"Rejected ID token: {e}")
+        return None
+    if claims.get('iss') != f"https://securetoken.google.com/{project_id}":
+        print(f"Rejected ID token from issuer {claims.get('iss')}")
+        return None
+    return claims.get('email')
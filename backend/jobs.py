@@ -0,0 +1,110 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from metrics import registry as metrics_registry
+
+# Stages an upload job moves through, in order
+UPLOAD_STAGES = ["extract", "generate", "persist"]
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity and the caller should retry later."""
+
+
+class Job:
+    def __init__(self, job_id, description=None):
+        self.id = job_id
+        self.description = description
+        self.status = "queued"  # queued -> running -> done | failed
+        self.stage = None
+        self.completed_stages = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    def set_stage(self, stage):
+        """Mark the current stage finished and move on to the next one."""
+        if self.stage is not None:
+            self.completed_stages.append(self.stage)
+        self.stage = stage
+        self.updated_at = time.time()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "stage": self.stage,
+            "completed_stages": list(self.completed_stages),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+
+class JobManager:
+    """Run jobs on a bounded worker pool and track their progress by id.
+
+    At most max_workers jobs run at once and at most max_pending more wait for a
+    worker; submit() raises QueueFullError beyond that instead of queueing forever.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, max_finished=256):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_finished = max_finished
+        metrics_registry.gauge("jobs_queued", "Jobs waiting for a worker.").set_function(
+            lambda: self.count("queued"))
+        metrics_registry.gauge("jobs_running", "Jobs currently running.").set_function(
+            lambda: self.count("running"))
+
+    def submit(self, fn, *args, description=None):
+        """Queue fn(job, *args); its return value becomes job.result."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Too many jobs in progress, try again later")
+        job = Job(uuid.uuid4().hex, description)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def count(self, status):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def _prune(self):
+        # Forget the oldest finished jobs once we hold more than max_finished of them
+        finished = [j.id for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _run(self, job, fn, args):
+        job.status = "running"
+        job.updated_at = time.time()
+        try:
+            job.result = fn(job, *args)
+            if job.stage is not None:
+                job.completed_stages.append(job.stage)
+            job.stage = None
+            job.status = "done"
+        except Exception as e:
+            print(f"Job {job.id} failed during {job.stage}: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.updated_at = time.time()
+            self._slots.release()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
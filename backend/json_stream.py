@@ -0,0 +1,137 @@
+import ast
+import json
+from question_bank import DIFFICULTIES
+
+# Fields the flashcard engines read from every question
+REQUIRED_FIELDS = ('id', 'difficulty', 'question', 'options', 'correctAnswer', 'explanation', 'related_topics')
+
+
+def validate_question(question):
+    """Return None if question has the shape the flashcard engines need, otherwise the reason it does not."""
+    if not isinstance(question, dict):
+        return "not an object"
+    missing = [field for field in REQUIRED_FIELDS if field not in question]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    if question['difficulty'] not in DIFFICULTIES:
+        return f"unknown difficulty {question['difficulty']!r}"
+    options = question['options']
+    if not isinstance(options, dict) or not options:
+        return "options must be a non-empty object"
+    if question['correctAnswer'] not in options:
+        return f"correctAnswer {question['correctAnswer']!r} is not one of the options"
+    if not isinstance(question['related_topics'], list):
+        return "related_topics must be a list"
+    return None
+
+
+def _decode(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    # Models sometimes copy the single-quoted lists from the prompt example
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+class QuestionStreamParser:
+    """Incrementally extract question objects from LLM output as it streams in.
+
+    Everything outside a top-level {...} object (code fences, the enclosing array,
+    commas, stray prose) is skipped. Braces inside strings are ignored, for both
+    the double-quoted strings of JSON and the single-quoted ones the
+    literal_eval fallback accepts. Each object is decoded and validated as soon
+    as its closing brace arrives, so valid questions survive a truncated or
+    unfenced completion.
+    """
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = []  # reasons, one per object that was dropped
+        self._buffer = []
+        self._depth = 0
+        self._quote = None  # the quote character of the string being read, if any
+        self._escape = False
+
+    def feed(self, chunk):
+        """Consume the next piece of text and return any questions it completed."""
+        completed = []
+        start = 0 if self._depth else None
+        for i, char in enumerate(chunk):
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == self._quote:
+                    self._quote = None
+                continue
+            if char == '{':
+                if self._depth == 0:
+                    start = i
+                self._depth += 1
+            elif self._depth == 0:
+                continue
+            elif char in '"\'':
+                self._quote = char
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._buffer.append(chunk[start:i + 1])
+                    completed.extend(self._finish_object(''.join(self._buffer)))
+                    self._buffer = []
+                    start = None
+        if self._depth and start is not None:
+            self._buffer.append(chunk[start:])
+        return completed
+
+    def _finish_object(self, text):
+        obj = _decode(text)
+        if obj is None:
+            self.rejected.append("invalid JSON")
+            return []
+        # Tolerate a wrapper object such as {"questions": [...]}
+        if isinstance(obj, dict) and validate_question(obj) and len(obj) == 1:
+            nested = next(iter(obj.values()))
+            if isinstance(nested, list):
+                return [q for q in (self._accept(item) for item in nested) if q is not None]
+        question = self._accept(obj)
+        return [question] if question is not None else []
+
+    def _accept(self, question):
+        error = validate_question(question)
+        if error:
+            self.rejected.append(error)
+            return None
+        question.setdefault('related_links', [])
+        self.accepted += 1
+        return question
+
+    def close(self):
+        """Finish the stream; an object still open at this point was truncated and is dropped."""
+        if self._depth:
+            self.rejected.append("truncated object")
+        self._buffer = []
+        self._depth = 0
+        self._quote = None
+        self._escape = False
+
+
+def parse_questions(text):
+    """Parse every valid question object out of a complete completion string."""
+    parser = QuestionStreamParser()
+    questions = parser.feed(text)
+    parser.close()
+    return questions
+
+
+async def stream_questions(chunks):
+    """Async generator yielding questions from an async iterable of text chunks as each one closes."""
+    parser = QuestionStreamParser()
+    async for chunk in chunks:
+        for question in parser.feed(chunk):
+            yield question
+    parser.close()
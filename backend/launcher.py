@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from checkpoints import FileCheckpointStore
+from question_store import QuestionSetStore
+from report_store import ReportStore, ReportWriter
+from websocket_server import FlashcardWebSocketServer
+
+CHECKPOINT_DIR = os.path.join('data', 'checkpoints')
+
+
+async def run_worker(host, port, questions_file, checkpoint_dir, drain_timeout, ready=None):
+    """Serve quiz sessions on a port shared with the other workers until SIGTERM, then drain."""
+    report_writer = ReportWriter(ReportStore())
+    # Checkpoints live in a shared directory, so any worker can resume any session
+    server = FlashcardWebSocketServer(host, port, questions_file, question_store=QuestionSetStore(),
+                                      report_writer=report_writer,
+                                      checkpoints=FileCheckpointStore(checkpoint_dir))
+    ws_server = await server.serve(reuse_port=True)
+    print(f"Worker {os.getpid()} listening on ws://{host}:{port}")
+    if ready is not None:
+        ready.set()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
+
+    print(f"Worker {os.getpid()} draining {server.sessions.active_sessions} sessions")
+    await server.drain(ws_server, drain_timeout)
+    # Sessions closed by the drain must find their last checkpoint on the worker they reconnect to
+    await asyncio.to_thread(server.checkpoints.close)
+    await asyncio.to_thread(report_writer.flush)
+    report_writer.close()
+
+
+def worker_main(host, port, questions_file, checkpoint_dir, drain_timeout, ready):
+    # SIGHUP is for the supervisor (rolling restart); workers only react to SIGTERM/SIGINT
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    asyncio.run(run_worker(host, port, questions_file, checkpoint_dir, drain_timeout, ready))
+
+
+class WorkerPool:
+    """Run N server processes on one port with SO_REUSEPORT and keep them running.
+
+    SIGHUP replaces the workers one at a time, starting each replacement
+    before draining the worker it replaces. SIGTERM/SIGINT drain every worker
+    and exit. Workers that die unexpectedly are restarted. Every
+    sweep_interval seconds, checkpoints of abandoned sessions are deleted
+    from the shared directory.
+    """
+
+    def __init__(self, workers, host, port, questions_file, checkpoint_dir=CHECKPOINT_DIR, drain_timeout=30,
+                 sweep_interval=300):
+        self.size = workers
+        self.args = (host, port, questions_file, checkpoint_dir, drain_timeout)
+        self.drain_timeout = drain_timeout
+        self.checkpoints = FileCheckpointStore(checkpoint_dir)
+        self.sweep_interval = sweep_interval
+        self.workers = []
+        self._stopping = False
+        self._restart = False
+
+    def start_worker(self, timeout=10):
+        ready = multiprocessing.Event()
+        process = multiprocessing.Process(target=worker_main, args=self.args + (ready,), daemon=False)
+        process.start()
+        if not ready.wait(timeout):
+            print(f"Worker {process.pid} did not start listening within {timeout}s")
+        return process
+
+    def stop_worker(self, process):
+        if process.is_alive():
+            process.terminate()  # SIGTERM, which drains
+        process.join(self.drain_timeout + 5)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def start(self):
+        self.workers = [self.start_worker() for _ in range(self.size)]
+
+    def rolling_restart(self):
+        print("Restarting workers")
+        for i, old in enumerate(list(self.workers)):
+            self.workers[i] = self.start_worker()
+            self.stop_worker(old)
+
+    def stop(self):
+        for process in self.workers:
+            if process.is_alive():
+                process.terminate()
+        for process in self.workers:
+            self.stop_worker(process)
+
+    def _request_stop(self, signum, frame):
+        self._stopping = True
+
+    def _request_restart(self, signum, frame):
+        self._restart = True
+
+    def run(self):
+        self.start()
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        signal.signal(signal.SIGHUP, self._request_restart)
+        next_sweep = time.monotonic()
+        while not self._stopping:
+            if time.monotonic() >= next_sweep:
+                expired = self.checkpoints.expire()
+                if expired:
+                    print(f"Removed {expired} expired checkpoints")
+                next_sweep = time.monotonic() + self.sweep_interval
+            if self._restart:
+                self._restart = False
+                self.rolling_restart()
+            for i, process in enumerate(self.workers):
+                if not process.is_alive() and not self._stopping:
+                    print(f"Worker {process.pid} exited with {process.exitcode}, restarting")
+                    self.workers[i] = self.start_worker()
+            time.sleep(0.5)
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the quiz WebSocket server as several worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--questions-file", default="output.json")
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    args = parser.parse_args()
+    WorkerPool(args.workers, args.host, args.port, args.questions_file, args.checkpoint_dir,
+               args.drain_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
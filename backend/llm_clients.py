@@ -0,0 +1,143 @@
+import asyncio
+import json
+import random
+import re
+
+
+# Pseudo-words for synthetic questions: distinct questions share little text, like real ones
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "zu", "pe", "da", "fo", "gi", "ha", "je", "bo"]
+VOCABULARY = [a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES[:8]]
+
+
+def synthetic_question(rng, question_id, difficulty):
+    """A well-formed question with random wording drawn from VOCABULARY."""
+    words = lambda count: " ".join(rng.choice(VOCABULARY) for _ in range(count))
+    topics = [words(1) for _ in range(3)]
+    return {
+        "id": question_id,
+        "difficulty": difficulty,
+        "question": f"{words(rng.randint(5, 9)).capitalize()}?",
+        "options": {letter: words(rng.randint(2, 4)) for letter in "ABCD"},
+        "related_topics": topics,
+        "related_links": [],
+        "correctAnswer": rng.choice("ABCD"),
+        "explanation": f"Explanation covering {topics[0]}."
+    }
+
+
+class OpenAIChatClient:
+    """Async adapter over a synchronous client exposing chat.completions.create.
+
+    complete() and stream() take an optional usage dict, which is filled with the
+    prompt_tokens and completion_tokens the API reports for the call.
+    """
+
+    def __init__(self, client, model="gpt-4o-mini"):
+        self.client = client
+        self.model = model
+
+    async def complete(self, prompt, usage=None):
+        # The OpenAI SDK call blocks, so run it on a worker thread
+        completion = await asyncio.to_thread(
+            self.client.chat.completions.create,
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        _record_usage(completion, usage)
+        return completion.choices[0].message.content
+
+    async def stream(self, prompt, usage=None):
+        """Yield the completion text in pieces as the API streams it back."""
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                    # The last chunk then carries the token usage of the whole call
+                    stream_options={"include_usage": True}
+                ):
+                    _record_usage(chunk, usage)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        loop.call_soon_threadsafe(queue.put_nowait, chunk.choices[0].delta.content)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+
+        producer = asyncio.create_task(asyncio.to_thread(produce))
+        while True:
+            piece = await queue.get()
+            if piece is done:
+                break
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+        await producer
+
+
+def _record_usage(response, usage):
+    reported = getattr(response, "usage", None)
+    if usage is not None and reported is not None:
+        usage["prompt_tokens"] = reported.prompt_tokens
+        usage["completion_tokens"] = reported.completion_tokens
+
+
+class FakeLLMClient:
+    """Deterministic local stand-in for the LLM, for tests and throughput benchmarks.
+
+    It reads the requested counts from a question-generation prompt ("N easy, N
+    medium, and N hard") and answers after `latency` seconds with that many
+    well-formed questions inside a ```json fence, seeded by the prompt text.
+    """
+
+    def __init__(self, latency=0.0, model="fake-llm"):
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+
+    def _requested_counts(self, prompt):
+        match = re.search(r"(\d+) easy, (\d+) medium, and (\d+) hard", prompt)
+        if not match:
+            return {"Easy": 4, "Medium": 4, "Hard": 4}
+        easy, medium, hard = (int(n) for n in match.groups())
+        return {"Easy": easy, "Medium": medium, "Hard": hard}
+
+    def _questions(self, prompt):
+        rng = random.Random(prompt)
+        questions = []
+        for difficulty, count in self._requested_counts(prompt).items():
+            for _ in range(count):
+                questions.append(synthetic_question(rng, len(questions) + 1, difficulty))
+        return questions
+
+    def _completion(self, prompt):
+        return "```json\n" + json.dumps(self._questions(prompt), indent=2) + "\n```"
+
+    async def complete(self, prompt, usage=None):
+        # Reports no usage, like an API that omits it, so token counts are estimated
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._completion(prompt)
+
+    async def stream(self, prompt, chunk_size=64, usage=None):
+        """Stream the same completion in chunk_size pieces, spreading latency evenly across them."""
+        self.calls += 1
+        text = self._completion(prompt)
+        pieces = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        for piece in pieces:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(pieces))
+            yield piece
+
+
+def as_llm_client(client, model="gpt-4o-mini"):
+    """Accept either an async client with complete() or an OpenAI-style sync client."""
+    if hasattr(client, "complete"):
+        return client
+    return OpenAIChatClient(client, model=model)
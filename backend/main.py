@@ -1,19 +1,58 @@
 import asyncio
+import signal
+import sys
+from question_channel import QuestionChannel
+from question_store import QuestionSetStore
+from report_store import ReportStore, ReportWriter
 from websocket_server import FlashcardWebSocketServer
 
 
+def generate_from_file(source_path, channel, store):
+    # Imported here so the plain quiz server never loads the OpenAI and PDF stacks
+    from pdf_extraction import extract_text_from_pdf
+    from questiongeneration import question_generation
+
+    if source_path.endswith('.pdf'):
+        text = extract_text_from_pdf(source_path)
+    else:
+        with open(source_path, 'r') as f:
+            text = f.read()
+    question_generation(text, channel=channel, store=store, source=source_path)
+
+
 async def main():
     host = "localhost"
     port = 8765
     questions_file = "output.json"
+    # Generated sets live in the store; output.json is only used until the first one exists
+    question_store = QuestionSetStore()
+    # Finished reports are persisted off the event loop
+    report_writer = ReportWriter(ReportStore())
+
+    # Optionally pass a document (e.g. `python main.py ml.pdf`) to generate a fresh
+    # set; clients that connect meanwhile receive questions as they are generated
+    source_path = sys.argv[1] if len(sys.argv) > 1 else None
+    channel = QuestionChannel(loop=asyncio.get_running_loop()) if source_path else None
+
+    server = FlashcardWebSocketServer(host, port, questions_file, live_channel=channel,
+                                      question_store=question_store, report_writer=report_writer)
+    if source_path:
+        asyncio.get_running_loop().run_in_executor(
+            None, generate_from_file, source_path, channel, question_store
+        )
+    ws_server = await server.serve()
+    print(f"WebSocket server started on ws://{host}:{port}")
 
-    # Call the synchronous question_generation function
-    # question_generation('nlp.pdf', 'output.json')
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+    await stop.wait()
 
-    # Start WebSocket server after question_generation is complete
-    server = FlashcardWebSocketServer(host, port, questions_file)
-    await server.start_server()
-    await asyncio.get_event_loop().run_forever()
+    ws_server.close()
+    await ws_server.wait_closed()
+    # Reports still queued at shutdown are written before exiting
+    await asyncio.to_thread(report_writer.close)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,190 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Upper bounds in seconds, from sub-millisecond selection up to long LLM calls
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum.
+
+    Each thread records into its own array, merged only when the metrics are
+    read, so observe() takes no lock: it is a bisect and two additions.
+    """
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.registry = registry
+        self._local = threading.local()
+        self._shards = []  # one [count per bucket..., +Inf count, sum] list per thread
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = self._local.shard = [0] * (len(self.buckets) + 1) + [0.0]
+        with self._lock:
+            self._shards.append(shard)
+        return shard
+
+    def observe(self, value):
+        if self.registry is not None and not self.registry.enabled:
+            return
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self):
+        """Context manager that observes the seconds spent in its block."""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        return self.snapshot()[0][-1]
+
+    def snapshot(self):
+        """(cumulative counts per bucket including +Inf, sum)."""
+        with self._lock:
+            shards = list(self._shards)
+        counts = [sum(column) for column in zip(*shards)] or [0] * (len(self.buckets) + 2)
+        cumulative, running = [], 0
+        for count in counts[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, counts[-1]
+
+    def expose(self):
+        cumulative, total = self.snapshot()
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for bound, count in zip(self.buckets + (float('inf'),), cumulative):
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {count}')
+        lines.append(f"{self.name}_sum {_format_value(total)}")
+        lines.append(f"{self.name}_count {cumulative[-1]}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('observe', 'started')
+
+    def __init__(self, histogram):
+        self.observe = histogram.observe
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.observe(perf_counter() - self.started)
+
+
+class Gauge:
+    """A current value, either set directly or read from a callback when metrics are scraped.
+
+    Callbacks (e.g. a queue's size) cost nothing on the hot path.
+    """
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self._function = function
+
+    def get(self):
+        if self._function is not None:
+            try:
+                return self._function()
+            except Exception as e:
+                print(f"Failed to read gauge {self.name}: {e}")
+                return float('nan')
+        return self.value
+
+    def expose(self):
+        value = self.get()
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {'NaN' if value != value else _format_value(value)}"]
+
+
+class MetricsRegistry:
+    """Named metrics of one process, rendered in the Prometheus text exposition format.
+
+    histogram() and gauge() return the existing metric when the name is already
+    registered, so modules can declare the metrics they use at import time.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def histogram(self, name, documentation, buckets=LATENCY_BUCKETS):
+        return self._get_or_create(name, lambda: Histogram(name, documentation, buckets, registry=self))
+
+    def gauge(self, name, documentation):
+        return self._get_or_create(name, lambda: Gauge(name, documentation))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def exposition(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Content type of the text exposition format, for /metrics responses
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PDF_PAGE_SECONDS = registry.histogram(
+    "pdf_extract_page_seconds", "Time to extract the text of one PDF page (cache misses only).")
+LLM_CALL_SECONDS = registry.histogram(
+    "llm_call_seconds", "Time from sending a prompt to the end of its completion.")
+LLM_PROMPT_TOKENS = registry.histogram(
+    "llm_prompt_tokens", "Tokens per prompt sent to the LLM, as reported by the API (estimated if it does not).",
+    TOKEN_BUCKETS)
+LLM_COMPLETION_TOKENS = registry.histogram(
+    "llm_completion_tokens", "Tokens per LLM completion, as reported by the API (estimated if it does not).",
+    TOKEN_BUCKETS)
+JSON_PARSE_SECONDS = registry.histogram(
+    "question_parse_seconds", "Time spent parsing questions out of one LLM completion.")
+SELECT_QUESTION_SECONDS = registry.histogram(
+    "quiz_select_question_seconds", "Time to pick the next question for a session.")
+PROCESS_ANSWER_SECONDS = registry.histogram(
+    "quiz_process_answer_seconds", "Time to score an answer and update the session.")
+WS_SEND_SECONDS = registry.histogram(
+    "quiz_ws_send_seconds", "Time for one WebSocket send to complete.")
+WS_RECV_SECONDS = registry.histogram(
+    "quiz_ws_recv_seconds", "Time waiting for the client's reply after a question is sent (includes think time).")
+REPORT_SECONDS = registry.histogram(
+    "quiz_report_seconds", "Time to generate the final report of a session.")
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from metrics import PDF_PAGE_SECONDS
+
+PAGE_CACHE_DIR = os.path.join('cache', 'pdf_pages')
+
+
+def _pdf_reader(file_path):
+    # PyPDF2 is imported on first use so servers that never see a PDF do not pay for it
+    from PyPDF2 import PdfReader
+    return PdfReader(file_path)
+
+# Documents with fewer pages than this are extracted serially; a process pool
+# costs more to start than it saves on short documents
+PARALLEL_PAGE_THRESHOLD = 64
+
+
+def file_digest(file_path):
+    """sha256 of the file contents, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PageTextCache:
+    """On-disk cache of extracted page text keyed by document hash and page index.
+
+    Each document is stored as one JSON object mapping page index to text, and
+    documents that were read recently are also kept in memory.
+    """
+
+    def __init__(self, cache_dir=PAGE_CACHE_DIR, max_documents_in_memory=32):
+        self.cache_dir = cache_dir
+        self.max_documents_in_memory = max_documents_in_memory
+        self._documents = {}
+        # Upload jobs run on several threads and can extract the same document at once
+        self._lock = threading.Lock()
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def load(self, digest):
+        """Return {page_index: text} for every cached page of the document.
+
+        The dict is a copy, so callers can iterate it while other threads store pages.
+        """
+        with self._lock:
+            return dict(self._load(digest))
+
+    def _load(self, digest):
+        if digest in self._documents:
+            return self._documents[digest]
+        try:
+            with open(self._path(digest), 'r') as f:
+                pages = {int(index): text for index, text in json.load(f).items()}
+        except (FileNotFoundError, json.JSONDecodeError):
+            pages = {}
+        self._remember(digest, pages)
+        return pages
+
+    def store(self, digest, pages):
+        with self._lock:
+            cached = dict(self._load(digest))
+            cached.update(pages)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(cached, f)
+            os.replace(tmp_path, self._path(digest))
+            self._remember(digest, cached)
+
+    def _remember(self, digest, pages):
+        self._documents.pop(digest, None)
+        if len(self._documents) >= self.max_documents_in_memory:
+            self._documents.pop(next(iter(self._documents)))
+        self._documents[digest] = pages
+
+
+page_cache = PageTextCache()
+
+
+def _extract_page_range(file_path, start, stop):
+    # Runs in worker processes, so it opens its own reader and returns the
+    # per-page timings for the parent to record
+    reader = _pdf_reader(file_path)
+    texts, seconds = [], []
+    for i in range(start, stop):
+        started = time.perf_counter()
+        texts.append(reader.pages[i].extract_text() or '')
+        seconds.append(time.perf_counter() - started)
+    return texts, seconds
+
+
+def iter_pdf_pages(file_path, cache=page_cache):
+    """Yield the text of each page in order, extracting only pages missing from the cache."""
+    digest = file_digest(file_path) if cache else None
+    cached = cache.load(digest) if cache else {}
+    reader = _pdf_reader(file_path)
+    extracted = {}
+    try:
+        for index in range(len(reader.pages)):
+            if index in cached:
+                yield cached[index]
+                continue
+            with PDF_PAGE_SECONDS.time():
+                text = reader.pages[index].extract_text() or ''
+            extracted[index] = text
+            yield text
+    finally:
+        # Also runs if the consumer stops early, so partial work is not lost
+        if cache and extracted:
+            cache.store(digest, extracted)
+
+
+def extract_pages(file_path, workers=None, cache=page_cache):
+    """Return the text of every page, spreading large documents across a process pool."""
+    digest = file_digest(file_path) if cache else None
+    cached = cache.load(digest) if cache else {}
+    page_count = len(_pdf_reader(file_path).pages)
+    missing = [i for i in range(page_count) if i not in cached]
+
+    workers = workers or os.cpu_count() or 1
+    if len(missing) < PARALLEL_PAGE_THRESHOLD or workers == 1:
+        return list(iter_pdf_pages(file_path, cache=cache))
+
+    # Contiguous ranges keep each worker to a single PdfReader parse
+    chunk = -(-len(missing) // (workers * 4))
+    ranges = [(missing[i], missing[min(i + chunk, len(missing)) - 1] + 1)
+              for i in range(0, len(missing), chunk)]
+    extracted = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_page_range, file_path, start, stop) for start, stop in ranges]
+        for (start, stop), future in zip(ranges, futures):
+            texts, seconds = future.result()
+            extracted.update(zip(range(start, stop), texts))
+            for page_seconds in seconds:
+                PDF_PAGE_SECONDS.observe(page_seconds)
+
+    if cache:
+        cache.store(digest, extracted)
+    pages = dict(cached)
+    pages.update(extracted)
+    return [pages[i] for i in range(page_count)]
+
+
+def extract_text_from_pdf(file_path, workers=None, cache=page_cache):
+    return "\n".join(text for text in extract_pages(file_path, workers, cache) if text)
@@ -0,0 +1,62 @@
+import random
+
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+
+
+class QuestionBank:
+    """Read-only question bank indexed by id and difficulty, built once at load time.
+
+    Iterating, indexing and len() behave like the plain question list it wraps, so
+    code that treats the bank as a list keeps working.
+    """
+
+    def __init__(self, questions=(), set_id=None, identity=None):
+        self.questions = tuple(questions)
+        # Id of the stored question set this bank was loaded from, if any
+        self.set_id = set_id
+        # Stable name for exactly these questions, recorded in session checkpoints so a
+        # resumed session gets the same bank back: set:<set id>, file:<hash> or live:<id>
+        self.identity = identity or (f"set:{set_id}" if set_id else None)
+        self.by_id = {}
+        self.by_difficulty = {}
+        for question in self.questions:
+            self.by_id[question.get('id')] = question
+            self.by_difficulty.setdefault(question['difficulty'], []).append(question)
+
+    def __len__(self):
+        return len(self.questions)
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def __getitem__(self, index):
+        return self.questions[index]
+
+    def get(self, question_id, default=None):
+        return self.by_id.get(question_id, default)
+
+    def count(self, difficulty):
+        return len(self.by_difficulty.get(difficulty, ()))
+
+    def sample(self, difficulty, exclude_ids=()):
+        """Pick a random question of the given difficulty, avoiding exclude_ids when possible.
+
+        exclude_ids is expected to be small (a recent-history window), so rejection
+        sampling finishes in a couple of draws regardless of bank size. If every
+        candidate is excluded, any question of that difficulty is returned. Raises
+        IndexError like random.choice when there are no questions of that difficulty.
+        """
+        candidates = self.by_difficulty.get(difficulty, ())
+        if not exclude_ids:
+            return random.choice(candidates)
+
+        if len(candidates) > 2 * len(exclude_ids):
+            # At least half the pool is eligible, so each draw succeeds with p >= 0.5
+            while True:
+                question = random.choice(candidates)
+                if question.get('id') not in exclude_ids:
+                    return question
+
+        # Tiny pools: filtering is cheaper than retrying
+        eligible = [q for q in candidates if q.get('id') not in exclude_ids]
+        return random.choice(eligible or candidates)
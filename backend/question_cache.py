@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+QUESTION_CACHE_DIR = os.path.join('cache', 'question_sets')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different extractions of a document share a key."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class QuestionSetCache:
+    """Persistent content-addressed cache of generated question sets with size-based LRU eviction.
+
+    Keys hash the normalized source text together with the model, prompt version
+    and question count. Each entry is one JSON file whose mtime records its last
+    use, so LRU order survives restarts.
+    """
+
+    def __init__(self, cache_dir=QUESTION_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._scan()
+
+    @staticmethod
+    def make_key(text, model, prompt_version, number_of_questions):
+        digest = hashlib.sha256()
+        for part in (model, str(prompt_version), str(number_of_questions), normalize_text(text)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _scan(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        found = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                found.append((stat.st_mtime, name[:-len('.json')], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'r') as f:
+                    questions = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            os.utime(self._path(key))
+            self.hits += 1
+            return questions
+
+    def put(self, key, questions):
+        data = json.dumps(questions).encode('utf-8')
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._forget(key, remove_file=False)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._forget(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _forget(self, key, remove_file=True):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+        if remove_file:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
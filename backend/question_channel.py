@@ -0,0 +1,155 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from question_bank import QuestionBank
+
+
+class QuestionChannel:
+    """In-process pub/sub channel carrying freshly generated questions to live quiz sessions.
+
+    A producer calls begin_set(key), publish(key, question) for each question as
+    soon as it is parsed, then end_set(key), where key names the set being
+    generated (e.g. the upload job id), so several producers can share one
+    channel. Subscribers implement on_begin(key), on_question(key, question) and
+    on_end(key). Producers may run on another thread (e.g. an upload job);
+    deliveries are then scheduled onto the event loop the channel is bound to, so
+    subscribers only ever run on that loop.
+    """
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.subscribers = []
+        self.published = 0
+
+    def bind(self, loop):
+        self.loop = loop
+
+    def subscribe(self, subscriber):
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+    def _dispatch(self, method, *args):
+        for subscriber in list(self.subscribers):
+            getattr(subscriber, method)(*args)
+
+    def _deliver(self, method, *args):
+        if self.loop is None or self._running_loop() is self.loop:
+            self._dispatch(method, *args)
+        else:
+            self.loop.call_soon_threadsafe(self._dispatch, method, *args)
+
+    @staticmethod
+    def _running_loop():
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def begin_set(self, key):
+        self._deliver('on_begin', key)
+
+    def publish(self, key, question):
+        self.published += 1
+        self._deliver('on_question', key, question)
+
+    def end_set(self, key):
+        self._deliver('on_end', key)
+
+
+class SetPublisher:
+    """Publishes one generated set to a QuestionChannel, beginning it with its first question.
+
+    A set whose questions are all dropped (e.g. a re-upload that is entirely
+    near-duplicates) therefore never reaches subscribers as an empty live set.
+    key defaults to a fresh random id.
+    """
+
+    def __init__(self, channel, key=None):
+        self.channel = channel
+        self.key = key or uuid.uuid4().hex
+        self.started = False
+
+    def publish(self, question):
+        if not self.started:
+            self.started = True
+            self.channel.begin_set(self.key)
+        self.channel.publish(self.key, question)
+
+    def end(self):
+        if self.started:
+            self.channel.end_set(self.key)
+
+
+class LiveQuestionBank(QuestionBank):
+    """A QuestionBank that grows while a set is being generated.
+
+    Questions are renumbered on arrival because ids from concurrently generated
+    chunks overlap. Sessions can await wait_for(difficulty) until a question of
+    that difficulty arrives or the set is complete.
+    """
+
+    def __init__(self):
+        super().__init__(identity=f"live:{uuid.uuid4().hex}")
+        self.questions = []
+        self.complete = False
+        self._changed = asyncio.Event()
+
+    def add(self, question):
+        question = dict(question, id=len(self.questions) + 1)
+        self.questions.append(question)
+        self.by_id[question['id']] = question
+        self.by_difficulty.setdefault(question['difficulty'], []).append(question)
+        self._notify()
+
+    def finish(self):
+        self.complete = True
+        self._notify()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event and start a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for(self, difficulty):
+        while not self.count(difficulty) and not self.complete:
+            await self._changed.wait()
+
+
+class LiveBankSubscriber:
+    """Channel subscriber that keeps one LiveQuestionBank per set being generated.
+
+    The last few banks stay reachable by identity, so sessions checkpointed on a
+    live set can be resumed after it finishes.
+    """
+
+    def __init__(self, max_recent=8):
+        self.generating = OrderedDict()  # set key -> LiveQuestionBank, in the order the sets began
+        self.max_recent = max_recent
+        self.recent = OrderedDict()  # identity -> LiveQuestionBank
+
+    def on_begin(self, key):
+        bank = self.generating[key] = LiveQuestionBank()
+        self.recent[bank.identity] = bank
+        while len(self.recent) > self.max_recent:
+            self.recent.popitem(last=False)
+
+    def on_question(self, key, question):
+        if key not in self.generating:
+            self.on_begin(key)
+        self.generating[key].add(question)
+
+    def on_end(self, key):
+        bank = self.generating.pop(key, None)
+        if bank is not None:
+            bank.finish()
+
+    def find(self, identity):
+        return self.recent.get(identity)
+
+    def active_bank(self):
+        """The most recently started bank still being generated, or None if no set is being generated."""
+        if self.generating:
+            return next(reversed(self.generating.values()))
+        return None
@@ -0,0 +1,102 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from question_bank import QuestionBank
+
+QUESTION_STORE_DIR = os.path.join('data', 'question_sets')
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temp file in the same directory, fsync it, then rename it over path."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class QuestionSetStore:
+    """Versioned question sets: one immutable JSON file per upload plus a small index.
+
+    Files are written to a temp path and renamed into place, so readers never see
+    a partial set. The index (index.json) maps set ids to their files and records
+    the latest set. Because sets never change, loaded sets are cached as shared
+    QuestionBank objects, one parsed copy per set.
+    """
+
+    def __init__(self, root=QUESTION_STORE_DIR, max_cached_sets=16):
+        self.root = root
+        self.index_path = os.path.join(root, 'index.json')
+        self.max_cached_sets = max_cached_sets
+        self._write_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._banks = OrderedDict()
+        self._index = None
+        self._index_mtime = None
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, questions, source=None):
+        """Persist a new set and return its id."""
+        set_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        file_name = f"{set_id}.json"
+        write_json_atomic(os.path.join(self.root, file_name), questions)
+        with self._write_lock:
+            index = self._read_index()
+            index['sets'][set_id] = {
+                'file': file_name,
+                'source': source,
+                'question_count': len(questions),
+                'created_at': time.time(),
+            }
+            index['latest'] = set_id
+            write_json_atomic(self.index_path, index)
+        # Hand the new set to sessions in this process without re-reading the file
+        self._cache_bank(set_id, QuestionBank(questions, set_id=set_id))
+        return set_id
+
+    def _read_index(self):
+        """Return the index, re-reading it only when another process has replaced it."""
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            return {'latest': None, 'sets': {}}
+        if mtime != self._index_mtime:
+            with open(self.index_path, 'r') as f:
+                self._index = json.load(f)
+            self._index_mtime = mtime
+        return self._index
+
+    def latest_id(self):
+        return self._read_index()['latest']
+
+    def list_sets(self):
+        return self._read_index()['sets']
+
+    def path_for(self, set_id):
+        entry = self.list_sets().get(set_id)
+        return os.path.join(self.root, entry['file']) if entry else None
+
+    def load(self, set_id=None):
+        """Return the QuestionBank for set_id (default: the latest set), or None if unknown."""
+        set_id = set_id or self.latest_id()
+        with self._cache_lock:
+            if set_id in self._banks:
+                self._banks.move_to_end(set_id)
+                return self._banks[set_id]
+        path = self.path_for(set_id) if set_id else None
+        if path is None:
+            return None
+        with open(path, 'r') as f:
+            bank = QuestionBank(json.load(f), set_id=set_id)
+        self._cache_bank(set_id, bank)
+        return bank
+
+    def _cache_bank(self, set_id, bank):
+        with self._cache_lock:
+            self._banks[set_id] = bank
+            while len(self._banks) > self.max_cached_sets:
+                self._banks.popitem(last=False)
@@ -1,43 +1,74 @@
-from dotenv import load_dotenv
-
- # take environment variables from .env.
-
-from openai import OpenAI
+import asyncio
 import json
-import os
-from PyPDF2 import PdfReader
-
-
-load_dotenv() 
-client = OpenAI(
-  api_key=os.getenv('OPENAI_API_KEY'),  # this is also the default, it can be omitted
-)
-
-def extract_text_from_pdf(file_path):
-    reader = PdfReader(file_path)
-    text = []
-    for page in reader.pages:
-        page_text = page.extract_text()
-        if page_text:  # Check if text extraction is not None
-            text.append(page_text)
-    return "\n".join(text)
-
-def generate_questions(text, number_of_questions):
-   
-
-    try:
-        # Creating the prompt
-        prompt = f'''
-Your task is to generate exactly 12 multiple-choice questions based on the provided text. Follow these instructions precisely:
-
-1. Create 4 easy, 4 medium, and 4 hard questions.
+import threading
+from dedup_index import DedupIndex, DedupStage
+from generation_pipeline import DEFAULT_CHUNK_TOKENS, DEFAULT_CONCURRENCY, generate_question_set, split_evenly
+from json_stream import parse_questions
+from question_channel import SetPublisher
+from llm_clients import as_llm_client
+from metrics import JSON_PARSE_SECONDS
+from question_cache import QuestionSetCache
+from question_store import QuestionSetStore
+from settings import get_setting
+
+_client = None
+_client_lock = threading.Lock()
+_dedup_index = None
+_dedup_lock = threading.Lock()
+
+
+def get_openai_client():
+    """The process-wide OpenAI client, created on first use.
+
+    The openai package is slow to import, so it is only loaded once a question
+    set actually has to be generated; every later call reuses the client and
+    its HTTP connection pool.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=get_setting('OPENAI_API_KEY'))
+    return _client
+
+
+def get_dedup_index(store=None):
+    """The process-wide near-duplicate index, loaded on first use and caught up with store's sets.
+
+    Sets saved since the last call (by any process sharing the store) are
+    indexed here. When that changed the index, it is written back to disk
+    in the background rather than by the caller.
+    """
+    global _dedup_index
+    with _dedup_lock:
+        if _dedup_index is None:
+            _dedup_index = DedupIndex.load()
+    if _dedup_index.sync(store or QuestionSetStore()):
+        _dedup_index.save_later()
+    return _dedup_index
+
+
+MODEL_NAME = "gpt-4o-mini"
+# Bump whenever build_prompt changes so cached question sets from the old prompt are not reused
+PROMPT_VERSION = 2
+
+question_cache = QuestionSetCache()
+
+
+def build_prompt(text, number_of_questions):
+    easy, medium, hard = split_evenly(number_of_questions, 3)
+    return f'''
+Your task is to generate exactly {number_of_questions} multiple-choice questions based on the provided text. Follow these instructions precisely:
+
+1. Create {easy} easy, {medium} medium, and {hard} hard questions.
 2. Format the output as a single, valid JSON array
-4. Do not stop generation until all 12 questions are complete.
+4. Do not stop generation until all {number_of_questions} questions are complete.
 5. Ensure the JSON is properly formatted and closed.
 
 Do not include any text before or after the JSON array.
 
-Example structure (repeat this 12 times):
+Example structure (repeat this {number_of_questions} times):
       {{
         "id":1,
         "difficulty": "Easy",
@@ -58,62 +89,121 @@ Generate questions based on this text:
 {text}
 
 Remember:
-- Generate exactly 24 questions.
+- Generate exactly {number_of_questions} questions.
 - Maintain an even distribution of difficulties.
 - strictly Ensure the JSON is complete and valid wihtout any extrat words.
 - Do not stop until all questions are generated.
 - compulsory all data should be present.
         '''
 
-# Making the API call
-        completion = client.chat.completions.create(
-           model="gpt-4o-mini",
-              messages=[{"role": "user", "content": prompt}])
-
-
-
-# The response can be accessed via response.text
-        generated_text = completion.choices[0].message.content
-       
-        
-        # Extracting the response text
-        generated_questions =  generated_text
-        print(generate_questions)
-        return generated_questions
 
+def generate_questions(text, number_of_questions, llm_client=None, cache=question_cache,
+                       concurrency=DEFAULT_CONCURRENCY, max_chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                       on_question=None, dedup_stage=None):
+    """Generate a balanced set of number_of_questions questions from text.
+
+    The text is split into token-bounded chunks that are sent to the LLM
+    concurrently. llm_client may be an async client with complete(prompt) (see
+    llm_clients.FakeLLMClient) or anything with the OpenAI
+    client.chat.completions.create interface; it defaults to the shared OpenAI client.
+    Results are cached by text, model and prompt version, so repeat uploads
+    skip the LLM entirely; pass cache=None to always generate. on_question is
+    called with each question as soon as it is available.
+
+    With a dedup_stage (a dedup_index.DedupStage over get_dedup_index()),
+    questions that near-duplicate a question of an existing set, or one
+    already generated in this call or a concurrent one, are dropped as they
+    are parsed, before on_question sees them. The caller commits the stage
+    once the set is saved.
+    """
+    accept = dedup_stage
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(text, getattr(llm_client, 'model', MODEL_NAME),
+                                   PROMPT_VERSION, number_of_questions)
+        cached = cache.get(cache_key)
+        if cached:
+            if accept is not None:
+                cached = [question for question in cached if accept(question)]
+                _report_duplicates(accept)
+            if on_question is not None:
+                for question in cached:
+                    on_question(question)
+            return cached
+    try:
+        # Only a cache miss needs the LLM, so the default client is created here
+        llm_client = as_llm_client(llm_client or get_openai_client(), model=MODEL_NAME)
+        questions = asyncio.run(generate_question_set(
+            text, number_of_questions, llm_client, build_prompt,
+            max_chunk_tokens=max_chunk_tokens, concurrency=concurrency, on_question=on_question,
+            accept=accept
+        ))
     except Exception as e:
         print(f"An error occurred while generating questions: {str(e)}")
         return []
+    if accept is not None:
+        # Questions trimmed while balancing the set must not block concurrent uploads
+        accept.retain(questions)
+        _report_duplicates(accept)
+    if cache_key is not None and questions:
+        cache.put(cache_key, questions)
+    return questions
 
-def extract_and_save_json(input_string, file_name):
-    # Step 1: Extract the JSON part from the content
-    start_index = input_string.find("```json") + len("```json")
-    end_index = input_string.rfind("```")
 
-    # Extract only the JSON string
-    json_string = input_string[start_index:end_index].strip()
+def _report_duplicates(stage):
+    if stage.dropped:
+        question, (set_id, question_id, _) = stage.dropped[0]
+        where = f"set {set_id} question {question_id}" if set_id is not None else "another question of this set"
+        print(f"Dropped {len(stage.dropped)} near-duplicate questions, e.g. {question!r} matches {where}")
 
-    # Step 2: Convert the extracted string to JSON
-    try:
-        json_data = json.loads(json_string)  # Convert the string to a Python dictionary or list
-        print(json.dumps(json_data, indent=4))  # Pretty-print the JSON data for readability
-
-        # Save the JSON data to a file
-        with open(file_name, 'w') as f:
-            json.dump(json_data, f, indent=4)
-        print(f"JSON data saved to {file_name}")
-        
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
-
-def question_generation(text_content):
+
+def parse_generated_json(input_string):
+    """Extract every valid question from a model completion, fenced or not, even if truncated."""
+    with JSON_PARSE_SECONDS.time():
+        return parse_questions(input_string)
+
+
+def save_questions(questions, file_name):
+    with open(file_name, 'w') as f:
+        json.dump(questions, f, indent=4)
+    print(f"JSON data saved to {file_name}")
+
+
+def extract_and_save_json(input_string, file_name):
+    json_data = parse_generated_json(input_string)
+    if not json_data:
+        print("Error decoding JSON: no valid questions found")
+        return None
+
+    # Save the JSON data to a file
+    save_questions(json_data, file_name)
+    return json_data
+
+def question_generation(text_content, channel=None, store=None, source=None):
+    """Generate questions into a new question set, streaming each one to channel (a QuestionChannel) if given.
+
+    The set is saved to store (default: the shared QuestionSetStore) and its id returned.
+    Near-duplicates of questions in the store's existing sets are left out; if
+    that leaves nothing, the id of the existing set they mostly duplicate is returned.
+    """
+    store = store or QuestionSetStore()
+    publisher = SetPublisher(channel) if channel is not None else None
     try:
-        # text_content = extract_text_from_pdf(file_path)
-        questions = generate_questions(text_content, 30)
-        extract_and_save_json(questions,'output.json')
+        with DedupStage(get_dedup_index(store)) as stage:
+            # text_content = extract_text_from_pdf(file_path)
+            questions = generate_questions(
+                text_content, 30, on_question=publisher.publish if publisher is not None else None,
+                dedup_stage=stage
+            )
+            if questions:
+                set_id = store.save(questions, source=source)
+                stage.commit(set_id, questions)
+                return set_id
+            return stage.duplicate_of()
         # save_questions(user_id, quiz_name, questions)
         # print('Questions successfully saved to Firestore')
     except Exception as e:
         print(f"An error occurred: {str(e)}")
-
-
+    finally:
+        if publisher is not None:
+            publisher.end()
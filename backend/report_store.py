@@ -0,0 +1,359 @@
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import zlib
+from datetime import datetime, timezone
+from metrics import registry as metrics_registry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    username TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id),
+    test_id TEXT NOT NULL,
+    set_id TEXT,
+    created_at TEXT NOT NULL,
+    total_questions INTEGER,
+    total_correct INTEGER,
+    -- zlib-compressed JSON of the report with its detailed_question_performance moved to answers
+    summary BLOB NOT NULL,
+    UNIQUE (user_id, test_id)
+);
+CREATE INDEX IF NOT EXISTS reports_user_created ON reports (user_id, created_at);
+CREATE INDEX IF NOT EXISTS reports_test ON reports (test_id);
+CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at);
+CREATE TABLE IF NOT EXISTS answers (
+    report_id INTEGER NOT NULL REFERENCES reports(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    question_id INTEGER,
+    question TEXT,
+    difficulty TEXT,
+    attempts INTEGER,
+    correct INTEGER,
+    total_time REAL,
+    -- related_topics joined by TOPIC_SEPARATOR, also kept in details, so analytics never unpack blobs
+    topics TEXT,
+    -- zlib-compressed JSON of the remaining question fields (options, topics, links, ...)
+    details BLOB,
+    PRIMARY KEY (report_id, position)
+);
+CREATE INDEX IF NOT EXISTS answers_question ON answers (question);
+"""
+# PRAGMA user_version of a database whose answers have a filled topics column
+SCHEMA_VERSION = 1
+TOPIC_SEPARATOR = '\x1f'
+
+# detailed_question_performance fields kept as answer columns rather than in the details blob
+ANSWER_COLUMNS = ('id', 'question', 'difficulty', 'user_attempts', 'correct_attempts', 'average_time_taken',
+                  'accuracy')
+
+
+def pack(data):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+def join_topics(topics):
+    return TOPIC_SEPARATOR.join(str(topic) for topic in topics or ())
+
+
+def utc_now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ReportStore:
+    """SQLite store for user profiles and quiz reports, replacing the users.json document.
+
+    Each report is split into one answers row per attempted question plus a
+    compressed summary blob, so appending a report is a single small
+    transaction instead of rewriting the whole history. The database runs in
+    WAL mode so readers do not block the writer. Connections are per thread.
+    """
+
+    def __init__(self, path='data/reports.db'):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+                self._backfill_topics(conn)
+                conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    @staticmethod
+    def _backfill_topics(conn):
+        # Databases written before the topics column existed only have the topics in the details blobs
+        if 'topics' not in [column[1] for column in conn.execute("PRAGMA table_info(answers)")]:
+            conn.execute("ALTER TABLE answers ADD COLUMN topics TEXT")
+        rows = conn.execute("SELECT report_id, position, details FROM answers WHERE details IS NOT NULL")
+        conn.executemany("UPDATE answers SET topics = ? WHERE report_id = ? AND position = ?",
+                         [(join_topics(unpack(details).get('related_topics')), report_id, position)
+                          for report_id, position, details in rows.fetchall()])
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def upsert_user(self, user_id, username=None, created_at=None, updated_at=None):
+        now = utc_now()
+        with self._connect() as conn:
+            self._upsert_user(conn, user_id, username, created_at or now, updated_at or now)
+
+    @staticmethod
+    def _upsert_user(conn, user_id, username, created_at, updated_at):
+        conn.execute(
+            "INSERT INTO users (id, username, created_at, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET username = COALESCE(excluded.username, username), "
+            "updated_at = MAX(updated_at, excluded.updated_at)",
+            (user_id, username, created_at, updated_at)
+        )
+
+    def save_report(self, user_id, test_id, report, set_id=None, created_at=None):
+        """Insert the report for (user_id, test_id); returns its row id, or None if that test already has one.
+
+        Stored reports are never replaced, so a client cannot overwrite another user's report.
+        """
+        with self._connect() as conn:
+            return self._save_report(conn, user_id, test_id, report, set_id, created_at or utc_now())
+
+    def save_reports(self, reports):
+        """Write many (user_id, test_id, report, set_id, created_at) tuples in one transaction.
+
+        Returns how many were inserted; reports for tests that already have one are skipped.
+        """
+        inserted = 0
+        with self._connect() as conn:
+            for user_id, test_id, report, set_id, created_at in reports:
+                if self._save_report(conn, user_id, test_id, report, set_id, created_at or utc_now()) is not None:
+                    inserted += 1
+        return inserted
+
+    def _save_report(self, conn, user_id, test_id, report, set_id, created_at):
+        self._upsert_user(conn, user_id, None, created_at, created_at)
+        summary = dict(report)
+        if 'detailed_question_performance' in summary:
+            # The entries live in the answers table; an empty list marks where to put them back
+            summary['detailed_question_performance'] = []
+        cursor = conn.execute(
+            "INSERT INTO reports (user_id, test_id, set_id, created_at, total_questions, total_correct, summary) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (user_id, test_id) DO NOTHING",
+            (user_id, test_id, set_id, created_at, report.get('total_questions'), report.get('total_correct'),
+             pack(summary))
+        )
+        if not cursor.rowcount:
+            print(f"Report {test_id} for {user_id} already exists, not replacing it")
+            return None
+        report_id = cursor.lastrowid
+        detailed = report.get('detailed_question_performance') or ()
+        conn.executemany(
+            "INSERT INTO answers (report_id, position, question_id, question, difficulty, attempts, correct, "
+            "total_time, topics, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(report_id, position, entry.get('id'), entry.get('question'), entry.get('difficulty'),
+              entry.get('user_attempts', 0), entry.get('correct_attempts', 0),
+              entry.get('average_time_taken', 0) * entry.get('user_attempts', 0),
+              join_topics(entry.get('related_topics')),
+              pack({key: value for key, value in entry.items() if key not in ANSWER_COLUMNS}))
+             for position, entry in enumerate(detailed)]
+        )
+        return report_id
+
+    def _assemble(self, conn, report_id, summary):
+        report = unpack(summary)
+        detailed = []
+        for question_id, question, difficulty, attempts, correct, total_time, details in conn.execute(
+                "SELECT question_id, question, difficulty, attempts, correct, total_time, details "
+                "FROM answers WHERE report_id = ? ORDER BY position", (report_id,)):
+            entry = {'id': question_id, 'question': question, 'difficulty': difficulty,
+                     'user_attempts': attempts, 'correct_attempts': correct,
+                     'accuracy': correct / attempts if attempts else 0,
+                     'average_time_taken': total_time / attempts if attempts else 0}
+            entry.update(unpack(details))
+            detailed.append(entry)
+        if 'detailed_question_performance' in report:
+            report['detailed_question_performance'] = detailed
+        return report
+
+    def has_report(self, user_id, test_id):
+        return self._connect().execute("SELECT 1 FROM reports WHERE user_id = ? AND test_id = ?",
+                                       (user_id, test_id)).fetchone() is not None
+
+    def get_report(self, user_id, test_id):
+        conn = self._connect()
+        row = conn.execute("SELECT id, summary FROM reports WHERE user_id = ? AND test_id = ?",
+                           (user_id, test_id)).fetchone()
+        return self._assemble(conn, *row) if row else None
+
+    def list_reports(self, user_id, limit=50):
+        """Newest-first report metadata for a user, without loading the reports themselves."""
+        rows = self._connect().execute(
+            "SELECT test_id, set_id, created_at, total_questions, total_correct FROM reports "
+            "WHERE user_id = ? ORDER BY created_at DESC LIMIT ?", (user_id, limit))
+        return [{'test_id': test_id, 'set_id': set_id, 'created_at': created_at,
+                 'total_questions': total, 'total_correct': correct}
+                for test_id, set_id, created_at, total, correct in rows]
+
+    def iter_reports(self):
+        """Yield (user, test_id, report) like analytics.iter_users_json_reports."""
+        conn = self._connect()
+        for report_id, user_id, test_id, summary in conn.execute(
+                "SELECT id, user_id, test_id, summary FROM reports ORDER BY id").fetchall():
+            yield user_id, test_id, self._assemble(conn, report_id, summary)
+
+    def load_answers(self, after_id=0):
+        """Answered questions of the reports with an id above after_id, as plain rows for analytics.
+
+        Returns a dict with:
+          last_id  the highest report id covered, to pass as after_id next time
+          reports  how many reports are covered
+          answers  (user_id, test_id, question, difficulty, attempts, correct, total_time, topics)
+                   tuples of attempted questions, topics joined by TOPIC_SEPARATOR
+          legacy   (user_id, test_id, report) for reports without detailed_question_performance,
+                   the only ones whose summary has to be unpacked
+        """
+        conn = self._connect()
+        last_id, reports = conn.execute("SELECT COALESCE(MAX(id), ?), COUNT(*) FROM reports WHERE id > ?",
+                                        (after_id, after_id)).fetchone()
+        # Reports and their answers are written in one transaction, so bounding every
+        # query by last_id gives a consistent view while writers keep appending
+        bounds = (after_id, last_id)
+        answers = conn.execute(
+            "SELECT r.user_id, r.test_id, a.question, a.difficulty, a.attempts, a.correct, a.total_time, a.topics "
+            "FROM answers a JOIN reports r ON r.id = a.report_id "
+            "WHERE a.report_id > ? AND a.report_id <= ? AND a.attempts > 0 ORDER BY a.report_id, a.position",
+            bounds).fetchall()
+        legacy = [(user_id, test_id, unpack(summary)) for user_id, test_id, summary in conn.execute(
+            "SELECT user_id, test_id, summary FROM reports r WHERE id > ? AND id <= ? "
+            "AND NOT EXISTS (SELECT 1 FROM answers a WHERE a.report_id = r.id) ORDER BY id", bounds)]
+        return {'last_id': last_id, 'reports': reports, 'answers': answers, 'legacy': legacy}
+
+    def revision(self):
+        """Changes whenever a report is added or replaced; used to invalidate derived caches."""
+        return self._connect().execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM reports").fetchone()
+
+
+class ReportWriter:
+    """Write-behind queue in front of a ReportStore.
+
+    submit() only enqueues, so the WebSocket server can hand off the final
+    report without blocking its event loop; a background thread writes
+    queued reports in batches, one transaction per batch.
+    """
+
+    def __init__(self, store, max_pending=1000, batch_size=64):
+        self.store = store
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._run, name='report-writer', daemon=True)
+        self._thread.start()
+        metrics_registry.gauge('report_writer_queue_depth', 'Reports waiting to be written.').set_function(self.pending)
+
+    def submit(self, user_id, test_id, report, set_id=None, created_at=None):
+        """Queue a report for writing; returns False if the queue is full."""
+        try:
+            self._queue.put_nowait((user_id, test_id, report, set_id, created_at or utc_now()))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"Report queue full, dropping report {test_id} for {user_id}")
+            return False
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every queued report has been written."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not None and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            reports = [entry for entry in batch if entry is not None]
+            try:
+                if reports:
+                    self.store.save_reports(reports)
+                    self.written += len(reports)
+            except Exception as e:
+                self.failed += len(reports)
+                print(f"Failed to write {len(reports)} reports: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(reports) < len(batch):
+                self.store.close()
+                return
+
+
+def _test_timestamp(test_id):
+    # The frontend names tests test<Date.now()>
+    match = re.fullmatch(r'test(\d{13})', test_id)
+    if match:
+        return datetime.fromtimestamp(int(match.group(1)) / 1000, timezone.utc).isoformat()
+    return None
+
+
+def import_users_json(path, store):
+    """Copy the users and reports of a users.json document into store; returns (users, reports inserted).
+
+    Reports already in the store are skipped, so importing the same file twice adds nothing.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    users = reports = 0
+    for user_id, profile in data.get('users', {}).items():
+        updated_at = profile.get('updatedAt') or utc_now()
+        store.upsert_user(user_id, profile.get('username'), profile.get('createdAt') or updated_at, updated_at)
+        users += 1
+        batch = []
+        for test_id, test in (profile.get('tests') or {}).items():
+            if test.get('type') == 'report' and isinstance(test.get('data'), dict):
+                batch.append((user_id, test_id, test['data'], None, _test_timestamp(test_id) or updated_at))
+        reports += store.save_reports(batch)
+    return users, reports
+
+
+if __name__ == '__main__':
+    # python report_store.py users.json [data/reports.db]
+    source = sys.argv[1] if len(sys.argv) > 1 else 'users.json'
+    store = ReportStore(*sys.argv[2:3])
+    users, reports = import_users_json(source, store)
+    print(f"Imported {users} users and {reports} reports from {source} into {store.path}")
@@ -0,0 +1,92 @@
+import heapq
+
+
+class RepetitionScheduler:
+    """Spaced-repetition queue backed by a binary heap keyed by (review_time, question_id).
+
+    Scheduling and popping are O(log n). A question may be scheduled several times
+    (e.g. at 5, 25 and 120 minutes); when more than one of its reviews is due at
+    once it is only returned once and the extra entries are dropped.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._questions = {}  # question_id -> question, for ids still in the heap
+        self._entries = {}    # question_id -> number of heap entries for that id
+        self._served = {}     # question_id -> time it was last returned as due
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __bool__(self):
+        return bool(self._heap)
+
+    def __contains__(self, question_id):
+        return question_id in self._questions
+
+    def schedule(self, question, review_time):
+        question_id = question['id']
+        heapq.heappush(self._heap, (review_time, question_id))
+        self._questions[question_id] = question
+        self._entries[question_id] = self._entries.get(question_id, 0) + 1
+
+    def schedule_many(self, question, review_times):
+        for review_time in review_times:
+            self.schedule(question, review_time)
+
+    def to_state(self, encode_time=lambda t: t):
+        """Heap entries and served times as plain lists, e.g. for a session checkpoint."""
+        return {
+            'entries': [[encode_time(review_time), question_id] for review_time, question_id in self._heap],
+            'served': [[question_id, encode_time(served_at)] for question_id, served_at in self._served.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state, lookup, decode_time=lambda t: t):
+        """Rebuild a scheduler from to_state() output; lookup maps a question id to its question."""
+        scheduler = cls()
+        # to_state() lists the heap array in order, so it is still a valid heap
+        scheduler._heap = [(decode_time(review_time), question_id) for review_time, question_id in state['entries']]
+        for _, question_id in scheduler._heap:
+            scheduler._questions[question_id] = lookup(question_id)
+            scheduler._entries[question_id] = scheduler._entries.get(question_id, 0) + 1
+        scheduler._served = {question_id: decode_time(served_at) for question_id, served_at in state['served']}
+        return scheduler
+
+    def next_review_time(self):
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_entry(self):
+        review_time, question_id = heapq.heappop(self._heap)
+        question = self._questions[question_id]
+        served_at = self._served.get(question_id)
+        duplicate = served_at is not None and review_time <= served_at
+        self._entries[question_id] -= 1
+        if not self._entries[question_id]:
+            del self._entries[question_id]
+            del self._questions[question_id]
+            self._served.pop(question_id, None)
+        return question_id, question, duplicate
+
+    def pop_due(self, now):
+        """Return the earliest question due at or before now, or None if nothing is due."""
+        while self._heap and self._heap[0][0] <= now:
+            question_id, question, duplicate = self._pop_entry()
+            if duplicate:
+                continue
+            if question_id in self._entries:
+                self._served[question_id] = now
+            return question
+        return None
+
+    def pop_all_due(self, now):
+        """Return every distinct question due at or before now, earliest first."""
+        due = []
+        seen = set()
+        while self._heap and self._heap[0][0] <= now:
+            question_id, question, duplicate = self._pop_entry()
+            if duplicate or question_id in seen:
+                continue
+            seen.add(question_id)
+            due.append(question)
+        return due
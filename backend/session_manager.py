@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import json
+import os
+from flashcard_system import AdaptiveFlashcardSystem, load_question_file
+from question_bank import QuestionBank
+
+
+class QuestionBankCache:
+    """Keep one parsed copy of a questions file, re-reading it only when its mtime changes."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.questions = QuestionBank()
+        self.mtime = None
+        self.reloads = 0
+        self._lock = asyncio.Lock()
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.file_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _reload(self, mtime):
+        # The bank is shared by every session, so it is indexed once and never mutated
+        questions = load_question_file(self.file_path)
+        # Hashing the parsed content means touching the file does not invalidate checkpoints
+        digest = hashlib.sha256(json.dumps(questions, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        self.questions = QuestionBank(questions, identity=f"file:{digest}")
+        self.mtime = mtime
+        self.reloads += 1
+        return self.questions
+
+    def get(self):
+        """Return the current bank, reloading it synchronously if the file changed."""
+        mtime = self._current_mtime()
+        if mtime is not None and mtime != self.mtime:
+            return self._reload(mtime)
+        return self.questions
+
+    async def get_async(self):
+        """Return the current bank without blocking the event loop on file I/O."""
+        mtime = self._current_mtime()
+        if mtime is None or mtime == self.mtime:
+            return self.questions
+        async with self._lock:
+            # Another connection may have finished the reload while we waited
+            if mtime != self.mtime:
+                await asyncio.to_thread(self._reload, mtime)
+        return self.questions
+
+
+class SessionManager:
+    """Create an independent AdaptiveFlashcardSystem per connection over a shared question bank."""
+
+    def __init__(self, questions_file, store=None):
+        self.bank = QuestionBankCache(questions_file)
+        # Optional QuestionSetStore; when it has sets, they take precedence over questions_file
+        self.store = store
+        self.active_sessions = 0
+
+    async def load_set(self, set_id=None):
+        """Return the bank for set_id (default: latest stored set), None if unknown, or the file bank without a store."""
+        if self.store is None:
+            return await self.bank.get_async()
+        bank = await asyncio.to_thread(self.store.load, set_id)
+        if bank is None and set_id is None:
+            # Nothing has been generated into the store yet
+            return await self.bank.get_async()
+        return bank
+
+    def create_session(self, questions):
+        return AdaptiveFlashcardSystem(self.bank.file_path, questions=questions)
+
+    async def open_session(self, questions=None):
+        """Start a session over the given bank, or over the questions file if none is given."""
+        if questions is None:
+            questions = await self.load_set()
+        self.active_sessions += 1
+        return self.create_session(questions)
+
+    def restore_session(self, questions, state):
+        """Rebuild a session from a checkpoint taken by AdaptiveFlashcardSystem.checkpoint()."""
+        self.active_sessions += 1
+        return AdaptiveFlashcardSystem.from_checkpoint(self.bank.file_path, questions, state)
+
+    def close_session(self, session):
+        self.active_sessions -= 1
@@ -0,0 +1,81 @@
+import heapq
+from collections import deque
+
+
+class SessionStats:
+    """Running aggregates for one quiz session, updated in O(1) per answer.
+
+    Keeps session totals, per-difficulty counters, per-question counters and a
+    ring buffer over the most recent answers, so reports and difficulty
+    adjustments never re-scan the question history.
+    """
+
+    def __init__(self, recent_window=5):
+        self.total_questions = 0
+        self.total_correct = 0
+        self.total_time = 0
+        # difficulty -> {'attempts', 'correct', 'total_time'}
+        self.by_difficulty = {}
+        # question id -> {'attempts', 'correct', 'total_time'}
+        self.per_question = {}
+        self.recent = deque(maxlen=recent_window)
+        self.recent_correct = 0
+
+    def record(self, question_id, difficulty, is_correct, time_taken):
+        self.total_questions += 1
+        self.total_correct += int(is_correct)
+        self.total_time += time_taken
+
+        for counters in (self.by_difficulty.setdefault(difficulty, _counters()),
+                         self.per_question.setdefault(question_id, _counters())):
+            counters['attempts'] += 1
+            counters['correct'] += int(is_correct)
+            counters['total_time'] += time_taken
+
+        # The oldest answer falls out of the window when a new one is appended
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_correct -= self.recent[0]
+        self.recent.append(int(is_correct))
+        self.recent_correct += int(is_correct)
+
+    def recent_accuracy(self, default=0.5):
+        if not self.recent:
+            return default
+        return self.recent_correct / len(self.recent)
+
+    def recent_accuracy_after(self, is_correct):
+        """What recent_accuracy() would be after one more answer, without recording it."""
+        correct, size = self.recent_correct + int(is_correct), len(self.recent) + 1
+        if len(self.recent) == self.recent.maxlen:
+            correct, size = correct - self.recent[0], size - 1
+        return correct / size
+
+    def overall_accuracy(self):
+        return self.total_correct / self.total_questions if self.total_questions > 0 else 0
+
+    def average_time(self):
+        return self.total_time / self.total_questions if self.total_questions > 0 else 0
+
+    def difficulty_performance(self, difficulties=("Easy", "Medium", "Hard")):
+        performance = {}
+        for difficulty in difficulties:
+            counters = self.by_difficulty.get(difficulty)
+            if counters:
+                performance[difficulty] = {
+                    "accuracy": counters['correct'] / counters['attempts'],
+                    "average_time": counters['total_time'] / counters['attempts'],
+                    "total_questions": counters['attempts']
+                }
+        return performance
+
+    def most_challenging(self, k=3):
+        """The k attempted questions with the lowest accuracy, fastest average time first among ties."""
+        return heapq.nsmallest(
+            k, self.per_question.items(),
+            key=lambda item: (item[1]['correct'] / item[1]['attempts'],
+                              item[1]['total_time'] / item[1]['attempts'])
+        )
+
+
+def _counters():
+    return {'attempts': 0, 'correct': 0, 'total_time': 0}
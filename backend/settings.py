@@ -0,0 +1,18 @@
+import os
+import threading
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_setting(name, default=None):
+    """os.getenv, after loading .env into the environment the first time any setting is read."""
+    global _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                # Imported here so processes that never read a setting skip python-dotenv entirely
+                from dotenv import load_dotenv
+                load_dotenv()
+                _loaded = True
+    return os.getenv(name, default)
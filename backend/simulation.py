@@ -0,0 +1,157 @@
+import random
+import time
+import tracemalloc
+
+from Adaptive_Collaborator import AdaptiveQuizSystem
+from flashcard_system import AdaptiveFlashcardSystem
+from question_bank import DIFFICULTIES, QuestionBank
+
+# Mean seconds per answer for an average learner, by difficulty
+DEFAULT_RESPONSE_TIMES = {"Easy": 8.0, "Medium": 15.0, "Hard": 25.0}
+
+
+class SyntheticLearner:
+    """A scripted learner with a fixed chance of answering each difficulty correctly.
+
+    Response times are log-normal around mean_times[difficulty] with spread
+    sigma. The learner's right difficulty is the hardest one it still answers
+    correctly at least `target_accuracy` of the time.
+    """
+
+    def __init__(self, ability, mean_times=None, sigma=0.4, target_accuracy=0.5):
+        self.ability = ability
+        self.mean_times = mean_times or DEFAULT_RESPONSE_TIMES
+        self.sigma = sigma
+        self.target_difficulty = DIFFICULTIES[0]
+        for difficulty in DIFFICULTIES:
+            if ability.get(difficulty, 0) >= target_accuracy:
+                self.target_difficulty = difficulty
+
+    def answer(self, question, rng):
+        """Return (answer letter, seconds taken) for question."""
+        difficulty = question['difficulty']
+        correct_answer = question['correctAnswer'].upper()
+        if rng.random() < self.ability.get(difficulty, 0):
+            answer = correct_answer
+        else:
+            answer = rng.choice([option for option in question['options'] if option.upper() != correct_answer])
+        mean = self.mean_times.get(difficulty, 15.0)
+        return answer, rng.lognormvariate(0, self.sigma) * mean
+
+    @classmethod
+    def random(cls, rng, sigma=0.4):
+        """A learner whose ability falls off with difficulty from a random starting level."""
+        skill = rng.uniform(0.4, 1.0)
+        ability = {difficulty: max(0.05, min(0.98, skill - 0.25 * i + rng.gauss(0, 0.05)))
+                   for i, difficulty in enumerate(DIFFICULTIES)}
+        pace = rng.uniform(0.6, 1.6)
+        mean_times = {difficulty: seconds * pace for difficulty, seconds in DEFAULT_RESPONSE_TIMES.items()}
+        return cls(ability, mean_times, sigma)
+
+
+class FlashcardEngine:
+    """Drives AdaptiveFlashcardSystem the way websocket_server.py does for one answer."""
+
+    name = "flashcard"
+
+    def __init__(self, questions):
+        self.system = AdaptiveFlashcardSystem(None, questions=questions)
+
+    def select(self):
+        return self.system.select_question()
+
+    def answer(self, question, answer, time_taken):
+        self.system.process_answer(question, answer, time_taken)
+        self.system.adjust_difficulty()
+
+
+class QuizEngine:
+    """Drives the Q-learning AdaptiveQuizSystem for one answer."""
+
+    name = "quiz"
+
+    def __init__(self, questions, q_table=None):
+        self.system = AdaptiveQuizSystem(questions, q_table=q_table)
+
+    def select(self):
+        return self.system.ask_question()
+
+    def answer(self, question, answer, time_taken):
+        self.system.process_answer(question, answer, time_taken)
+
+
+ENGINES = {"flashcard": FlashcardEngine, "quiz": QuizEngine}
+
+
+class SessionResult:
+    def __init__(self, learner, difficulties, correct, elapsed):
+        self.learner = learner
+        self.difficulties = difficulties
+        self.correct = correct
+        # Wall-clock seconds spent inside the engine
+        self.elapsed = elapsed
+
+    @property
+    def answers_to_target(self):
+        """Questions served before the first one at the learner's right difficulty, or None."""
+        try:
+            return self.difficulties.index(self.learner.target_difficulty)
+        except ValueError:
+            return None
+
+    @property
+    def time_on_target(self):
+        """Fraction of questions served at the learner's right difficulty."""
+        if not self.difficulties:
+            return 0.0
+        return self.difficulties.count(self.learner.target_difficulty) / len(self.difficulties)
+
+
+def run_session(engine, learner, answers, rng):
+    """Run one headless session of `answers` questions; returns a SessionResult."""
+    difficulties, correct = [], 0
+    started = time.perf_counter()
+    for _ in range(answers):
+        question = engine.select()
+        answer, time_taken = learner.answer(question, rng)
+        engine.answer(question, answer, time_taken)
+        difficulties.append(question['difficulty'])
+        correct += answer.upper() == question['correctAnswer'].upper()
+    return SessionResult(learner, difficulties, correct, time.perf_counter() - started)
+
+
+def simulate(engine_name, questions, sessions, answers=15, seed=0, engine_options=None):
+    """Run `sessions` seeded sessions against one engine and return their SessionResults.
+
+    The engines draw from the global `random` module, so it is reseeded per
+    session; together with the learner RNG this makes a run reproducible.
+    """
+    bank = questions if isinstance(questions, QuestionBank) else QuestionBank(questions)
+    engine_class = ENGINES[engine_name]
+    results = []
+    for i in range(sessions):
+        rng = random.Random(seed * 1_000_003 + i)
+        random.seed(rng.random())
+        learner = SyntheticLearner.random(rng)
+        results.append(run_session(engine_class(bank, **(engine_options or {})), learner, answers, rng))
+    return results
+
+
+def memory_per_session(engine_name, questions, sessions=200, answers=15, seed=0):
+    """Average bytes retained by one finished session over a shared bank."""
+    bank = questions if isinstance(questions, QuestionBank) else QuestionBank(questions)
+    engine_class = ENGINES[engine_name]
+    rng = random.Random(seed)
+    learners = [SyntheticLearner.random(rng) for _ in range(sessions)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        engines = []
+        for learner in learners:
+            engine = engine_class(bank)
+            run_session(engine, learner, answers, rng)
+            engines.append(engine)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return retained / sessions
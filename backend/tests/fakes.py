@@ -0,0 +1,20 @@
+import hashlib
+import threading
+import time
+
+
+class FakeSearchBackend:
+    """Stands in for YouTubeSearchBackend: deterministic video ids after a fixed delay."""
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.calls = 0
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def search(self, query, max_results=1):
+        with self._lock:
+            self.calls += 1
+            self.queries.append(query)
+        time.sleep(self.latency)
+        return [hashlib.sha1(query.encode()).hexdigest()[:11]]
@@ -0,0 +1,59 @@
+import random
+import sqlite3
+
+from analytics import AnswerTable, CohortAnalytics, cohort_summary
+from report_store import ReportStore
+
+
+def make_report(rng, answered=5):
+    detailed = []
+    for i in range(answered):
+        attempts = rng.randint(0, 3)
+        correct = rng.randint(0, attempts)
+        detailed.append({
+            "id": i + 1, "question": f"Question {rng.randint(1, 12)}?",
+            "difficulty": rng.choice(["Easy", "Medium", "Hard"]),
+            "user_attempts": attempts, "correct_attempts": correct,
+            "accuracy": correct / attempts if attempts else 0, "average_time_taken": rng.uniform(1, 20),
+            "options": {"A": "yes", "B": "no"}, "correctAnswer": "A", "explanation": "Because.",
+            "related_topics": rng.sample(["NLP", "Vision", "Statistics", "Ethics"], 2), "related_links": [],
+        })
+    return {"total_questions": answered, "detailed_question_performance": detailed}
+
+
+def fill(store, rng, reports, start=0):
+    store.save_reports([(f"user{i % 7}@example.com", f"test{i}", make_report(rng), None, None)
+                        for i in range(start, start + reports)])
+
+
+def summary_from_blobs(store):
+    return cohort_summary(AnswerTable.from_reports(store.iter_reports()))
+
+
+def test_incremental_table_matches_a_full_rebuild(tmp_path):
+    rng = random.Random(0)
+    store = ReportStore(str(tmp_path / "reports.db"))
+    fill(store, rng, 40)
+    # A report from before detailed_question_performance existed
+    store.save_report("old@example.com", "test-old", {"wrong_answers": [
+        {"question": "Question 1?", "difficulty": "Easy", "time_taken": 4.0, "related_topics": ["NLP"]}]})
+    analytics = CohortAnalytics(store=store)
+    assert analytics.summary() == summary_from_blobs(store)
+
+    table = analytics.table()
+    fill(store, rng, 3, start=40)
+    assert analytics.summary() == summary_from_blobs(store)
+    assert len(analytics.table()) > len(table)
+    assert analytics.table() is analytics.table()
+
+
+def test_topics_are_backfilled_for_existing_databases(tmp_path):
+    path = str(tmp_path / "reports.db")
+    store = ReportStore(path)
+    fill(store, random.Random(1), 10)
+    store.close()
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE answers SET topics = NULL")
+        conn.execute("PRAGMA user_version = 0")
+    store = ReportStore(path)
+    assert CohortAnalytics(store=store).summary() == summary_from_blobs(store)
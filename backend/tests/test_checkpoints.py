@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+from checkpoints import CheckpointStore, FileCheckpointStore, new_token
+
+
+def test_file_store_resumes_from_disk_and_counts_without_listing(tmp_path, monkeypatch):
+    store = FileCheckpointStore(str(tmp_path))
+    tokens = [new_token() for _ in range(3)]
+    for i, token in enumerate(tokens):
+        store.save(token, {"answered": i})
+    store.delete(tokens[0])
+    store.flush()
+
+    monkeypatch.setattr(os, "listdir", lambda path: (_ for _ in ()).throw(AssertionError("listdir called")))
+    assert len(store) == 2
+    monkeypatch.undo()
+
+    # A second process sharing the directory reads the written files
+    other = FileCheckpointStore(str(tmp_path))
+    assert asyncio.run(other.load_async(tokens[1])) == ({"answered": 1}, None)
+    assert asyncio.run(other.load_async(tokens[0])) is None
+    store.close()
+
+
+def test_expired_checkpoints_are_not_counted(tmp_path):
+    store = FileCheckpointStore(str(tmp_path), ttl=-1)
+    store.save(new_token(), {"answered": 0})
+    assert len(store) == 0
+    store.close()
+
+
+def test_memory_store_load_async_reads_spilled_checkpoints(tmp_path):
+    store = CheckpointStore(max_sessions=1, spill_dir=str(tmp_path))
+    first, second = new_token(), new_token()
+    store.save(first, {"answered": 1}, bank="bank")
+    store.save(second, {"answered": 2}, bank="bank")
+    assert asyncio.run(store.load_async(second)) == ({"answered": 2}, "bank")
+    assert asyncio.run(store.load_async(first)) == ({"answered": 1}, None)
@@ -0,0 +1,35 @@
+import random
+
+from dedup_index import DedupIndex, DedupStage
+from llm_clients import synthetic_question
+
+
+def questions(count, seed=0):
+    rng = random.Random(seed)
+    return [synthetic_question(rng, i + 1, "Easy") for i in range(count)]
+
+
+def test_trimmed_questions_do_not_block_concurrent_uploads(tmp_path):
+    index = DedupIndex(path=str(tmp_path / "dedup.npz"))
+    generated = questions(6)
+    with DedupStage(index) as first, DedupStage(index) as second:
+        assert all(first(question) for question in generated)
+        # Running uploads do not both keep a question
+        assert not second(generated[0])
+        first.retain(generated[:2])  # the set was trimmed to two questions
+        assert not second(generated[1])
+        assert all(second(question) for question in generated[2:])
+
+
+def test_only_saved_questions_reach_the_shared_index(tmp_path):
+    index = DedupIndex(path=str(tmp_path / "dedup.npz"))
+    generated = questions(6, seed=1)
+    with DedupStage(index) as stage:
+        for question in generated:
+            stage(question)
+        stage.retain(generated[:3])
+        stage.commit("set-1", generated[:3])
+    assert len(index) == 3
+    assert index.find(generated[0])[0] == "set-1"
+    assert index.find(generated[4]) is None
+    assert not index._runs
@@ -0,0 +1,20 @@
+import asyncio
+
+from generation_pipeline import chunk_text, generate_question_set, spread_chunks
+from llm_clients import FakeLLMClient
+from questiongeneration import build_prompt
+
+
+def test_spread_chunks_covers_the_whole_document():
+    chunks = list(range(100))
+    assert spread_chunks(chunks, 4) == [12, 37, 62, 87]
+    assert spread_chunks(chunks[:3], 4) == [0, 1, 2]
+
+
+def test_llm_calls_follow_question_count_not_document_length():
+    text = "\n\n".join(f"Paragraph {i}. " + "Gradient descent follows the slope downhill. " * 60 for i in range(100))
+    assert len(chunk_text(text, 500)) >= 100
+    client = FakeLLMClient()
+    questions = asyncio.run(generate_question_set(text, 10, client, build_prompt, max_chunk_tokens=500))
+    assert client.calls == 4
+    assert len(questions) == 10
@@ -0,0 +1,27 @@
+from json_stream import QuestionStreamParser, parse_questions
+
+
+def question(i, text, quote='"'):
+    q = quote
+    return (f"{{{q}id{q}: {i}, {q}difficulty{q}: {q}Easy{q}, {q}question{q}: {q}{text}{q}, "
+            f"{q}options{q}: {{{q}A{q}: {q}yes{q}, {q}B{q}: {q}no{q}}}, {q}correctAnswer{q}: {q}A{q}, "
+            f"{q}explanation{q}: {q}because{q}, {q}related_topics{q}: [{q}sets{q}]}}")
+
+
+def test_braces_inside_single_quoted_strings():
+    text = "[" + question(1, "Is {} an empty dict?", "'") + ", " + question(2, "What closes a set }?", "'") + "]"
+    assert [q['question'] for q in parse_questions(text)] == ["Is {} an empty dict?", "What closes a set }?"]
+
+
+def test_apostrophes_inside_double_quoted_strings():
+    text = question(1, "Isn't {x} a set?") + question(2, "What's next?")
+    assert [q['id'] for q in parse_questions(text)] == [1, 2]
+
+
+def test_streamed_one_character_at_a_time():
+    text = "```json\n[" + question(1, "A '}' brace", '"') + ", " + question(2, "Say \\\"{\\\"") + "]\n```"
+    parser = QuestionStreamParser()
+    questions = [q for char in text for q in parser.feed(char)]
+    parser.close()
+    assert [q['id'] for q in questions] == [1, 2]
+    assert not parser.rejected
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import threading
+
+import websockets
+
+from question_channel import QuestionChannel, LiveBankSubscriber, SetPublisher
+from websocket_server import FlashcardWebSocketServer
+
+
+def make_question(i, difficulty="Easy"):
+    return {"id": i, "difficulty": difficulty, "question": f"Question {i}?",
+            "options": {"A": "yes", "B": "no"}, "correctAnswer": "A",
+            "explanation": "Because.", "related_topics": ["testing"]}
+
+
+def test_interleaved_producers_get_their_own_banks():
+    channel = QuestionChannel()
+    subscriber = LiveBankSubscriber()
+    channel.subscribe(subscriber)
+    first, second = SetPublisher(channel, "job-1"), SetPublisher(channel, "job-2")
+    first.publish(make_question(1))
+    first_bank = subscriber.active_bank()
+    second.publish(make_question(1, "Hard"))
+    second_bank = subscriber.active_bank()
+    first.publish(make_question(2))
+    second.publish(make_question(2, "Hard"))
+    assert first_bank is not second_bank
+    first.end()
+    assert first_bank.complete and not second_bank.complete
+    assert subscriber.active_bank() is second_bank
+    second.publish(make_question(3, "Hard"))
+    second.end()
+    assert [q["difficulty"] for q in first_bank] == ["Easy", "Easy"]
+    assert [q["difficulty"] for q in second_bank] == ["Hard", "Hard", "Hard"]
+    assert subscriber.active_bank() is None
+    assert subscriber.find(first_bank.identity) is first_bank
+
+
+def test_first_question_reaches_client_while_generation_runs():
+    async def run():
+        channel = QuestionChannel()
+        quiz_server = FlashcardWebSocketServer("127.0.0.1", 0, "missing.json", questions_per_session=2,
+                                               live_channel=channel)
+        release = threading.Event()
+        finished = threading.Event()
+
+        def producer():
+            publisher = SetPublisher(channel, "upload")
+            publisher.publish(make_question(1))
+            # Hold the rest of the set back until the client has its first question
+            release.wait(10)
+            publisher.publish(make_question(2))
+            publisher.end()
+            finished.set()
+
+        async with await quiz_server.serve("127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            thread = threading.Thread(target=producer)
+            thread.start()
+            while quiz_server.live_questions.active_bank() is None:
+                await asyncio.sleep(0.01)
+            try:
+                async with websockets.connect(f"ws://127.0.0.1:{port}") as websocket:
+                    message = json.loads(await websocket.recv())
+                    while message["type"] != "question":
+                        message = json.loads(await websocket.recv())
+                    assert not finished.is_set()
+                    assert message["data"]["question"] == "Question 1?"
+            finally:
+                release.set()
+                await asyncio.to_thread(thread.join)
+        assert finished.is_set()
+
+    asyncio.run(asyncio.wait_for(run(), 30))
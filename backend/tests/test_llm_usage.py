@@ -0,0 +1,45 @@
+import asyncio
+from types import SimpleNamespace
+
+import metrics
+from generation_pipeline import generate_chunk_questions
+from llm_clients import FakeLLMClient, OpenAIChatClient
+from questiongeneration import build_prompt
+
+
+class StreamingOpenAIStub:
+    """Sync client shaped like openai.OpenAI whose stream ends with a usage chunk, as with include_usage."""
+
+    def __init__(self, text):
+        self.text = text
+        self.kwargs = None
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.kwargs = kwargs
+        delta = lambda content: SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))],
+                                                usage=None)
+        chunks = [delta(self.text[i:i + 50]) for i in range(0, len(self.text), 50)]
+        return chunks + [SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=1234, completion_tokens=567))]
+
+
+def histogram_sum(histogram):
+    return histogram.snapshot()[1]
+
+
+def test_streamed_usage_is_recorded():
+    text = FakeLLMClient()._completion(build_prompt("text", 3))
+    stub = StreamingOpenAIStub(text)
+    prompt_before = histogram_sum(metrics.LLM_PROMPT_TOKENS)
+    completion_before = histogram_sum(metrics.LLM_COMPLETION_TOKENS)
+    questions = asyncio.run(generate_chunk_questions("text", 3, OpenAIChatClient(stub), build_prompt))
+    assert questions
+    assert stub.kwargs["stream_options"] == {"include_usage": True}
+    assert histogram_sum(metrics.LLM_PROMPT_TOKENS) - prompt_before == 1234
+    assert histogram_sum(metrics.LLM_COMPLETION_TOKENS) - completion_before == 567
+
+
+def test_missing_usage_falls_back_to_an_estimate():
+    before = histogram_sum(metrics.LLM_COMPLETION_TOKENS)
+    asyncio.run(generate_chunk_questions("text", 3, FakeLLMClient(), build_prompt))
+    assert histogram_sum(metrics.LLM_COMPLETION_TOKENS) > before
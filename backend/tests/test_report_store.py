@@ -0,0 +1,30 @@
+import json
+
+from report_store import ReportStore, ReportWriter, import_users_json
+
+
+def users_json(path):
+    report = {"total_questions": 1, "detailed_question_performance": [
+        {"id": 1, "question": "Q?", "difficulty": "Easy", "user_attempts": 1, "correct_attempts": 1,
+         "average_time_taken": 3.0, "accuracy": 1.0, "related_topics": ["NLP"]}]}
+    data = {"users": {"a@example.com": {"username": "a", "tests": {
+        "test1700000000000": {"type": "report", "data": report},
+        "test1700000000001": {"type": "report", "data": report}}}}}
+    path.write_text(json.dumps(data))
+    return str(path)
+
+
+def test_import_counts_only_inserted_reports(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    source = users_json(tmp_path / "users.json")
+    assert import_users_json(source, store) == (1, 2)
+    assert import_users_json(source, store) == (1, 0)
+
+
+def test_close_writes_queued_reports(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.db"))
+    writer = ReportWriter(store)
+    for i in range(20):
+        writer.submit("a@example.com", f"test{i}", {"total_questions": 0})
+    writer.close()
+    assert store.revision()[0] == 20
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import youtubevideo
+from fakes import FakeSearchBackend
+from youtubevideo import EMBED_URL, EmbedLinkResolver
+
+
+class FailingSearchBackend(FakeSearchBackend):
+    """Fails the first `failures` searches, then behaves like FakeSearchBackend."""
+
+    def __init__(self, failures=1):
+        super().__init__(latency=0)
+        self.failures = failures
+
+    def search(self, query, max_results=1):
+        if self.failures:
+            self.failures -= 1
+            with self._lock:
+                self.calls += 1
+            raise RuntimeError("quota exceeded")
+        return super().search(query, max_results)
+
+
+class BlockingSearchBackend(FakeSearchBackend):
+    """Holds every search until release is set."""
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.release = threading.Event()
+
+    def search(self, query, max_results=1):
+        self.release.wait(5)
+        return super().search(query, max_results)
+
+
+def make_resolver(backend=None, **kwargs):
+    return EmbedLinkResolver(backend=backend or FakeSearchBackend(latency=0), max_workers=4, **kwargs)
+
+
+def test_equivalent_keyword_lists_share_one_search():
+    resolver = make_resolver()
+    first = resolver.resolve(["Topic 3", "Machine  Learning"])
+    second = resolver.resolve(["machine learning", "topic 3", "Topic 3"])
+    assert first is not None and first == second
+    assert first.startswith(EMBED_URL.format(""))
+    assert resolver.backend.calls == 1
+    assert resolver.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'searches': 1}
+
+
+def test_search_keeps_the_callers_keyword_order():
+    resolver = make_resolver()
+    resolver.resolve(["Topic 3", "Machine Learning"])
+    assert resolver.backend.queries == ["Topic 3 Machine Learning"]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(youtubevideo.time, 'monotonic', lambda: now[0])
+    resolver = make_resolver(ttl=60)
+    resolver.resolve(["NLP"])
+    now[0] += 59
+    resolver.resolve(["NLP"])
+    assert resolver.backend.calls == 1
+    now[0] += 2
+    resolver.resolve(["NLP"])
+    assert resolver.backend.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    resolver = make_resolver(max_entries=2)
+    resolver.resolve(["a"])
+    resolver.resolve(["b"])
+    resolver.resolve(["a"])  # a is now more recent than b
+    resolver.resolve(["c"])  # evicts b
+    assert resolver.stats()['entries'] == 2
+    resolver.resolve(["a"])
+    assert resolver.backend.calls == 3
+    resolver.resolve(["b"])
+    assert resolver.backend.calls == 4
+
+
+def test_concurrent_requests_for_one_key_are_coalesced():
+    backend = BlockingSearchBackend()
+    resolver = make_resolver(backend)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resolver.resolve(["Deep", "Learning"])))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while resolver.stats()['misses'] < len(threads) and time.monotonic() < deadline:
+        time.sleep(0.001)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert backend.calls == 1
+    assert len(results) == len(threads) and len(set(results)) == 1 and results[0] is not None
+    assert resolver.stats()['searches'] == 1
+
+
+def test_errors_are_not_cached():
+    resolver = make_resolver(FailingSearchBackend(failures=1))
+    assert resolver.resolve(["NLP"]) is None
+    assert resolver.stats()['entries'] == 0
+    assert resolver.resolve(["NLP"]) is not None
+    assert resolver.backend.calls == 2
+
+
+def test_resolve_many_keeps_order_and_searches_each_key_once():
+    resolver = make_resolver()
+    links = resolver.resolve_many([["b", "a"], ["c"], ["A", "B"], [""]])
+    assert links[0] == links[2] and links[0] != links[1] and links[3] is None
+    assert sorted(resolver.backend.queries) == ["b a", "c"]
@@ -0,0 +1,52 @@
+from dedup_index import DedupStage
+from pdf_extraction import extract_text_from_pdf
+from question_channel import SetPublisher
+from questiongeneration import generate_questions, get_dedup_index
+
+UPLOAD_FOLDER = 'uploads/'
+
+# Allowed extensions
+ALLOWED_EXTENSIONS = {'pdf', 'txt'}
+
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def process_upload(job, file_path, filename, question_store, llm_client, channel=None):
+    """Background job: extract text, generate questions and persist them.
+
+    With a QuestionChannel, questions are also published to live quiz sessions
+    in the same process as they are generated. Near-duplicates of questions in
+    question_store's existing sets are dropped; an upload that only repeats an
+    existing set returns that set's id with a question_count of 0.
+    """
+    job.set_stage('extract')
+    if filename.endswith('.pdf'):
+        text = extract_text_from_pdf(file_path)
+    else:
+        with open(file_path, 'r') as f:
+            text = f.read()
+
+    job.set_stage('generate')
+    publisher = SetPublisher(channel, job.id) if channel is not None else None
+    with DedupStage(get_dedup_index(question_store)) as stage:
+        try:
+            questions = generate_questions(text, 30, llm_client=llm_client,
+                                           on_question=publisher.publish if publisher is not None else None,
+                                           dedup_stage=stage)
+        finally:
+            if publisher is not None:
+                publisher.end()
+        if not questions:
+            duplicate_of = stage.duplicate_of()
+            if duplicate_of is None:
+                raise RuntimeError('Question generation failed')
+            return {'set_id': duplicate_of, 'question_count': 0}
+
+        job.set_stage('persist')
+        set_id = question_store.save(questions, source=filename)
+        # Later uploads, including ones already running, now dedup against this set
+        stage.commit(set_id, questions)
+    return {'set_id': set_id, 'question_count': len(questions)}
+
@@ -1,109 +1,387 @@
+import argparse
 import asyncio
 import websockets
 import json
+import math
+import random
+import statistics
 import time
 from datetime import datetime
+from urllib.parse import urlencode
+from wire_protocol import CompactClient, msgpack
 
-async def flashcard_client():
-    uri = "ws://localhost:8765"  # Ensure this matches the running WebSocket server
-    async with websockets.connect(uri) as websocket:
+
+class QuizClient:
+    """Protocol handling shared by the interactive client and the load generator.
+
+    Subclasses decide how to answer (answer()) and what to do with the other
+    messages. Batched frames are unpacked, compact frames expanded, and a
+    dropped connection is resumed with ?resume=<token>.
+    """
+
+    reconnect_delay = 1
+
+    def __init__(self, uri, params=None, open_timeout=10):
+        self.uri = uri
+        # e.g. {"set": set_id, "protocol": "compact", "encoding": "msgpack", "pipeline": "1"}
+        self.params = dict(params or {})
+        self.open_timeout = open_timeout
+        self.token = None
+        self.expander = CompactClient() if self.params.get("protocol") == "compact" else None
+        self.connect_started = None
+        self.answered_at = None
+
+    def url(self):
+        params = dict(self.params, resume=self.token) if self.token else self.params
+        return f"{self.uri}/?{urlencode(params)}" if params else self.uri
+
+    def decode(self, frame):
+        message = msgpack.unpackb(frame) if isinstance(frame, bytes) else json.loads(frame)
+        return self.expander.expand(message) if self.expander else message
+
+    async def run(self):
+        while True:
+            # After a dropped connection, ?resume=<token> continues the quiz at the next question
+            self.connect_started = time.perf_counter()
+            self.answered_at = None
+            async with websockets.connect(self.url(), open_timeout=self.open_timeout) as websocket:
+                self.on_open()
+                try:
+                    while True:
+                        message = self.decode(await websocket.recv())
+                        self.on_frame(message)
+                        if await self.handle(websocket, message):
+                            return
+                except websockets.exceptions.ConnectionClosed:
+                    self.on_closed()
+                    if self.token is None:
+                        return
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def handle(self, websocket, message):
+        """Act on one message; returns True once the session is over."""
+        kind = message['type']
+        if kind == 'batch':
+            for inner in message['messages']:
+                if await self.handle(websocket, inner):
+                    return True
+        elif kind == 'session':
+            self.token = message['data']['token']
+            self.on_session(message['data'])
+        elif kind == 'question':
+            answer, time_taken = await self.answer(message['data'])
+            self.answered_at = time.perf_counter()
+            await websocket.send(json.dumps({"answer": answer, "time_taken": time_taken}))
+        elif kind == 'answer_result':
+            self.on_answer_result(message['data'])
+        elif kind == 'report':
+            self.on_report(message['data'])
+            return True
+        elif kind == 'error':
+            self.on_error(message['data']['message'])
+            return True
+        # prefetch candidates are only useful to clients that render ahead
+        return False
+
+    def on_open(self):
+        pass
+
+    def on_frame(self, message):
+        pass
+
+    def on_session(self, session):
+        pass
+
+    async def answer(self, question):
+        raise NotImplementedError
+
+    def on_answer_result(self, result):
+        pass
+
+    def on_report(self, report):
+        pass
+
+    def on_error(self, message):
+        print(f"Server error: {message}")
+
+    def on_closed(self):
+        pass
+
+
+class InteractiveClient(QuizClient):
+    """Takes answers from the keyboard and prints the report."""
+
+    def __init__(self, uri, params=None):
+        super().__init__(uri, params)
+        self.session_start = datetime.now()
+
+    def on_open(self):
         print("Connection opened")
-        session_start = datetime.now()
-        
+
+    def on_frame(self, message):
+        print(message)
+
+    def on_session(self, session):
+        if session['resumed']:
+            print(f"Resumed after {session['answered']} answers")
+
+    async def answer(self, question):
+        print(f"\nQuestion (Difficulty: {question['difficulty']}): {question['question']}")
+        print("\nOptions:")
+        for option, text in question['options'].items():
+            print(f"{option}: {text}")
+
+        # Start timer
+        start_time = time.time()
+
+        # Get user input
+        user_answer = input("\nYour answer (A/B/C/D): ").strip().upper()
+        while user_answer not in ['A', 'B', 'C', 'D']:
+            print("Invalid input! Please enter A, B, C, or D.")
+            user_answer = input("Your answer (A/B/C/D): ").strip().upper()
+
+        # Calculate time taken
+        return user_answer, time.time() - start_time
+
+    def on_answer_result(self, result):
+        if result['is_correct']:
+            print("\n✓ Correct!")
+        else:
+            print(f"\n✗ Wrong. The correct answer is {result['correct_answer']}.")
+            print(f"Explanation: {result['explanation']}")
+
+    def on_report(self, report):
+        print_report(report, datetime.now() - self.session_start)
+
+    def on_closed(self):
+        print("\nConnection closed")
+        if self.token is not None:
+            print("Reconnecting...")
+
+
+def print_report(report, session_duration):
+    print("\n" + "="*50)
+    print("QUIZ REPORT")
+    print("="*50)
+
+    print("\nSession Summary:")
+    print(f"Duration: {session_duration.total_seconds():.0f} seconds")
+    print(f"Total Questions: {report['total_questions']}")
+    print(f"Correct Answers: {report['total_correct']}")
+    print(f"Wrong Answers: {report['total_wrong']}")
+    print(f"Overall Accuracy: {report['overall_accuracy'] * 100:.2f}%")
+    print(f"Average Time per Question: {report['average_time']:.2f} seconds")
+
+    print("\nPerformance by Difficulty:")
+    for difficulty, performance in report["difficulty_performance"].items():
+        print(f"\n{difficulty} Level:")
+        print(f"  Questions Attempted: {performance['total_questions']}")
+        print(f"  Accuracy: {performance['accuracy'] * 100:.2f}%")
+        print(f"  Average Time: {performance['average_time']:.2f} seconds")
+
+    print("\nMost Challenging Questions:")
+    for i, question in enumerate(report["challenging_questions"], 1):
+        print(f"\n{i}. Question: {question['question']}")
+        print(f"   Accuracy: {question['accuracy'] * 100:.2f}%")
+        print(f"   Average Time: {question['average_time']:.2f} seconds")
+        print(f"   Total Attempts: {question['attempts']}")
+
+    if report["wrong_answers"]:
+        print("\nQuestions Answered Incorrectly:")
+        for i, wrong in enumerate(report["wrong_answers"], 1):
+            print(f"\n{i}. Question: {wrong['question']}")
+            print(f"   Difficulty: {wrong['difficulty']}")
+            print(f"   Your Answer: {wrong['user_answer']} "
+                  f"({wrong['options'][wrong['user_answer']]})")
+            print(f"   Correct Answer: {wrong['correct_answer']} "
+                  f"({wrong['options'][wrong['correct_answer']]})")
+            print(f"   Time Taken: {wrong['time_taken']:.2f} seconds")
+    else:
+        print("\nCongratulations! You had no wrong answers!")
+
+    print("\n" + "="*50)
+
+
+async def flashcard_client(uri="ws://localhost:8765"):  # Ensure this matches the running WebSocket server
+    await InteractiveClient(uri).run()
+
+
+class LoadStats:
+    """Latency samples and counters shared by every scripted session of a load run."""
+
+    def __init__(self):
+        self.connect = []   # connect() called -> handshake done
+        self.message = []   # answer sent -> next frame received
+        self.report = []    # last answer sent -> report received
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.answers = 0
+        self.correct = 0
+
+
+class ScriptedClient(QuizClient):
+    """Answers correctly with probability accuracy after a random think time, and records latencies."""
+
+    reconnect_delay = 0.1
+
+    def __init__(self, uri, params, stats, rng, accuracy=0.7, think_time=1.0, open_timeout=30):
+        super().__init__(uri, params, open_timeout)
+        self.stats = stats
+        self.rng = rng
+        self.accuracy = accuracy
+        self.think_time = think_time
+        self.connections = 0
+        self.measured = None  # answered_at of the last answer whose reply was timed
+
+    def on_open(self):
+        self.stats.connect.append(time.perf_counter() - self.connect_started)
+        self.connections += 1
+        if self.connections > 1:
+            self.stats.reconnects += 1
+
+    def on_frame(self, message):
+        # Only the first frame after each answer is the reply to it
+        if self.answered_at is not None and self.answered_at != self.measured:
+            self.stats.message.append(time.perf_counter() - self.answered_at)
+            self.measured = self.answered_at
+
+    async def answer(self, question):
+        # Think times vary by +-50% around the mean so sessions drift apart
+        think = self.think_time * self.rng.uniform(0.5, 1.5)
+        if think:
+            await asyncio.sleep(think)
+        correct = question['correctAnswer']
+        if self.rng.random() < self.accuracy:
+            choice = correct
+        else:
+            choice = self.rng.choice([option for option in question['options'] if option != correct] or [correct])
+        self.stats.answers += 1
+        self.stats.correct += choice == correct
+        return choice, think
+
+    def on_report(self, report):
+        # A report re-sent after a reconnect has no answer on this connection to time it from
+        if self.answered_at is not None:
+            self.stats.report.append(time.perf_counter() - self.answered_at)
+        self.stats.completed += 1
+
+    def on_error(self, message):
+        self.stats.failed += 1
+        print(f"Session failed: {message}")
+
+
+PERCENTILES = (50, 75, 90, 95, 99, 99.9, 99.99, 100)
+
+
+def print_latency_distribution(name, samples):
+    """Print an HdrHistogram-style percentile table (values in milliseconds)."""
+    if not samples:
+        print(f"\n{name}: no samples")
+        return
+    ordered = sorted(samples)
+    count = len(ordered)
+    mean = statistics.fmean(ordered)
+    stdev = statistics.pstdev(ordered)
+    print(f"\n{name}")
+    print(f"{'Value(ms)':>12} {'Percentile':>12} {'TotalCount':>12}")
+    for pct in PERCENTILES:
+        total = max(1, math.ceil(pct / 100 * count))
+        print(f"{ordered[total - 1] * 1000:12.3f} {pct / 100:12.6f} {total:12d}")
+    print(f"#[Mean = {mean * 1000:.3f}, StdDeviation = {stdev * 1000:.3f}]")
+    print(f"#[Max = {ordered[-1] * 1000:.3f}, Total count = {count}]")
+
+
+def raise_open_file_limit(needed):
+    # Every session holds a socket; the default soft limit (often 1024) is too low for a large run
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        if target < needed:
+            print(f"Open file limit is {target}; expect connection failures above that many sessions")
+
+
+async def load_test(uri, sessions, ramp_up=10.0, accuracy=0.7, think_time=1.0, params=None, seed=0,
+                    open_timeout=30):
+    """Run sessions concurrent scripted quiz sessions, started evenly over ramp_up seconds."""
+    raise_open_file_limit(sessions + 256)
+    stats = LoadStats()
+
+    async def session(i):
+        await asyncio.sleep(ramp_up * i / sessions)
+        stats.started += 1
+        client = ScriptedClient(uri, dict(params or {}), stats, random.Random(seed + i),
+                                accuracy, think_time, open_timeout)
         try:
-            while True:
-                message = await websocket.recv()  # Receive message from the server
-                data = json.loads(message)
-                print(data)
-                if data['type'] == 'question':
-                    question = data['data']
-                    print(f"\nQuestion (Difficulty: {question['difficulty']}): {question['question']}")
-                    print("\nOptions:")
-                    for option, text in question['options'].items():
-                        print(f"{option}: {text}")
-
-                    # Start timer
-                    start_time = time.time()
-                    
-                    # Get user input
-                    user_answer = input("\nYour answer (A/B/C/D): ").strip().upper()
-                    while user_answer not in ['A', 'B', 'C', 'D']:
-                        print("Invalid input! Please enter A, B, C, or D.")
-                        user_answer = input("Your answer (A/B/C/D): ").strip().upper()
-                    
-                    # Calculate time taken
-                    time_taken = time.time() - start_time
-                    
-                    # Send answer back to server
-                    response = {
-                        "answer": user_answer,
-                        "time_taken": time_taken
-                    }
-                    await websocket.send(json.dumps(response))  # Send the response back to the server
-
-                elif data['type'] == 'answer_result':
-                    result = data['data']
-                    is_correct = result['is_correct']
-                    correct_answer = result['correct_answer']
-                    
-                    if is_correct:
-                        print("\n✓ Correct!")
-                    else:
-                        print(f"\n✗ Wrong. The correct answer is {correct_answer}.")
-                        print(f"Explanation: {result['explanation']}")
-
-                elif data['type'] == 'report':
-                    report = data['data']
-                    session_duration = datetime.now() - session_start
-                    
-                    print("\n" + "="*50)
-                    print("QUIZ REPORT")
-                    print("="*50)
-                    
-                    print("\nSession Summary:")
-                    print(f"Duration: {session_duration.total_seconds():.0f} seconds")
-                    print(f"Total Questions: {report['total_questions']}")
-                    print(f"Correct Answers: {report['total_correct']}")
-                    print(f"Wrong Answers: {report['total_wrong']}")
-                    print(f"Overall Accuracy: {report['overall_accuracy'] * 100:.2f}%")
-                    print(f"Average Time per Question: {report['average_time']:.2f} seconds")
-                    
-                    print("\nPerformance by Difficulty:")
-                    for difficulty, performance in report["difficulty_performance"].items():
-                        print(f"\n{difficulty} Level:")
-                        print(f"  Questions Attempted: {performance['total_questions']}")
-                        print(f"  Accuracy: {performance['accuracy'] * 100:.2f}%")
-                        print(f"  Average Time: {performance['average_time']:.2f} seconds")
-                    
-                    print("\nMost Challenging Questions:")
-                    for i, question in enumerate(report["challenging_questions"], 1):
-                        print(f"\n{i}. Question: {question['question']}")
-                        print(f"   Accuracy: {question['accuracy'] * 100:.2f}%")
-                        print(f"   Average Time: {question['average_time']:.2f} seconds")
-                        print(f"   Total Attempts: {question['attempts']}")
-                    
-                    if report["wrong_answers"]:
-                        print("\nQuestions Answered Incorrectly:")
-                        for i, wrong in enumerate(report["wrong_answers"], 1):
-                            print(f"\n{i}. Question: {wrong['question']}")
-                            print(f"   Difficulty: {wrong['difficulty']}")
-                            print(f"   Your Answer: {wrong['user_answer']} "
-                                  f"({wrong['options'][wrong['user_answer']]})")
-                            print(f"   Correct Answer: {wrong['correct_answer']} "
-                                  f"({wrong['options'][wrong['correct_answer']]})")
-                            print(f"   Time Taken: {wrong['time_taken']:.2f} seconds")
-                    else:
-                        print("\nCongratulations! You had no wrong answers!")
-                    
-                    print("\n" + "="*50)
-                    break  # Exit after receiving the report
-
-        except websockets.exceptions.ConnectionClosed:
-            print("\nConnection closed")
+            await client.run()
+        except Exception as e:
+            stats.failed += 1
+            if stats.failed <= 10:
+                print(f"Session {i} failed: {e!r}")
+
+    async def progress():
+        while True:
+            await asyncio.sleep(5)
+            print(f"{time.perf_counter() - started:6.0f}s  started={stats.started} completed={stats.completed} "
+                  f"failed={stats.failed} answers={stats.answers}")
+
+    started = time.perf_counter()
+    reporter = asyncio.create_task(progress())
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    reporter.cancel()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{sessions} sessions in {elapsed:.1f}s: {stats.completed} completed, {stats.failed} failed, "
+          f"{stats.reconnects} reconnects")
+    if stats.answers:
+        print(f"{stats.answers} answers ({stats.answers / elapsed:.0f}/s), "
+              f"accuracy {stats.correct / stats.answers * 100:.1f}%")
+    print_latency_distribution("Connection setup", stats.connect)
+    print_latency_distribution("Per-message latency (answer -> next frame)", stats.message)
+    print_latency_distribution("Report delivery (last answer -> report)", stats.report)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quiz WebSocket client; --load runs scripted sessions instead.")
+    parser.add_argument("--uri", default="ws://localhost:8765")
+    parser.add_argument("--load", action="store_true", help="run a headless load test")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="seconds over which sessions are started")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="probability of answering correctly")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds before each answer")
+    parser.add_argument("--set", help="question set id")
+    parser.add_argument("--protocol", choices=("json", "compact"), default="json")
+    parser.add_argument("--encoding", choices=("json", "msgpack"), default="json")
+    parser.add_argument("--pipeline", action="store_true")
+    parser.add_argument("--lookahead", type=int, default=0)
+    parser.add_argument("--open-timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if not args.load:
+        asyncio.run(flashcard_client(args.uri))
+        return
+    params = {}
+    if args.set:
+        params["set"] = args.set
+    if args.protocol != "json":
+        params.update(protocol=args.protocol, encoding=args.encoding)
+    if args.pipeline:
+        params.update(pipeline="1", lookahead=str(args.lookahead))
+    asyncio.run(load_test(args.uri, args.sessions, args.ramp_up, args.accuracy, args.think_time, params,
+                          args.seed, args.open_timeout))
+
 
 if __name__ == "__main__":
     try:
-        asyncio.get_event_loop().run_until_complete(flashcard_client())
+        main()
     except KeyboardInterrupt:
         print("\nQuiz session terminated by user.")
     except Exception as e:
@@ -1,55 +1,299 @@
 import asyncio
-import json
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlparse
 import websockets
-from flashcard_system import AdaptiveFlashcardSystem
+import metrics
+from checkpoints import CheckpointStore, new_token
+from identity import verify_user
+from question_bank import DIFFICULTIES
+from question_channel import LiveBankSubscriber, LiveQuestionBank
+from session_manager import SessionManager
+from wire_protocol import negotiate
 
 class FlashcardWebSocketServer:
-    def __init__(self, host, port, questions_file):
+    def __init__(self, host, port, questions_file, questions_per_session=15, live_channel=None,
+                 question_store=None, report_writer=None, checkpoints=None, compression="deflate"):
         self.host = host
         self.port = port
         self.questions_file = questions_file
-        self.flashcard_system = AdaptiveFlashcardSystem(questions_file)
+        self.questions_per_session = questions_per_session
+        # Each connection gets its own session; the parsed question bank is shared
+        self.sessions = SessionManager(questions_file, store=question_store)
+        # In live mode, sessions that start during generation draw from the growing bank
+        self.live_channel = live_channel
+        self.live_questions = None
+        if live_channel is not None:
+            self.live_questions = LiveBankSubscriber()
+            live_channel.subscribe(self.live_questions)
+        # Final reports are queued here and written to the report store in the background
+        self.report_writer = report_writer
+        # Session state is checkpointed after every answer so a dropped client can resume
+        self.checkpoints = checkpoints if checkpoints is not None else CheckpointStore()
+        # permessage-deflate is used when the client offers it; None turns it off
+        self.compression = compression
+        # Read when /metrics is scraped, so they cost nothing per message
+        metrics.registry.gauge("quiz_active_sessions", "Quiz sessions currently open.").set_function(
+            lambda: self.sessions.active_sessions)
+        metrics.registry.gauge("quiz_checkpoints", "Unfinished sessions held for resumption.").set_function(
+            lambda: len(self.checkpoints))
 
-    async def handle_client(self, websocket, path):
-        # Reload the latest questions each time a client connects
-        self.flashcard_system.questions = self.flashcard_system.load_questions()
+    async def next_question(self, flashcard_system, prepared=None):
+        """Select the session's next question, or return None if its bank has none to ask."""
+        bank = flashcard_system.questions
+        if isinstance(bank, LiveQuestionBank):
+            # Wait for the generator to produce a question we can ask
+            await bank.wait_for(flashcard_system.current_difficulty)
+            if not bank.count(flashcard_system.current_difficulty):
+                available = [d for d in DIFFICULTIES if bank.count(d)]
+                if available:
+                    flashcard_system.current_difficulty = available[0]
+            # The bank may have grown since prepare_next() ran
+            prepared = None
+        if not len(bank):
+            return None
+        with metrics.SELECT_QUESTION_SECONDS.time():
+            return flashcard_system.select_question(prepared)
+
+    async def fall_back(self, flashcard_system, state):
+        """Move a session whose live set finished empty onto the latest stored set.
+
+        Generation can end without a question, e.g. when every one duplicated an
+        existing set. Returns the first question from the new bank, or None if
+        there is nothing to fall back to.
+        """
+        if not isinstance(flashcard_system.questions, LiveQuestionBank) or state["answered"]:
+            return None
+        questions = await self.sessions.load_set()
+        if questions is None or not len(questions):
+            return None
+        flashcard_system.questions = questions
+        state["set_id"] = questions.set_id
+        state["bank"] = questions.identity
+        return await self.next_question(flashcard_system)
+
+    @staticmethod
+    def connection_params(websocket, path=None):
+        """Query parameters of the connection URL.
+
+        e.g. ws://host:8765/?set=<set id>&id_token=<Firebase ID token>&test=<test id>, or ?resume=<token>.
+        ?protocol=compact[&encoding=msgpack] selects the compact wire protocol, and
+        ?pipeline=1[&lookahead=2] the pipelined exchange.
+        """
+        if path is None:
+            # Newer websockets versions no longer pass the path to the handler
+            request = getattr(websocket, "request", None)
+            path = request.path if request is not None else getattr(websocket, "path", "")
+        return {key: values[-1] for key, values in parse_qs(urlparse(path or "").query).items()}
+
+    async def start_session(self, websocket, params, protocol):
+        """Open a new session for the connection; returns (session, checkpoint state) or None on error."""
+        set_id = params.get("set")
+        if set_id:
+            questions = await self.sessions.load_set(set_id)
+            if questions is None:
+                await self.send(websocket, protocol.error(f"Unknown question set {set_id}"))
+                return None
+        else:
+            # Without a set id, use a set still being generated, else the latest stored one
+            questions = self.live_questions.active_bank() if self.live_questions else None
+            if questions is None:
+                questions = await self.sessions.load_set()
+        # Reports are stored under the user the ID token was issued to; clients without a
+        # valid token are anonymous, and their test ids are picked here rather than by them
+        user = await asyncio.to_thread(verify_user, params.get("id_token")) if params.get("id_token") else None
+        test = params.get("test") if user is not None else None
+        if test and self.report_writer is not None:
+            if await asyncio.to_thread(self.report_writer.store.has_report, user, test):
+                await self.send(websocket, protocol.error(f"Test {test} already has a report"))
+                return None
+        state = {
+            "set_id": questions.set_id,
+            "bank": questions.identity,
+            "user": user or "anonymous",
+            "test": test or f"test{int(time.time() * 1000)}-{new_token()}",
+            "answered": 0,
+            "pending": None,
+        }
+        return await self.sessions.open_session(questions=questions), state
+
+    async def resume_session(self, websocket, token):
+        """Rebuild the session checkpointed under token; returns (session, state) or None if it is gone.
+
+        Question ids restart at 1 in every set, so a checkpoint is only usable with
+        the exact bank it was taken on. If that bank cannot be found any more, the
+        checkpoint is dropped and the client gets a new session.
+        """
+        checkpoint = await self.checkpoints.load_async(token)
+        if checkpoint is None:
+            return None
+        state, questions = checkpoint
+        if questions is None or questions.identity != state.get("bank"):
+            # Spilled and shared checkpoints only keep the bank's identity
+            questions = await self.find_bank(state.get("bank"))
+            if questions is None:
+                print(f"Question bank {state.get('bank')} of session {token} is gone, starting a new session")
+                self.checkpoints.delete(token)
+                return None
+        return self.sessions.restore_session(questions, state["session"]), state
+
+    async def find_bank(self, identity):
+        """The bank with the given identity if it is still available, else None."""
+        kind, _, name = (identity or "").partition(":")
+        if kind == "set":
+            bank = await self.sessions.load_set(name)
+        elif kind == "file":
+            bank = await self.sessions.bank.get_async()
+        elif kind == "live" and self.live_questions is not None:
+            bank = self.live_questions.find(identity)
+        else:
+            bank = None
+        return bank if bank is not None and bank.identity == identity else None
+
+    @staticmethod
+    async def send(websocket, frame):
+        started = time.perf_counter()
+        await websocket.send(frame)
+        metrics.WS_SEND_SECONDS.observe(time.perf_counter() - started)
+
+    def save_checkpoint(self, token, state, flashcard_system, pending=None):
+        state["pending"] = pending["id"] if pending is not None else None
+        # The stored copy must not see later changes to the live state dict
+        self.checkpoints.save(token, dict(state, session=flashcard_system.checkpoint()), flashcard_system.questions)
+
+    async def handle_client(self, websocket, path=None):
+        params = self.connection_params(websocket, path)
+        protocol = negotiate(params)
+        # ?resume=<token> continues a session that lost its connection
+        token = params.get("resume")
+        session = await self.resume_session(websocket, token) if token else None
+        resumed = session is not None
+        if not resumed:
+            token = new_token()
+            session = await self.start_session(websocket, params, protocol)
+            if session is None:
+                return
+        flashcard_system, state = session
+
+        # Pipelined mode sends each answer_result in one frame with the next question (or the
+        # report), and lookahead=N adds up to N prefetch candidates for the question after that
+        pipeline = params.get("pipeline") in ("1", "true")
+        lookahead = self.lookahead(params) if pipeline else 0
 
         try:
-            for _ in range(15):  # Adjust the number of questions as needed
-                question = self.flashcard_system.select_question()
-                await websocket.send(json.dumps({
-                    "type": "question",
-                    "data": question
-                }))
+            await self.send(websocket, protocol.session({"token": token, "resumed": resumed, "answered": state["answered"]}))
+            pending = flashcard_system.questions.get(state["pending"]) if state["pending"] is not None else None
+            prepared = None
+            result = None  # answer_result held back to share a frame with what follows
+            while state["answered"] < self.questions_per_session:
+                # A resumed session re-sends the question that was unanswered when the connection dropped
+                question = pending or await self.next_question(flashcard_system, prepared)
+                if question is None:
+                    question = await self.fall_back(flashcard_system, state)
+                if question is None:
+                    await self.send(websocket, protocol.error("No questions are available"))
+                    self.checkpoints.delete(token)
+                    return
+                pending = None
+                self.save_checkpoint(token, state, flashcard_system, pending=question)
+                bank = flashcard_system.questions
+                # Question frames are encoded once per bank and shared across connections
+                frames = []
+                if pipeline and state["answered"] + 1 < self.questions_per_session:
+                    # Pick the next question for either outcome now, while the learner is answering
+                    prepared = flashcard_system.prepare_next(question)
+                    # Prefetch candidates go first so the client has them when it shows the question.
+                    # They are also encoded first: a candidate can still be this same question when
+                    # it is the only one of its difficulty, and the compact protocol only sends a
+                    # question's body in the first frame that encodes it.
+                    frames = [protocol.prefetch(candidate, bank, is_correct)
+                              for is_correct, candidate in list(prepared.items())[:lookahead]]
+                frames.append(protocol.question(question, bank))
+                if result is not None:
+                    frames.insert(0, result)
+                await self.send(websocket, frames[0] if len(frames) == 1 else protocol.batch(frames))
 
+                sent = time.perf_counter()
                 response = await websocket.recv()
-                response_data = json.loads(response)
+                metrics.WS_RECV_SECONDS.observe(time.perf_counter() - sent)
+                response_data = protocol.decode(response)
                 user_answer = response_data["answer"]
                 time_taken = response_data["time_taken"]
 
-                is_correct = self.flashcard_system.process_answer(question, user_answer, time_taken)
-                await websocket.send(json.dumps({
-                    "type": "answer_result",
-                    "data": {
-                        "is_correct": is_correct,
-                        "correct_answer": question["correctAnswer"],
-                        "question": question["question"],
-                        "explanation": question.get("explanation", "No explanation provided.")
-                    }
-                }))
-
-                self.flashcard_system.adjust_difficulty()
-
-            report = self.flashcard_system.generate_report()
-            await websocket.send(json.dumps({
-                "type": "report",
-                "data": report
-            }))
+                with metrics.PROCESS_ANSWER_SECONDS.time():
+                    is_correct = flashcard_system.process_answer(question, user_answer, time_taken)
+                result = protocol.answer_result(question, is_correct)
+                if not pipeline:
+                    await self.send(websocket, result)
+                    result = None
+
+                flashcard_system.adjust_difficulty()
+                state["answered"] += 1
+
+            # Every answer is in; a reconnect from here on only needs the report
+            self.save_checkpoint(token, state, flashcard_system)
+            with metrics.REPORT_SECONDS.time():
+                report = flashcard_system.generate_report()
+            frames = [protocol.report(report)]
+            if result is not None:
+                frames.insert(0, result)
+            await self.send(websocket, frames[0] if len(frames) == 1 else protocol.batch(frames))
+            self.checkpoints.delete(token)
+            if self.report_writer is not None:
+                self.report_writer.submit(state["user"], state["test"], report, set_id=state["set_id"])
 
         except websockets.exceptions.ConnectionClosed:
-            print("Client disconnected")
+            print(f"Client disconnected, session {token} can be resumed")
+        finally:
+            self.sessions.close_session(flashcard_system)
+
+    @staticmethod
+    def lookahead(params):
+        try:
+            return max(0, min(2, int(params.get("lookahead", 0))))
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def process_request(connection, request):
+        # Plain HTTP GET /metrics on the quiz port returns this process's metrics
+        if urlparse(request.path).path == "/metrics":
+            response = connection.respond(HTTPStatus.OK, metrics.registry.exposition())
+            # Headers is a multidict, so replace respond()'s text/plain rather than adding a second one
+            del response.headers["Content-Type"]
+            response.headers["Content-Type"] = metrics.CONTENT_TYPE
+            return response
+        return None
+
+    async def serve(self, host=None, port=None, reuse_port=False):
+        """Start listening and return the websockets server without blocking.
+
+        reuse_port lets several worker processes listen on the same port (SO_REUSEPORT).
+        GET /metrics on the same port serves the metrics in text exposition format.
+        """
+        if self.live_channel is not None:
+            # Questions published from other threads are delivered on this loop
+            self.live_channel.bind(asyncio.get_running_loop())
+        host = self.host if host is None else host
+        port = self.port if port is None else port
+        return await websockets.serve(self.handle_client, host, port, compression=self.compression,
+                                      reuse_port=reuse_port or None, process_request=self.process_request)
+
+    async def drain(self, server, timeout=30):
+        """Stop accepting connections and let running sessions finish for up to timeout seconds.
+
+        Sessions still open after that are closed with 1012 (service restart);
+        their checkpoints let the clients resume on another worker.
+        """
+        server.close(close_connections=False)
+        try:
+            await asyncio.wait_for(asyncio.shield(server.wait_closed()), timeout)
+        except asyncio.TimeoutError:
+            print(f"Drain timed out, closing {len(server.connections)} sessions")
+            await asyncio.gather(*(connection.close(1012, "service restart") for connection in server.connections))
+            await server.wait_closed()
 
     async def start_server(self):
-        server = await websockets.serve(self.handle_client, self.host, self.port)
+        server = await self.serve()
         print(f"WebSocket server started on ws://{self.host}:{self.port}")
-        await server.wait_closed()
\ No newline at end of file
+        await server.wait_closed()
@@ -0,0 +1,233 @@
+import json
+import weakref
+
+try:
+    import msgpack
+except ImportError:  # optional; only needed for ?encoding=msgpack
+    msgpack = None
+
+ENCODINGS = ("json", "msgpack")
+
+
+class QuestionFrameCache:
+    """Encoded question frames, built once per (question bank, encoding) and shared by every connection.
+
+    Banks are immutable (a live bank only ever appends), so a question's frame
+    never changes; entries go away with their bank.
+    """
+
+    def __init__(self):
+        self._frames = weakref.WeakKeyDictionary()  # bank -> {(variant, kind, outcome, question id): frame}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, bank, question, encode, variant, kind="question", outcome=None):
+        frames = self._frames.get(bank)
+        if frames is None:
+            frames = self._frames[bank] = {}
+        key = (variant, kind, outcome, question['id'])
+        frame = frames.get(key)
+        if frame is None:
+            self.misses += 1
+            message = {"type": kind, "data": question}
+            if outcome is not None:
+                message["outcome"] = outcome
+            frame = frames[key] = encode(message)
+        else:
+            self.hits += 1
+        return frame
+
+
+frame_cache = QuestionFrameCache()
+
+
+class JsonProtocol:
+    """The original protocol: full question, answer_result and report documents as JSON text."""
+
+    name = "json"
+    encoding = "json"
+
+    def __init__(self, cache=frame_cache):
+        self.cache = cache
+
+    def encode(self, message):
+        return json.dumps(message)
+
+    def decode(self, frame):
+        return json.loads(frame)
+
+    def session(self, data):
+        return self.encode({"type": "session", "data": dict(data, protocol=self.name, encoding=self.encoding)})
+
+    def error(self, message):
+        return self.encode({"type": "error", "data": {"message": message}})
+
+    def question(self, question, bank):
+        return self.cache.get(bank, question, self.encode, (self.name, self.encoding))
+
+    def prefetch(self, question, bank, is_correct):
+        """A lookahead question the client may show next, if its answer turns out is_correct."""
+        return self.cache.get(bank, question, self.encode, (self.name, self.encoding),
+                              kind="prefetch", outcome="correct" if is_correct else "wrong")
+
+    def batch(self, frames):
+        """Several already encoded messages in one frame, to be handled in order."""
+        return '{"type": "batch", "messages": [' + ", ".join(frames) + ']}'
+
+    def answer_result(self, question, is_correct):
+        return self.encode({
+            "type": "answer_result",
+            "data": {
+                "is_correct": is_correct,
+                "correct_answer": question["correctAnswer"],
+                "question": question["question"],
+                "explanation": question.get("explanation", "No explanation provided.")
+            }
+        })
+
+    def report(self, report):
+        return self.encode({"type": "report", "data": report})
+
+
+class CompactProtocol(JsonProtocol):
+    """Messages that reference questions by id once the client has seen them.
+
+    Each question body is sent once per connection; a repeat (e.g. a spaced
+    repetition review) is {"type": "question", "ref": id}. answer_result and
+    the report carry ids and per-question numbers instead of copies of the
+    question text, options and explanation. CompactClient expands them back.
+    """
+
+    name = "compact"
+
+    def __init__(self, encoding="json", cache=frame_cache):
+        super().__init__(cache)
+        self.encoding = encoding
+        self.sent = set()
+
+    def encode(self, message):
+        if self.encoding == "msgpack":
+            return msgpack.packb(message)
+        return json.dumps(message, separators=(',', ':'))
+
+    def decode(self, frame):
+        if isinstance(frame, bytes):
+            return msgpack.unpackb(frame)
+        return json.loads(frame)
+
+    def question(self, question, bank):
+        if question['id'] in self.sent:
+            return self.encode({"type": "question", "ref": question['id']})
+        self.sent.add(question['id'])
+        return super().question(question, bank)
+
+    def prefetch(self, question, bank, is_correct):
+        outcome = "correct" if is_correct else "wrong"
+        if question['id'] in self.sent:
+            return self.encode({"type": "prefetch", "outcome": outcome, "ref": question['id']})
+        self.sent.add(question['id'])
+        return super().prefetch(question, bank, is_correct)
+
+    def batch(self, frames):
+        if self.encoding != "msgpack":
+            return '{"type":"batch","messages":[' + ",".join(frames) + ']}'
+        # Splice the encoded messages into a msgpack map without decoding them
+        packer = msgpack.Packer()
+        return (packer.pack_map_header(2) + packer.pack("type") + packer.pack("batch") + packer.pack("messages")
+                + packer.pack_array_header(len(frames)) + b"".join(frames))
+
+    def answer_result(self, question, is_correct):
+        return self.encode({"type": "answer_result", "data": {"id": question['id'], "is_correct": is_correct}})
+
+    def report(self, report):
+        compact = {key: value for key, value in report.items()
+                   if key not in ("challenging_questions", "wrong_answers", "detailed_question_performance")}
+        compact["challenging_questions"] = [
+            [q["id"], q["accuracy"], q["average_time"], q["attempts"]] for q in report["challenging_questions"]
+        ]
+        compact["wrong_answers"] = [[w["id"], w["user_answer"], w["time_taken"]] for w in report["wrong_answers"]]
+        compact["detailed_question_performance"] = [
+            [q["id"], q["user_attempts"], q["correct_attempts"], q["average_time_taken"]]
+            for q in report["detailed_question_performance"]
+        ]
+        return self.encode({"type": "report", "data": compact})
+
+
+def negotiate(params):
+    """Pick the protocol for a connection from ?protocol=json|compact&encoding=json|msgpack."""
+    if params.get("protocol") != "compact":
+        return JsonProtocol()
+    encoding = params.get("encoding", "json")
+    if encoding not in ENCODINGS or (encoding == "msgpack" and msgpack is None):
+        print(f"Unsupported encoding {encoding}, using json")
+        encoding = "json"
+    return CompactProtocol(encoding)
+
+
+class CompactClient:
+    """Client side of CompactProtocol: remembers questions and expands messages to the JSON protocol's shape."""
+
+    def __init__(self):
+        self.questions = {}
+
+    def expand(self, message):
+        kind = message["type"]
+        if kind in ("question", "prefetch"):
+            if "ref" in message:
+                expanded = {key: value for key, value in message.items() if key != "ref"}
+                expanded["data"] = self.questions[message["ref"]]
+                return expanded
+            self.questions[message["data"]["id"]] = message["data"]
+        elif kind == "batch":
+            return dict(message, messages=[self.expand(inner) for inner in message["messages"]])
+        elif kind == "answer_result":
+            question = self.questions[message["data"]["id"]]
+            return {"type": "answer_result", "data": {
+                "is_correct": message["data"]["is_correct"],
+                "correct_answer": question["correctAnswer"],
+                "question": question["question"],
+                "explanation": question.get("explanation", "No explanation provided.")
+            }}
+        elif kind == "report":
+            return {"type": "report", "data": self.expand_report(message["data"])}
+        return message
+
+    def _details(self, question_id):
+        question = self.questions[question_id]
+        return {
+            "id": question['id'],
+            "question": question['question'],
+            "options": question['options'],
+            "correctAnswer": question['correctAnswer'],
+            "related_topics": question['related_topics'],
+            "related_links": question['related_links'],
+            "difficulty": question['difficulty'],
+        }
+
+    def expand_report(self, compact):
+        report = dict(compact)
+        report["challenging_questions"] = [
+            dict(self._details(q_id), explanation=self.questions[q_id]['explanation'],
+                 accuracy=accuracy, average_time=average_time, attempts=attempts)
+            for q_id, accuracy, average_time, attempts in compact["challenging_questions"]
+        ]
+        report["wrong_answers"] = []
+        for q_id, user_answer, time_taken in compact["wrong_answers"]:
+            question = self.questions[q_id]
+            report["wrong_answers"].append({
+                'id': q_id,
+                'question': question['question'],
+                'user_answer': user_answer,
+                'correct_answer': question['correctAnswer'],
+                'options': question['options'],
+                'difficulty': question['difficulty'],
+                'time_taken': time_taken,
+                'explanation': question['explanation']
+            })
+        report["detailed_question_performance"] = [
+            dict(self._details(q_id), user_attempts=attempts, correct_attempts=correct,
+                 accuracy=correct / attempts, average_time_taken=average_time,
+                 explanation=self.questions[q_id]['explanation'])
+            for q_id, attempts, correct, average_time in compact["detailed_question_performance"]
+        ]
+        return report
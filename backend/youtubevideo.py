@@ -1,36 +1,142 @@
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from settings import get_setting
 
-API_KEY = os.getenv('YOUTUBE_API_KEY')  # Replace this with your actual YouTube API key
+EMBED_URL = "https://www.youtube.com/embed/{}"
 
-def fetch_top_youtube_embed_link_combined(keywords, max_results=1):
-    youtube = build("youtube", "v3", developerKey=API_KEY)
 
-    try:
-        # Combine all keywords into a single search query
-        combined_keywords = " ".join(keywords)
+class YouTubeSearchBackend:
+    """YouTube Data API search that builds the discovery client once per thread and reuses it.
 
-        # Search YouTube for the combined keywords
-        search_response = youtube.search().list(
-            q=combined_keywords, 
+    googleapiclient service objects are not thread-safe, so each worker thread
+    keeps its own. googleapiclient is imported, and YOUTUBE_API_KEY read, on
+    the first search rather than at import.
+    """
+
+    def __init__(self, developer_key=None):
+        self.developer_key = developer_key
+        self._local = threading.local()
+
+    def _client(self):
+        youtube = getattr(self._local, 'youtube', None)
+        if youtube is None:
+            from googleapiclient.discovery import build
+            if self.developer_key is None:
+                self.developer_key = get_setting('YOUTUBE_API_KEY')
+            youtube = build("youtube", "v3", developerKey=self.developer_key, cache_discovery=False)
+            self._local.youtube = youtube
+        return youtube
+
+    def search(self, query, max_results=1):
+        """Return the video ids of the top results for query."""
+        search_response = self._client().search().list(
+            q=query,
             type="video",
             part="id,snippet",
             maxResults=max_results
         ).execute()
+        return [item['id']['videoId'] for item in search_response.get("items", [])]
+
+
+class EmbedLinkResolver:
+    """Long-lived keyword-set -> embed link resolver with a TTL + LRU cache.
+
+    Keyword lists are normalized (case, whitespace, order, duplicates) so
+    equivalent lists share one cache entry. Concurrent requests for the same
+    keyword set are coalesced into a single search, and resolve_many() fans
+    distinct lookups out over a thread pool.
+    """
+
+    def __init__(self, backend=None, ttl=24 * 3600, max_entries=4096, max_workers=8):
+        self.backend = backend or YouTubeSearchBackend()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()  # key -> (expires_at, embed_link or None)
+        self._inflight = {}          # key -> Future for a search in progress
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="youtube")
+        self.hits = 0
+        self.misses = 0
+        self.searches = 0
+
+    @staticmethod
+    def make_key(keywords):
+        return tuple(sorted({" ".join(str(k).lower().split()) for k in keywords} - {""}))
+
+    def resolve(self, keywords):
+        """Return the embed link of the top video for the combined keywords, or None.
+
+        The normalized key is only used for caching; the search itself keeps the
+        caller's keyword order.
+        """
+        key = self.make_key(keywords)
+        if not key:
+            return None
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                self.searches += 1
+        if not owner:
+            return future.result()
+
+        embed_link = None
+        try:
+            video_ids = self.backend.search(" ".join(str(k) for k in keywords))
+            embed_link = EMBED_URL.format(video_ids[0]) if video_ids else None
+            self._store(key, embed_link)
+        except Exception as e:
+            # Errors are not cached, so the next request retries. googleapiclient's
+            # HttpError carries the response; it is not imported here to keep startup light
+            response = getattr(e, 'resp', None)
+            if response is not None:
+                print(f"An HTTP error {response.status} occurred:\n{e.content}")
+            else:
+                print(f"YouTube search failed for {key}: {e}")
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            future.set_result(embed_link)
+        return embed_link
+
+    def _store(self, key, embed_link):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, embed_link)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def resolve_many(self, keyword_lists):
+        """Resolve many keyword lists concurrently, returning links in the same order."""
+        keys = [self.make_key(keywords) for keywords in keyword_lists]
+        # The first keyword list seen for each key is the one searched
+        unique = {}
+        for key, keywords in zip(keys, keyword_lists):
+            unique.setdefault(key, keywords)
+        futures = {key: self._executor.submit(self.resolve, keywords) for key, keywords in unique.items()}
+        return [futures[key].result() for key in keys]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'searches': self.searches,
+            }
+
+
+resolver = EmbedLinkResolver()
+
 
-        # Get the first video from the response
-        items = search_response.get("items", [])
-        if items:
-            top_video = items[0]  # Top video is the first item in the list
-            video_id = top_video['id']['videoId']  # Extract only the video ID
-
-            # Generate the YouTube embed link
-            embed_link = f"https://www.youtube.com/embed/{video_id}"
-            return embed_link
-        else:
-            return None  # No video found for the combined keywords
-
-    except HttpError as e:
-        print(f"An HTTP error {e.resp.status} occurred:\n{e.content}")
-        return None
+def fetch_top_youtube_embed_link_combined(keywords):
+    return resolver.resolve(keywords)
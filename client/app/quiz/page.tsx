@@ -2,7 +2,7 @@
 import FlashCard from '@/components/SwipeCards/FlashCard';
 import { FlashCardData } from '@/components/SwipeCards/index';
 import { AnimatePresence } from 'framer-motion';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { db } from '@/lib/firebase';
 import { setDoc, doc } from 'firebase/firestore';
 import { useAuth } from '@/context/AuthContext';
@@ -58,66 +58,94 @@ async function fetchYouTubeEmbedLink(
   const [reportData, setReportData] = useState<any>(null);
   
 
-  const { userEmail } = useAuth();
+  const { user, userEmail } = useAuth();
+  // Unique test ID, shared by the server-side report store and Firebase; a resumed quiz keeps its own
+  const testIdRef = useRef(`test${Date.now()}`);
 
   useEffect(() => {
-
-    // WebSocket connection
-    const socket = new WebSocket('ws://localhost:8765');
-    setSocket(socket);
+    let socket: WebSocket | null = null;
+    let cancelled = false;
+
+    const connect = async () => {
+      // WebSocket connection; ?set=<id> selects the question set generated for this upload,
+      // test names the report the server stores at the end of the quiz
+      const setId = new URLSearchParams(window.location.search).get('set');
+      // An interrupted quiz is remembered per set, so another set's session is never resumed
+      const sessionKey = `quizSession:${setId ?? 'latest'}`;
+      const saved = JSON.parse(sessionStorage.getItem(sessionKey) ?? 'null');
+      if (saved?.testId) testIdRef.current = saved.testId;
+      const params = new URLSearchParams({ test: testIdRef.current });
+      if (setId) params.set('set', setId);
+      // The server stores the report under the user this Firebase ID token was issued to
+      if (user) params.set('id_token', await user.getIdToken());
+      if (cancelled) return;
+      // A quiz interrupted by a dropped connection or reload resumes at the next question
+      if (saved?.token) params.set('resume', saved.token);
+      socket = new WebSocket(`ws://localhost:8765/?${params.toString()}`);
+      setSocket(socket);
     
-    socket.onopen = () => {
-      console.log('WebSocket connection established');
-    };
-
-    socket.onmessage = async (event) => {
-      const data = JSON.parse(event.data);
-      console.log('Received WebSocket message:', data);
-
-      // Handle different message types
-      switch (data.type) {
-        case 'question':
-          console.log('Received question:', data.data);
-          await fetchYouTubeEmbedLink(data.data.related_topics);
-          setCurrentQuestion(data.data);
-          // TODO: Update UI with the new question
-          break;
-        case 'answer_result':
-          console.log('Received answer result:', data.data);
-          // TODO: Update UI with the answer result
-          break;
-        case 'report':
-          console.log('Received final report:', data.data);
-          setReportData(data.data);
-          saveReportToFirebase(data.data);
-          // TODO: Display the final report
-          break;
-        default:
-          console.log('Unknown message type:', data.type);
-      }
-    };
-
-    socket.onclose = () => {
-      console.log('WebSocket connection closed');
-    };
-
-    socket.onerror = (error) => {
-      console.error('WebSocket error:', error);
+      socket.onopen = () => {
+        console.log('WebSocket connection established');
+      };
+
+      socket.onmessage = async (event) => {
+        const data = JSON.parse(event.data);
+        console.log('Received WebSocket message:', data);
+
+        // Handle different message types
+        switch (data.type) {
+          case 'session':
+            sessionStorage.setItem(sessionKey, JSON.stringify({ token: data.data.token, testId: testIdRef.current }));
+            break;
+          case 'question':
+            console.log('Received question:', data.data);
+            await fetchYouTubeEmbedLink(data.data.related_topics);
+            setCurrentQuestion(data.data);
+            // TODO: Update UI with the new question
+            break;
+          case 'answer_result':
+            console.log('Received answer result:', data.data);
+            // TODO: Update UI with the answer result
+            break;
+          case 'report':
+            console.log('Received final report:', data.data);
+            sessionStorage.removeItem(sessionKey);
+            setReportData(data.data);
+            saveReportToFirebase(data.data);
+            // TODO: Display the final report
+            break;
+          case 'error':
+            // e.g. the remembered test already has a report; the next visit starts a fresh quiz
+            console.error('Quiz error:', data.data.message);
+            sessionStorage.removeItem(sessionKey);
+            break;
+          default:
+            console.log('Unknown message type:', data.type);
+        }
+      };
+
+      socket.onclose = () => {
+        console.log('WebSocket connection closed');
+      };
+
+      socket.onerror = (error) => {
+        console.error('WebSocket error:', error);
+      };
     };
+    connect();
 
     // Cleanup function to close the WebSocket connection when the component unmounts
     return () => {
-      socket.close();
+      cancelled = true;
+      socket?.close();
     };
   }, []);
 
   const saveReportToFirebase = async (reportData: any) => {
-   
-    const testId = `test${Date.now()}`; // Generate a unique test ID
 
     try {
       if(userEmail) {
-      await setDoc(doc(db, 'Users', userEmail, 'Tests', testId), {
+      await setDoc(doc(db, 'Users', userEmail, 'Tests', testIdRef.current), {
         type: 'report',
         data: reportData
       });
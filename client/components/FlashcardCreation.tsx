@@ -42,6 +42,49 @@ const flashcardCreationSchema = z.object({
 
 type FlashcardCreationInput = z.infer<typeof flashcardCreationSchema>;
 
+// Generation of a large document can take minutes; give up after this long
+const JOB_DEADLINE_MS = 10 * 60 * 1000;
+// Consecutive 5xx or network errors tolerated before the job is reported as failed
+const MAX_POLL_ERRORS = 5;
+
+const waitForJob = async (statusUrl: string) => {
+  const deadline = Date.now() + JOB_DEADLINE_MS;
+  let delay = 1000;
+  let errors = 0;
+  while (Date.now() < deadline) {
+    await new Promise((resolve) => setTimeout(resolve, delay));
+    delay = Math.min(delay * 1.5, 10000);
+    let response: Response;
+    try {
+      response = await fetch(`http://127.0.0.1:5000${statusUrl}`);
+    } catch (error) {
+      if (++errors >= MAX_POLL_ERRORS) {
+        return { status: 'failed', error: 'Lost contact with the server' };
+      }
+      continue;
+    }
+    if (response.status === 404) {
+      // Unknown or expired job: it will never finish
+      return { status: 'failed', error: 'The upload job no longer exists' };
+    }
+    if (!response.ok) {
+      if (++errors >= MAX_POLL_ERRORS) {
+        return { status: 'failed', error: `Job status request failed with ${response.status}` };
+      }
+      continue;
+    }
+    errors = 0;
+    const job = await response.json();
+    if (job.status === 'done' || job.status === 'failed') {
+      return job;
+    }
+    if (job.status !== 'queued' && job.status !== 'running') {
+      return { status: 'failed', error: `Unexpected job status ${job.status}` };
+    }
+  }
+  return { status: 'failed', error: 'Question generation timed out' };
+};
+
 const FlashcardCreation = () => {
   const [isLoading, setIsLoading] = useState<boolean>(false);
   const { toast } = useToast();
@@ -81,10 +124,13 @@ const FlashcardCreation = () => {
         title: "Success",
         description: result.message,
       });
-      if(result){
-        console.log(result);
-        router.push('/quiz');
+
+      // Generation runs in the background; wait for the job before starting the quiz
+      const job = await waitForJob(result.status_url);
+      if (job.status !== 'done') {
+        throw new Error(job.error || 'Question generation failed');
       }
+      router.push(`/quiz?set=${encodeURIComponent(job.result.set_id)}`);
     } catch (error) {
       console.error('Error:', error);
       toast({